@@ -0,0 +1,64 @@
+import contextlib
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+
+from tcp_receiver_with_drops import start_framed_receiver, start_receiver
+from tcp_sender_with_retransmission import start_pipelined_sender, start_sender
+
+
+def _receiver_process(framed, port, drop_rate):
+    sys.stdout = open(os.devnull, "w")
+    if framed:
+        start_framed_receiver(port=port, drop_rate=drop_rate, verbose=False)
+    else:
+        start_receiver(port=port, drop_rate=drop_rate)
+
+
+def run_transport(name, framed, port, drop_rate, num_packets, **sender_args):
+    """
+    Sends num_packets messages through one sender/receiver pair and returns
+    the message rate and latency percentiles (first send to ACK).
+    """
+    receiver = multiprocessing.Process(target=_receiver_process, args=(framed, port, drop_rate))
+    receiver.start()
+    time.sleep(0.3)  # let the receiver bind
+
+    sender = start_pipelined_sender if framed else start_sender
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        latencies = sender(port=port, num_packets=num_packets, **sender_args)
+    duration = time.perf_counter() - start
+    receiver.join()
+
+    latencies = np.array(latencies) * 1000
+    return dict(name=name, rate=num_packets / duration, duration=duration,
+                p50=np.percentile(latencies, 50), p95=np.percentile(latencies, 95),
+                p99=np.percentile(latencies, 99))
+
+
+if __name__ == "__main__":
+    drop_rate = 0.1
+    num_packets = 200
+    timeout = 0.2
+    configs = [
+        ("Stop-and-wait (as shipped)", False, dict(timeout=timeout, delay=0.5)),
+        ("Stop-and-wait, no delay", False, dict(timeout=timeout, delay=0.0)),
+        ("Framed, window 1", True, dict(timeout=timeout, window=1)),
+        ("Framed, window 8", True, dict(timeout=timeout, window=8)),
+        ("Framed, window 64", True, dict(timeout=timeout, window=64)),
+    ]
+    runs = [run_transport(name, framed, 5100 + i, drop_rate, num_packets, **args)
+            for i, (name, framed, args) in enumerate(configs)]
+
+    print(f"\n{num_packets} messages, {drop_rate * 100:.0f}% dropped, {timeout * 1000:.0f} ms resend timeout")
+    print("=" * 80)
+    print(f"{'Transport':<28} | {'Msg/s':>8} | {'Time (s)':>8} | {'p50 (ms)':>8} | {'p95 (ms)':>8} | {'p99 (ms)':>8}")
+    print("-" * 80)
+    for r in runs:
+        print(f"{r['name']:<28} | {r['rate']:>8.1f} | {r['duration']:>8.2f} | {r['p50']:>8.2f} | "
+              f"{r['p95']:>8.2f} | {r['p99']:>8.2f}")
+    print("=" * 80 + "\n")
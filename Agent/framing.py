@@ -0,0 +1,39 @@
+import struct
+
+# kind, message ID, payload length. TCP is a byte stream: without a length
+# prefix one recv() can return half a message, or several glued together.
+FRAME_HEADER = struct.Struct("!BII")
+DATA = 0
+ACK = 1
+MAX_PAYLOAD = 1 << 20
+
+
+def encode_frame(kind, msg_id, payload=b""):
+    return FRAME_HEADER.pack(kind, msg_id, len(payload)) + payload
+
+
+class FrameReader:
+    """
+    Reassembles frames from whatever chunks recv() returns.
+    feed() takes the bytes read and returns the (kind, msg_id, payload)
+    frames they complete; a partial frame waits for the next feed().
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def feed(self, data):
+        self.buffer += data
+        frames = []
+        offset = 0
+        while len(self.buffer) - offset >= FRAME_HEADER.size:
+            kind, msg_id, length = FRAME_HEADER.unpack_from(self.buffer, offset)
+            if length > MAX_PAYLOAD:
+                raise ValueError(f"Frame {msg_id} claims {length} bytes, stream is out of sync")
+            end = offset + FRAME_HEADER.size + length
+            if end > len(self.buffer):
+                break
+            frames.append((kind, msg_id, bytes(self.buffer[offset + FRAME_HEADER.size:end])))
+            offset = end
+        del self.buffer[:offset]
+        return frames
@@ -2,6 +2,8 @@ import socket
 import random
 import time
 
+from framing import ACK, DATA, FrameReader, encode_frame
+
 def start_receiver(host='127.0.0.1', port=5000, drop_rate=0.5):
     """
     Simulates a receiver that randomly drops packets.
@@ -31,5 +33,60 @@ def start_receiver(host='127.0.0.1', port=5000, drop_rate=0.5):
             print(f"[OK] Received: {packet_msg} -> Sending ACK")
             conn.sendall(b"ACK")
 
+def start_framed_receiver(host='127.0.0.1', port=5001, drop_rate=0.5, verbose=True):
+    """
+    Framed counterpart of start_receiver: reads length-prefixed frames, so
+    messages that arrive glued together are still told apart, and ACKs each
+    one by ID. Dropped messages get no ACK, as above; messages that arrive
+    ahead of a dropped one are held and delivered in order once it is resent.
+    """
+    server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server_socket.bind((host, port))
+    server_socket.listen(1)
+
+    print(f"Framed receiver listening on {host}:{port} with {drop_rate*100}% drop rate...")
+
+    conn, addr = server_socket.accept()
+    conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    print(f"Connected by {addr}")
+
+    reader = FrameReader()
+    expected = 0
+    held = {}
+    delivered = 0
+
+    with conn:
+        while True:
+            data = conn.recv(65536)
+            if not data:
+                break
+
+            acks = []
+            for kind, msg_id, payload in reader.feed(data):
+                if kind != DATA:
+                    continue
+                if msg_id >= expected and random.random() < drop_rate:
+                    if verbose:
+                        print(f"[DROP] Message {msg_id} -> Purposely ignoring (no ACK)")
+                    continue
+                if msg_id >= expected:
+                    held[msg_id] = payload
+                # Duplicates of delivered messages are ACKed again: the first ACK may be late
+                acks.append(encode_frame(ACK, msg_id))
+
+            while expected in held:
+                payload = held.pop(expected)
+                if verbose:
+                    print(f"[OK] Delivered message {expected}: {payload.decode()}")
+                expected += 1
+                delivered += 1
+
+            if acks:
+                conn.sendall(b"".join(acks))
+
+    server_socket.close()
+    return delivered
+
 if __name__ == "__main__":
     start_receiver()
@@ -1,13 +1,11 @@
 import socket
 import time
 
-def start_sender(host='127.0.0.1', port=5000, num_packets=10):
-    """
-    Simulates a sender that waits for application-level ACKs.
-    """
+from framing import ACK, DATA, FrameReader, encode_frame
+
+def connect(host, port):
+    """Try connecting until successful (wait for receiver to start)."""
     client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    
-    # Try connecting until successful (wait for receiver to start)
     while True:
         try:
             client_socket.connect((host, port))
@@ -16,12 +14,22 @@ def start_sender(host='127.0.0.1', port=5000, num_packets=10):
         except ConnectionRefusedError:
             print("Receiver not ready, retrying in 1s...")
             time.sleep(1)
+    return client_socket
 
-    client_socket.settimeout(1.0) # 1 second timeout for ACKs
+def start_sender(host='127.0.0.1', port=5000, num_packets=10, timeout=1.0, delay=0.5):
+    """
+    Simulates a sender that waits for application-level ACKs.
+    Stop-and-wait: one message in flight at a time. Returns each message's
+    latency, first send to ACK, in seconds.
+    """
+    client_socket = connect(host, port)
+    client_socket.settimeout(timeout) # timeout for ACKs
+    latencies = []
 
     for i in range(1, num_packets + 1):
         packet_msg = f"Packet-{i}"
         ack_received = False
+        first_sent = time.perf_counter()
         
         while not ack_received:
             print(f"[SEND] Sending: {packet_msg}")
@@ -32,16 +40,73 @@ def start_sender(host='127.0.0.1', port=5000, num_packets=10):
                 if data.decode() == "ACK":
                     print(f"[ACK] Received ACK for {packet_msg}")
                     ack_received = True
+                    latencies.append(time.perf_counter() - first_sent)
             except socket.timeout:
                 print(f"[TIMEOUT] No ACK for {packet_msg}, retransmitting...")
             except Exception as e:
                 print(f"Error: {e}")
                 break
         
-        time.sleep(0.5) # Small delay between packets
+        time.sleep(delay) # Small delay between packets
 
     client_socket.close()
     print("All packets sent and acknowledged.")
+    return latencies
+
+def start_pipelined_sender(host='127.0.0.1', port=5001, num_packets=10, window=8, timeout=1.0):
+    """
+    Sliding-window sender over length-prefixed frames (see framing.py).
+    Up to window messages past the oldest unacknowledged one are in flight;
+    each is ACKed by ID and resent if its ACK is more than timeout seconds
+    late. Returns each message's latency, first send to ACK, in seconds.
+    """
+    client_socket = connect(host, port)
+    client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    reader = FrameReader()
+    payloads = [f"Packet-{i}".encode() for i in range(1, num_packets + 1)]
+    first_sent = [None] * num_packets
+    latencies = [None] * num_packets
+    outstanding = {}  # message ID -> time of its last send
+    base = next_id = 0
+
+    while base < num_packets:
+        burst = []
+        now = time.perf_counter()
+        while next_id < num_packets and next_id < base + window:
+            burst.append(encode_frame(DATA, next_id, payloads[next_id]))
+            first_sent[next_id] = outstanding[next_id] = now
+            next_id += 1
+        for msg_id, sent in outstanding.items():
+            if now - sent < timeout:
+                continue
+            print(f"[TIMEOUT] No ACK for message {msg_id}, retransmitting...")
+            burst.append(encode_frame(DATA, msg_id, payloads[msg_id]))
+            outstanding[msg_id] = now
+        if burst:
+            client_socket.sendall(b"".join(burst))
+
+        wait = min(outstanding.values()) + timeout - time.perf_counter()
+        if wait <= 0:
+            continue  # oldest frame already overdue: retransmit now (a 0.0 timeout would make recv non-blocking)
+        client_socket.settimeout(wait)
+        try:
+            data = client_socket.recv(65536)
+        except socket.timeout:
+            continue
+        if not data:
+            raise ConnectionError("Receiver closed the connection")
+
+        now = time.perf_counter()
+        for kind, msg_id, _ in reader.feed(data):
+            if kind == ACK and msg_id in outstanding:
+                del outstanding[msg_id]
+                latencies[msg_id] = now - first_sent[msg_id]
+        while base < next_id and base not in outstanding:
+            base += 1
+
+    client_socket.close()
+    print("All messages sent and acknowledged.")
+    return latencies
 
 if __name__ == "__main__":
     start_sender()
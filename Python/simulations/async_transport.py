@@ -0,0 +1,238 @@
+import asyncio
+import io
+import multiprocessing
+import random
+import time
+from contextlib import redirect_stdout
+
+from packet_format import HEADER, HEADER_SIZE, TIMESTAMP, MAGIC, FLAG_EOF, FLAG_TS, PacketBuffer, make_ack, parse_ack
+from rtt_estimator import RttEstimator
+from sender import Sender
+
+
+class AsyncSenderProtocol(asyncio.DatagramProtocol):
+    """
+    Go-Back-N sender driven entirely by the event loop.
+
+    ACKs arrive through datagram_received and the retransmission timer is a
+    loop.call_later handle, so there is no listener thread, no lock and no
+    polling sleep: the process is idle until a datagram or the timer fires.
+    """
+
+    def __init__(self, packets, window_size=10, timeout=0.3, adaptive_rto=True):
+        self.packets = packets
+        self.window_size = window_size
+        self.timeout = timeout
+        # RTO from echoed timestamps (needs PacketBuffer(timestamps=True));
+        # adaptive_rto=False keeps it fixed at timeout
+        self.rtt = RttEstimator(initial_rto=timeout, adaptive=adaptive_rto)
+
+        self.base = 0
+        self.next_seq_num = 0
+        self.timer = None
+        self.transport = None
+        self.loop = asyncio.get_running_loop()
+        self.done = self.loop.create_future()
+
+        self.packets_sent = 0
+        self.retransmissions = 0
+        self.acks_received = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.fill_window()
+
+    def fill_window(self):
+        while self.next_seq_num < self.base + self.window_size and self.next_seq_num < len(self.packets):
+            self.packets.stamp(self.next_seq_num)
+            self.transport.sendto(self.packets[self.next_seq_num])
+            self.packets_sent += 1
+            if self.base == self.next_seq_num:
+                self.restart_timer()
+            self.next_seq_num += 1
+
+    def restart_timer(self):
+        if self.timer:
+            self.timer.cancel()
+        self.timer = self.loop.call_later(self.rtt.rto, self.on_timeout)
+
+    def stop_timer(self):
+        if self.timer:
+            self.timer.cancel()
+            self.timer = None
+
+    def on_timeout(self):
+        self.timer = None
+        self.rtt.on_timeout(self.base)
+        for i in range(self.base, self.next_seq_num):
+            self.packets.stamp(i)
+            self.transport.sendto(self.packets[i])
+            self.packets_sent += 1
+            self.retransmissions += 1
+        self.restart_timer()
+
+    def datagram_received(self, data, addr):
+        self.acks_received += 1
+        ack = parse_ack(data)
+        if ack is None or ack[0] < self.base:
+            return
+        ack_num, echo_ts = ack
+        self.rtt.on_ack(ack_num, echo_ts)
+
+        self.base = ack_num + 1
+        self.packets.release(self.base)
+        if self.base >= len(self.packets):
+            self.stop_timer()
+            if not self.done.done():
+                self.done.set_result(True)
+            return
+
+        if self.base == self.next_seq_num:
+            self.stop_timer()
+        else:
+            self.restart_timer()
+        self.fill_window()
+
+    def error_received(self, exc):
+        # ICMP port unreachable etc.; the retransmission timer recovers
+        print(f"Sender socket error: {exc}")
+
+    def connection_lost(self, exc):
+        self.stop_timer()
+        if not self.done.done():
+            self.done.set_result(False)
+
+
+class AsyncReceiverProtocol(asyncio.DatagramProtocol):
+    """Go-Back-N receiver with simulated loss, mirroring receiver.py."""
+
+    def __init__(self, loss_rate=0.0, verbose=True):
+        self.loss_rate = loss_rate
+        self.verbose = verbose
+        self.transport = None
+        self.reset()
+
+    def reset(self):
+        self.expected_seq_num = 0
+        self.total_received = 0
+        self.total_pkts = 0
+        self.dropped_pkts = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.total_pkts += 1
+        if random.random() < self.loss_rate:
+            self.dropped_pkts += 1
+            return
+
+        if len(data) < HEADER.size or data[0] != MAGIC:
+            print(f"Error processing packet: unknown message {data[:16]!r}")
+            return
+        _, flags, length, seq_num = HEADER.unpack_from(data)
+
+        if seq_num == self.expected_seq_num:
+            self.expected_seq_num += 1
+            if not flags & FLAG_EOF:
+                self.total_received += length
+
+        echo_ts = TIMESTAMP.unpack_from(data, HEADER_SIZE)[0] if flags & FLAG_TS else None
+        self.transport.sendto(make_ack(self.expected_seq_num - 1, echo_ts), addr)
+
+        if flags & FLAG_EOF and seq_num == self.expected_seq_num - 1:
+            if self.verbose:
+                print(f"Run Complete. Recv: {self.total_received} bytes, "
+                      f"Loss: {(self.dropped_pkts/self.total_pkts)*100:.2f}%")
+            self.reset()
+
+
+async def send_data(packets, host='127.0.0.1', port=12345, window_size=10, timeout=0.3):
+    loop = asyncio.get_running_loop()
+    transport, protocol = await loop.create_datagram_endpoint(
+        lambda: AsyncSenderProtocol(packets, window_size=window_size, timeout=timeout),
+        remote_addr=(host, port))
+    try:
+        await protocol.done
+    finally:
+        transport.close()
+    return protocol
+
+
+async def run_receiver(host='127.0.0.1', port=12345, loss_rate=0.0, verbose=True):
+    loop = asyncio.get_running_loop()
+    transport, _ = await loop.create_datagram_endpoint(
+        lambda: AsyncReceiverProtocol(loss_rate=loss_rate, verbose=verbose),
+        local_addr=(host, port))
+    print(f"Async receiver listening on {host}:{port} with {loss_rate*100}% packet loss...")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        transport.close()
+
+
+def _receiver_process(host, port, loss_rate):
+    try:
+        asyncio.run(run_receiver(host, port, loss_rate, verbose=False))
+    except KeyboardInterrupt:
+        pass
+
+
+def measure_threaded(data, host, port, window_size, timeout):
+    sender = Sender(host=host, port=port, window_size=window_size, timeout=timeout)
+    sender.create_packets(data)
+    num_packets = len(sender.packets)
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    # Sender prints every ACK; keep the console out of the measurement
+    with redirect_stdout(io.StringIO()):
+        sender.send_data()
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    return num_packets, wall, cpu
+
+
+def measure_async(data, host, port, window_size, timeout):
+    packets = PacketBuffer(data, timestamps=True)
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    asyncio.run(send_data(packets, host, port, window_size, timeout))
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    return len(packets), wall, cpu
+
+
+def compare_with_threaded(data, host='127.0.0.1', port=12345, window_size=10, timeout=0.3, loss_rate=0.0):
+    """
+    Runs the threaded Sender and the asyncio sender against the same receiver
+    (in its own process, so process_time only covers the sender side).
+    """
+    receiver = multiprocessing.Process(target=_receiver_process, args=(host, port, loss_rate), daemon=True)
+    receiver.start()
+    time.sleep(0.5)  # let the receiver bind
+
+    try:
+        results = [
+            ("Threaded (lock + poll)",) + measure_threaded(data, host, port, window_size, timeout),
+            ("asyncio (timer-driven)",) + measure_async(data, host, port, window_size, timeout),
+        ]
+    finally:
+        receiver.terminate()
+        receiver.join()
+
+    print("\n" + "=" * 72)
+    print(f"{'Implementation':<24} | {'Packets/sec':>12} | {'CPU (s)':>8} | {'CPU %':>6} | {'CPU us/pkt':>10}")
+    print("-" * 72)
+    for name, num_packets, wall, cpu in results:
+        print(f"{name:<24} | {num_packets / wall:>12.0f} | {cpu:>8.3f} | "
+              f"{cpu / wall * 100:>6.1f} | {cpu / num_packets * 1e6:>10.1f}")
+    print("=" * 72 + "\n")
+    return results
+
+
+if __name__ == "__main__":
+    # sender.py's dummy payload, scaled to ~900KB so the runs are long enough to time
+    data = "Hello Network! " * 60000
+    compare_with_threaded(data, window_size=10, timeout=0.3)
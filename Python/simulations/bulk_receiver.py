@@ -0,0 +1,199 @@
+import asyncio
+import mmap
+import multiprocessing
+import os
+import random
+import select
+import socket
+import tempfile
+import time
+import zlib
+
+from async_transport import send_data
+from packet_format import (HEADER, HEADER_SIZE, TS_HEADER_SIZE, TIMESTAMP, MAGIC, FLAG_EOF, FLAG_TS,
+                           EOF_TRAILER, AckCoalescer, PacketBuffer, make_ack)
+
+
+class BulkReceiver:
+    """
+    Receiver that keeps the data instead of counting it.
+
+    Every datagram lands in one reusable bytearray via recvfrom_into, and its
+    payload is copied straight into a memory-mapped output file at
+    seq * chunk_size; nothing is decoded and no per-packet objects are built
+    beyond the header tuple. Packets that arrive out of order are written at
+    their offset too and tracked in a bitmap, so the cumulative ACK jumps
+    forward as soon as a hole is filled (Go-Back-N senders work unchanged).
+
+    The EOF packet carries the transfer size and CRC32, which are checked
+    against the file once everything has arrived.
+
+    With ack_every > 1, ACKs are coalesced (see AckCoalescer): the socket
+    is drained without blocking, and only once it is empty does the
+    receiver wait, at most ack_delay, for more before ACKing what it holds.
+    """
+
+    def __init__(self, out_path, host='127.0.0.1', port=12345, chunk_size=1024,
+                 expected_size=64 * 1024 * 1024, loss_rate=0.0, linger=1.0, ack_every=1, ack_delay=0.005):
+        self.out_path = out_path
+        self.host = host
+        self.port = port
+        self.chunk_size = chunk_size
+        self.loss_rate = loss_rate
+        # Keep re-ACKing for a while after completion in case the final ACK is lost
+        self.linger = linger
+        self.acks = AckCoalescer(ack_every, ack_delay)
+
+        self.capacity = max(expected_size, chunk_size)
+        self.file = open(out_path, "w+b")
+        self.file.truncate(self.capacity)
+        self.mm = mmap.mmap(self.file.fileno(), self.capacity)
+        self.received = bytearray(self.bitmap_size())
+
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 8 * 1024 * 1024)
+        self.sock.bind((host, port))
+        self.sock.setblocking(False)
+
+    def bitmap_size(self):
+        # One flag per packet that fits in capacity (the last may be partial), plus a zero sentinel
+        return -(-self.capacity // self.chunk_size) + 1
+
+    def ensure_capacity(self, end):
+        if end <= self.capacity:
+            return
+        while self.capacity < end:
+            self.capacity *= 2
+        self.mm.resize(self.capacity)
+        self.received.extend(bytes(self.bitmap_size() - len(self.received)))
+
+    def receive(self):
+        buf = bytearray(self.chunk_size + TS_HEADER_SIZE + EOF_TRAILER.size)
+        view = memoryview(buf)
+        received = self.received
+        chunk_size = self.chunk_size
+        acks = self.acks
+        sock = self.sock
+        addr = None
+
+        expected_seq_num = 0
+        eof_seq = None
+        total_size = crc = None
+        total_pkts = dropped_pkts = duplicate_pkts = acks_sent = waits = 0
+        start_time = None
+
+        print(f"Bulk receiver listening on {self.host}:{self.port}, writing to {self.out_path}")
+        while eof_seq is None or expected_seq_num <= eof_seq:
+            try:
+                nbytes, addr = sock.recvfrom_into(buf)
+            except BlockingIOError:
+                # Drained: wait for more, but no longer than the held ACK may be delayed
+                waits += 1
+                if not select.select([sock], [], [], acks.next_timeout(time.monotonic()))[0]:
+                    sock.sendto(make_ack(expected_seq_num - 1, acks.take()), addr)
+                    acks_sent += 1
+                continue
+            if start_time is None:
+                start_time = time.perf_counter()
+            total_pkts += 1
+            if nbytes < HEADER_SIZE or buf[0] != MAGIC:
+                continue
+            if self.loss_rate and random.random() < self.loss_rate:
+                dropped_pkts += 1
+                continue
+
+            _, flags, length, seq = HEADER.unpack_from(buf)
+            in_order = seq == expected_seq_num
+            start = TS_HEADER_SIZE if flags & FLAG_TS else HEADER_SIZE
+
+            if flags & FLAG_EOF:
+                eof_seq = seq
+                total_size, crc = EOF_TRAILER.unpack_from(buf, start)
+            else:
+                offset = seq * chunk_size
+                if offset + length > self.capacity:
+                    self.ensure_capacity(offset + length)
+                    received = self.received
+                if received[seq]:
+                    duplicate_pkts += 1
+                else:
+                    self.mm[offset:offset + length] = view[start:start + length]
+                    received[seq] = 1
+
+            while received[expected_seq_num]:
+                expected_seq_num += 1
+            if expected_seq_num == eof_seq:
+                expected_seq_num += 1
+
+            echo_ts = TIMESTAMP.unpack_from(buf, HEADER_SIZE)[0] if flags & FLAG_TS else None
+            urgent = not in_order or expected_seq_num > seq + 1 or flags & FLAG_EOF
+            if acks.on_packet(echo_ts, time.monotonic(), urgent):
+                sock.sendto(make_ack(expected_seq_num - 1, acks.take()), addr)
+                acks_sent += 1
+
+        duration = time.perf_counter() - start_time
+        self.finish_linger(expected_seq_num)
+        ok = self.verify(total_size, crc)
+
+        print("\n--- Bulk Transfer Complete ---")
+        print(f"Bytes written: {total_size} ({total_size / (1024 * 1024):.1f} MiB) in {duration:.2f}s")
+        print(f"Rate: {total_size * 8 / duration / 1e6:.1f} Mbit/s, {total_pkts / duration:.0f} packets/s")
+        print(f"Packets: {total_pkts} handled, {dropped_pkts} dropped (simulated), {duplicate_pkts} duplicates")
+        print(f"ACKs: {acks_sent} sent ({total_pkts / max(acks_sent, 1):.1f} packets per ACK)")
+        print(f"Checksum: {'OK' if ok else 'MISMATCH'} (crc32={crc:08x})")
+        return {"bytes": total_size, "duration": duration, "packets": total_pkts, "acks": acks_sent,
+                "waits": waits, "checksum_ok": ok}
+
+    def finish_linger(self, expected_seq_num):
+        ack = make_ack(expected_seq_num - 1)
+        self.sock.settimeout(self.linger)
+        try:
+            while True:
+                _, addr = self.sock.recvfrom_into(bytearray(HEADER_SIZE))
+                self.sock.sendto(ack, addr)
+        except socket.timeout:
+            pass
+        finally:
+            self.sock.close()
+
+    def verify(self, total_size, expected_crc):
+        """Truncates the file to the transfer size and checks its CRC32."""
+        self.mm.flush()
+        crc = 0
+        with memoryview(self.mm) as data:
+            # Checksum in 1 MiB steps so a multi-GB file is never copied whole
+            for i in range(0, total_size, 1024 * 1024):
+                crc = zlib.crc32(data[i:min(i + 1024 * 1024, total_size)], crc)
+        self.mm.close()
+        self.file.truncate(total_size)
+        self.file.close()
+        return crc == expected_crc
+
+
+def _receiver_process(out_path, port, expected_size, loss_rate):
+    BulkReceiver(out_path, port=port, expected_size=expected_size, loss_rate=loss_rate).receive()
+
+
+def run_transfer(size_mb=32, port=12345, window_size=256, timeout=0.05, loss_rate=0.0):
+    data = os.urandom(size_mb * 1024 * 1024)
+    out_path = os.path.join(tempfile.gettempdir(), "bulk_receiver_output.bin")
+
+    receiver = multiprocessing.Process(target=_receiver_process,
+                                       args=(out_path, port, len(data), loss_rate))
+    receiver.start()
+    time.sleep(0.5)  # let the receiver bind
+
+    packets = PacketBuffer(data)
+    start = time.perf_counter()
+    protocol = asyncio.run(send_data(packets, port=port, window_size=window_size, timeout=timeout))
+    duration = time.perf_counter() - start
+    receiver.join()
+
+    print(f"Sender: {len(data) * 8 / duration / 1e6:.1f} Mbit/s, "
+          f"{protocol.packets_sent} packets sent ({protocol.retransmissions} retransmissions)")
+    with open(out_path, "rb") as f:
+        print(f"Output matches input: {f.read() == data}")
+
+
+if __name__ == "__main__":
+    run_transfer()
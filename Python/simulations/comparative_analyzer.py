@@ -1,13 +1,28 @@
 import socket
 import time
 import threading
+from functools import partial
 import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+import throughput_model
+from metrics import MetricsPublisher, window_sender_fields
+from congestion_control import Pacer, make_controller
+from packet_format import PacketBuffer, PacketStream, configure_run, new_run_id, parse_ack
+from rtt_estimator import RttEstimator
+from selective_repeat import SelectiveRepeatSender, SackSender
+from trace_recorder import SEND, RETRANSMIT, ACK, DUP_ACK, FAST_RETRANSMIT, TIMEOUT
 
 class BaseSender:
-    def __init__(self, host='127.0.0.1', port=12345, timeout=0.2):
+    receiver_mode = "gbn"
+
+    def __init__(self, host='127.0.0.1', port=12345, timeout=0.2, adaptive_rto=True):
         self.host = host
         self.port = port
         self.timeout = timeout
+        # RTO from echoed timestamps; adaptive_rto=False keeps it fixed at timeout
+        self.rtt = RttEstimator(initial_rto=timeout, adaptive=adaptive_rto)
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self.sock.settimeout(0.05)
         self.base = 0
@@ -16,14 +31,23 @@ class BaseSender:
         self.timer_start_time = None
         self.lock = threading.Lock()
         self.running = True
+        self.packets_sent = 0
+        self.retransmissions = 0
+        self.max_seq_sent = -1
+        self.trace = None  # optional TraceRecorder
+        self.fec = None  # optional fec.FecEncoder (the receiver needs configure_run(..., fec=True))
 
     def create_packets(self, data, chunk_size=1024):
-        self.packets = []
-        for i in range(0, len(data), chunk_size):
-            chunk = data[i:i+chunk_size]
-            seq_num = len(self.packets)
-            self.packets.append(f"{seq_num}|{chunk}")
-        self.packets.append(f"{len(self.packets)}|EOF")
+        self.packets = PacketBuffer(data, chunk_size, timestamps=True)
+
+    def create_stream(self, source, chunk_size=1024, slots=None):
+        """
+        Streams from a file path, file object or chunk iterator. Memory is
+        slots packets (the window size by default, 256 for TCPSimSender);
+        drive_window_sender never lets cwnd outgrow it.
+        """
+        slots = slots or getattr(self, 'window_size', 256)
+        self.packets = PacketStream(source, chunk_size, slots=slots, timestamps=True)
 
 class UDPSender(BaseSender):
     def __init__(self, window_size=10, **kwargs):
@@ -34,113 +58,311 @@ class UDPSender(BaseSender):
         while self.running:
             try:
                 data, _ = self.sock.recvfrom(1024)
-                ack_num = int(data.decode())
+                ack = parse_ack(data)
+                if ack is None: continue
                 with self.lock:
-                    if ack_num >= self.base:
-                        self.base = ack_num + 1
-                        self.timer_start_time = time.time() if self.base != self.next_seq_num else None
+                    self.on_ack(*ack)
+                    if self.fec is not None:
+                        self.fec.on_ack(data)
             except: continue
 
+    def on_ack(self, ack_num, echo_ts):
+        """Handles one ACK (caller holds the lock, or owns the sender outright)."""
+        if ack_num >= self.base:
+            self.rtt.on_ack(ack_num, echo_ts)
+            self.base = ack_num + 1
+            self.timer_start_time = time.time() if self.base != self.next_seq_num else None
+
 class TCPSimSender(BaseSender):
-    def __init__(self, **kwargs):
+    def __init__(self, cc="reno", **kwargs):
         super().__init__(**kwargs)
-        self.cwnd = 1.0  # Congestion Window
-        self.ssthresh = 64
+        # Pluggable congestion control: "reno", "cubic", "bbr" or a CongestionControl
+        self.cc = make_controller(cc)
         self.dup_acks = 0
         self.last_ack = -1
 
+    @property
+    def cwnd(self):
+        return self.cc.cwnd
+
+    @property
+    def ssthresh(self):
+        return self.cc.ssthresh
+
     def ack_listener(self):
         while self.running:
             try:
                 data, _ = self.sock.recvfrom(1024)
-                ack_num = int(data.decode())
+                ack = parse_ack(data)
+                if ack is None: continue
                 with self.lock:
-                    if ack_num >= self.base:
-                        if ack_num > self.last_ack:
-                            # New ACK
-                            if self.cwnd < self.ssthresh:
-                                self.cwnd += 1  # Slow Start
-                            else:
-                                self.cwnd += 1.0 / int(self.cwnd)  # Congestion Avoidance
-                            self.base = ack_num + 1
-                            self.last_ack = ack_num
-                            self.dup_acks = 0
-                        else:
-                            # Duplicate ACK
-                            self.dup_acks += 1
-                            if self.dup_acks == 3:
-                                # Fast Retransmit
-                                self.ssthresh = max(self.cwnd / 2, 2)
-                                self.cwnd = self.ssthresh
-                                self.next_seq_num = self.base  # Retransmit
-                        
-                        self.timer_start_time = time.time() if self.base != self.next_seq_num else None
+                    self.on_ack(*ack)
+                    if self.fec is not None:
+                        self.fec.on_ack(data)
             except: continue
 
-def run_protocol_test(sender_class, loss_rate, data_size_kb, name):
-    sender = sender_class(host='127.0.0.1', port=12345)
+    def on_ack(self, ack_num, echo_ts):
+        """Handles one ACK (caller holds the lock, or owns the sender outright)."""
+        # base - 1 is the duplicate of the last cumulative ACK
+        if ack_num >= self.base - 1:
+            now = time.monotonic()
+            if ack_num > self.last_ack:
+                # New ACK
+                self.rtt.on_ack(ack_num, echo_ts)
+                acked = ack_num - max(self.last_ack, self.base - 1)
+                self.base = ack_num + 1
+                self.last_ack = ack_num
+                self.dup_acks = 0
+                self.cc.on_ack(acked, self.rtt, now, self.next_seq_num - self.base)
+                if self.trace is not None:
+                    self.trace.record(ACK, ack_num, self.cc.cwnd, self.cc.ssthresh, self.rtt.latest_rtt or 0.0)
+            else:
+                # Duplicate ACK
+                self.dup_acks += 1
+                if self.trace is not None:
+                    self.trace.record(DUP_ACK, ack_num, self.cc.cwnd, self.cc.ssthresh)
+                if self.dup_acks == 3:
+                    # Fast Retransmit
+                    self.cc.on_fast_retransmit(now)
+                    self.next_seq_num = self.base  # Retransmit
+                    if self.trace is not None:
+                        self.trace.record(FAST_RETRANSMIT, self.base, self.cc.cwnd, self.cc.ssthresh)
+
+            self.timer_start_time = time.time() if self.base != self.next_seq_num else None
+
+def service_window(sender, pacer, fixed_rate=None):
+    """
+    One pass of a window sender: sends what the window and pacer allow and
+    handles an expired retransmission timer. The caller holds the lock (or
+    owns the sender outright, as fairness.py's event loop does).
+
+    Returns seconds until the sender needs attention again without an ACK
+    arriving (pacer delay or timer expiry), or None if only an ACK can move
+    it forward.
+    """
+    trace = sender.trace
+    fec = sender.fec
+    wake = []
+    sender.packets.release(sender.base)
+    limit = min(sender.window_size if hasattr(sender, 'window_size') else int(sender.cwnd), sender.packets.slots)
+    ssthresh = sender.ssthresh if hasattr(sender, 'cc') else 0.0
+    rate = sender.cc.pacing_rate(sender.rtt) if hasattr(sender, 'cc') else fixed_rate
+    now = time.monotonic()
+    while sender.next_seq_num < sender.base + limit and sender.next_seq_num < len(sender.packets):
+        delay = pacer.delay(now)
+        if delay > 0:
+            wake.append(delay)
+            break
+        sender.packets.stamp(sender.next_seq_num)
+        packet = sender.packets[sender.next_seq_num]
+        sender.sock.sendto(packet, (sender.host, sender.port))
+        sender.packets_sent += 1
+        if fec is not None:
+            for parity in fec.on_send(sender.next_seq_num, packet, now):
+                sender.sock.sendto(parity, (sender.host, sender.port))
+                pacer.on_send(now, rate)
+        if sender.next_seq_num <= sender.max_seq_sent:
+            sender.retransmissions += 1
+            if trace is not None:
+                trace.record(RETRANSMIT, sender.next_seq_num, limit, ssthresh)
+        else:
+            sender.max_seq_sent = sender.next_seq_num
+            if trace is not None:
+                trace.record(SEND, sender.next_seq_num, limit, ssthresh)
+        if sender.base == sender.next_seq_num: sender.timer_start_time = time.time()
+        sender.next_seq_num += 1
+        pacer.on_send(now, rate)
+        now = time.monotonic()
+
+    if fec is not None and fec.block:
+        hold = fec.hold_until(sender.rtt.srtt) - now
+        if hold > 0:
+            wake.append(hold)
+        else:
+            for parity in fec.close():
+                sender.sock.sendto(parity, (sender.host, sender.port))
+
+    if sender.timer_start_time:
+        remaining = sender.timer_start_time + sender.rtt.rto - time.time()
+        if remaining < 0:
+            # Timeout
+            sender.rtt.on_timeout(sender.base)
+            if hasattr(sender, 'cc'):
+                sender.cc.on_timeout(now)
+            if fec is not None:
+                fec.on_timeout()
+            if trace is not None:
+                trace.record(TIMEOUT, sender.base, sender.cwnd if hasattr(sender, 'cc') else limit,
+                             sender.ssthresh if hasattr(sender, 'cc') else 0.0, sender.rtt.rto)
+            sender.next_seq_num = sender.base
+            sender.timer_start_time = time.time()
+            wake.append(0.0)  # resend right away
+        else:
+            wake.append(remaining)
+    return min(wake) if wake else None
+
+def drive_window_sender(sender, send_gap=0.0, poll_interval=0.01, deadline=None, metrics=None, stream="", **fields):
+    """
+    Main send loop for the threaded window senders (ack_listener runs alongside).
+
+    TCPSimSender is paced at its controller's pacing rate; UDPSender sends
+    at most one packet per send_gap seconds. All waiting happens outside
+    the lock so the ACK thread is never starved. With a deadline
+    (time.monotonic()) the loop gives up there, transfer finished or not.
+    With a MetricsPublisher, progress goes out as stream (plus any extra
+    fields) and the loop stops early if the viewer aborts it.
+    """
+    pacer = Pacer()
+    fixed_rate = 1.0 / send_gap if send_gap else None
+    while sender.base < len(sender.packets) and (deadline is None or time.monotonic() < deadline):
+        with sender.lock:
+            wait = service_window(sender, pacer, fixed_rate)
+            now = time.monotonic()
+            if metrics is not None and metrics.due(now):
+                metrics.publish(now, sender.base * sender.packets.chunk_size, stream,
+                                **window_sender_fields(sender), **fields)
+                if metrics.aborted:
+                    break
+        time.sleep(poll_interval if wait is None else min(wait, poll_interval))
+
+def run_protocol_test(sender_class, loss_rate, data_size_kb, name, adaptive_rto=True, host='127.0.0.1', port=12345,
+                      trace=None, stats=None, metrics=None):
+    """
+    Returns (goodput in bits/sec, retransmissions per unique packet, spurious timeout rate).
+    Pass a TraceRecorder as trace to record the window senders' per-packet events, a
+    dict as stats to get the sender's final SRTT and RTO (seconds) back in it, and a
+    MetricsPublisher as metrics to stream the window senders' progress live.
+    """
+    sender = sender_class(host=host, port=port, adaptive_rto=adaptive_rto)
+    sender.trace = trace
     data = "X" * (data_size_kb * 1024)
     sender.create_packets(data)
     
-    # Handshake to set loss rate
-    sender.sock.sendto(f"CMD:SET_LOSS:{loss_rate}".encode(), (sender.host, sender.port))
-    time.sleep(1.0)
+    # Acknowledged handshake: sets up this run's own flow state on the receiver
+    configure_run(sender.sock, (sender.host, sender.port), new_run_id(),
+                  mode=sender.receiver_mode, loss=loss_rate)
+
+    if hasattr(sender, 'transfer'):
+        # Event-driven senders (Selective Repeat, SACK) run their own loop
+        start_time = time.time()
+        sender.transfer()
+        duration = time.time() - start_time
+        sender.sock.close()
+        if stats is not None:
+            stats.update(srtt_s=sender.rtt.srtt, rto_s=sender.rtt.rto)
+        return (len(data) * 8) / duration, sender.retransmissions / len(sender.packets), sender.rtt.spurious_rate
 
     listener = threading.Thread(target=sender.ack_listener)
     listener.start()
     
     start_time = time.time()
-    while sender.base < len(sender.packets):
-        with sender.lock:
-            limit = sender.window_size if hasattr(sender, 'window_size') else int(sender.cwnd)
-            while sender.next_seq_num < sender.base + limit and sender.next_seq_num < len(sender.packets):
-                sender.sock.sendto(sender.packets[sender.next_seq_num].encode(), (sender.host, sender.port))
-                if sender.base == sender.next_seq_num: sender.timer_start_time = time.time()
-                sender.next_seq_num += 1
-                time.sleep(0.001)
-
-            if sender.timer_start_time and (time.time() - sender.timer_start_time > sender.timeout):
-                # Timeout
-                if hasattr(sender, 'cwnd'):
-                    sender.ssthresh = max(sender.cwnd / 2, 2)
-                    sender.cwnd = 1.0
-                sender.next_seq_num = sender.base
-                sender.timer_start_time = time.time()
-        time.sleep(0.01)
+    stream = f"{name} {'adaptive' if adaptive_rto else 'fixed'} loss {loss_rate*100:g}%"
+    drive_window_sender(sender, send_gap=0.001, metrics=metrics, stream=stream, loss_pct=loss_rate * 100)
+    if metrics is not None:
+        metrics.finish(stream)
 
     duration = time.time() - start_time
     sender.running = False
     listener.join()
     sender.sock.close()
-    return (len(data) * 8) / duration
+    if stats is not None:
+        stats.update(srtt_s=sender.rtt.srtt, rto_s=sender.rtt.rto)
+    return (len(data) * 8) / duration, sender.retransmissions / len(sender.packets), sender.rtt.spurious_rate
+
+PROTOCOLS = [
+    ("UDP (Go-Back-N)", UDPSender),
+    ("TCP-Sim (AIMD/Reno)", TCPSimSender),
+    ("TCP-Sim (CUBIC)", partial(TCPSimSender, cc="cubic")),
+    ("TCP-Sim (BBR-like)", partial(TCPSimSender, cc="bbr")),
+    ("Selective Repeat", SelectiveRepeatSender),
+    ("SACK", SackSender),
+]
+
+# Adaptive RTO (RttEstimator) against the old fixed 0.2s timeout
+RTO_MODES = [("adaptive", True), ("fixed", False)]
 
 if __name__ == "__main__":
     loss_rates = [0, 0.01, 0.05, 0.10, 0.20, 0.50, 0.70]
     data_size = 128 # 128KB for reasonable speed
     
-    udp_results = []
-    tcp_results = []
+    runs = [(name, mode) for name, _ in PROTOCOLS for mode, _ in RTO_MODES]
+    goodput = {run: [] for run in runs}
+    retx_ratio = {run: [] for run in runs}
+    spurious = {run: [] for run in runs}
+    rtos = {run: [] for run in runs}
+    srtts = []
+    # Watch the window senders live with `python metrics.py` in another terminal; aborting there ends the sweep,
+    # and the runs finished so far are still summarized and plotted
+    metrics = MetricsPublisher("comparative_analyzer")
 
-    print(f"{'Loss %':<10} | {'UDP (bps)':<15} | {'TCP-Sim (bps)':<15}")
-    print("-" * 45)
+    print(f"{'Loss %':<8} | {'Protocol':<20} | {'RTO':<8} | {'Goodput (bps)':>14} | {'Retx ratio':>10} | {'Spurious RTO':>12}")
+    print("-" * 88)
 
     for loss in loss_rates:
-        udp_bps = run_protocol_test(UDPSender, loss, data_size, "UDP")
-        tcp_bps = run_protocol_test(TCPSimSender, loss, data_size, "TCP-Sim")
-        
-        udp_results.append(udp_bps)
-        tcp_results.append(tcp_bps)
-        
-        print(f"{loss*100:<10.1f} | {udp_bps:<15.2f} | {tcp_bps:<15.2f}")
-
-    # Plotting
-    plt.figure(figsize=(10, 6))
-    plt.plot([l*100 for l in loss_rates], udp_results, marker='o', label='UDP (Go-Back-N)')
-    plt.plot([l*100 for l in loss_rates], tcp_results, marker='s', label='TCP-Sim (AIMD/Reno)')
-    plt.title('Protocol Comparison: Throughput vs. Packet Loss')
-    plt.xlabel('Packet Loss Rate (%)')
-    plt.ylabel('Throughput (bits per second)')
-    plt.legend()
-    plt.grid(True)
+        for name, sender_class in PROTOCOLS:
+            for mode, adaptive in RTO_MODES:
+                stats = {}
+                bps, ratio, spurious_rate = run_protocol_test(sender_class, loss, data_size, name,
+                                                              adaptive_rto=adaptive, stats=stats, metrics=metrics)
+                if metrics.aborted:
+                    break  # the interrupted run is dropped, as network_sender does
+                if loss == 0 and stats["srtt_s"]:
+                    srtts.append(stats["srtt_s"])
+                goodput[(name, mode)].append(bps)
+                rtos[(name, mode)].append(stats["rto_s"])
+                retx_ratio[(name, mode)].append(ratio)
+                spurious[(name, mode)].append(spurious_rate * 100)
+                print(f"{loss*100:<8.1f} | {name:<20} | {mode:<8} | {bps:>14.0f} | {ratio:>10.2f} | {spurious_rate*100:>11.1f}%")
+            if metrics.aborted:
+                break
+        if metrics.aborted:
+            print(f"\nSweep aborted from the metrics viewer at {loss*100:g}% loss; summarizing the finished runs")
+            break
+    if not srtts:
+        raise SystemExit("No loss-free run finished, so there is nothing to compare against")
+
+    # Analytic predictions at the loopback RTT measured on the loss-free runs
+    base_rtt = float(np.median(srtts))
+    df = throughput_model.annotate(pd.DataFrame(
+        [dict(experiment="loss", protocol=name, rto=mode, loss=loss, rtt_ms=0.0, goodput_bps=goodput[(name, mode)][i],
+              rto_s=rtos[(name, mode)][i])
+         for name, mode in runs for i, loss in enumerate(loss_rates[:len(goodput[(name, mode)])])]),
+        base_rtt_ms=base_rtt * 1000)
+    flagged = df[df["emulator_bound"] | df["model_miss"]]
+    print(f"\nModels at {base_rtt*1000:.2f} ms loopback RTT: {int(df['emulator_bound'].sum())} runs emulator-bound, "
+          f"{int(df['model_miss'].sum())} below half the prediction")
+    for _, row in flagged.iterrows():
+        print(f"  {row['protocol']:<20} | {row['rto']:<8} | loss {row['loss']*100:>5.1f}% | measured {row['goodput_bps']:>12.0f} | "
+              f"model {row['model_bps']:>12.0f} | {'emulator-bound' if row['emulator_bound'] else 'model miss'}")
+
+    # Plotting: solid = adaptive RTO, dashed = fixed-timeout baseline, dotted black = analytic models
+    markers = ['o', 's', 'v', 'P', '^', 'D']
+    fig, (ax_goodput, ax_retx, ax_spurious) = plt.subplots(1, 3, figsize=(20, 6))
+    for (name, _), marker in zip(PROTOCOLS, markers):
+        for mode, adaptive in RTO_MODES:
+            style = dict(marker=marker, linestyle='-' if adaptive else '--', label=f"{name} ({mode} RTO)")
+            losses = [l*100 for l in loss_rates[:len(goodput[(name, mode)])]]  # shorter after an abort
+            ax_goodput.plot(losses, goodput[(name, mode)], **style)
+            ax_retx.plot(losses, retx_ratio[(name, mode)], **style)
+            ax_spurious.plot(losses, spurious[(name, mode)], **style)
+    model_loss = np.linspace(0.001, max(loss_rates), 200)
+    ax_goodput.plot(model_loss * 100, throughput_model.gbn(model_loss, base_rtt, window=10, send_gap=0.001),
+                    color='k', linestyle=':', label='Go-Back-N model (W=10, 1 ms send gap)')
+    ax_goodput.plot(model_loss * 100, throughput_model.padhye(model_loss, base_rtt),
+                    color='tab:gray', linestyle=':', label='Padhye model (Reno)')
+    ax_goodput.plot(model_loss * 100, throughput_model.mathis(model_loss, base_rtt),
+                    color='tab:gray', linestyle='-.', label='Mathis model (Reno)')
+    ax_goodput.set_yscale('log')
+    ax_goodput.set_title('Protocol Comparison: Goodput vs. Packet Loss')
+    ax_goodput.set_ylabel('Goodput (bits per second)')
+    ax_retx.set_title('Retransmissions per Unique Packet vs. Packet Loss')
+    ax_retx.set_ylabel('Retransmission Ratio')
+    ax_spurious.set_title('Spurious Timeouts vs. Packet Loss')
+    ax_spurious.set_ylabel('Spurious Timeouts (% of timeouts)')
+    for ax in (ax_goodput, ax_retx, ax_spurious):
+        ax.set_xlabel('Packet Loss Rate (%)')
+        ax.legend(fontsize='small')
+        ax.grid(True)
+    plt.tight_layout()
     plt.savefig('protocol_comparison_plot.png')
     print("\nComparison plot saved as 'protocol_comparison_plot.png'")
@@ -0,0 +1,262 @@
+import math
+from collections import deque
+
+
+class CongestionControl:
+    """
+    Interface shared by the congestion controllers TCPSimSender can use.
+
+    cwnd is in packets. pacing_rate() returns packets/sec for the Pacer, or
+    None to send unpaced (before the first RTT sample). The sender calls
+    on_ack for every new cumulative ACK, on_fast_retransmit after three
+    duplicate ACKs, and on_timeout when its RTO fires.
+    """
+
+    name = "base"
+
+    def __init__(self, initial_cwnd=1.0, ssthresh=64):
+        self.cwnd = initial_cwnd
+        self.ssthresh = ssthresh
+
+    def on_ack(self, acked, rtt, now, inflight):
+        raise NotImplementedError
+
+    def on_fast_retransmit(self, now):
+        raise NotImplementedError
+
+    def on_timeout(self, now):
+        raise NotImplementedError
+
+    def pacing_rate(self, rtt):
+        # Linux-style: spread cwnd over one SRTT, with headroom to keep growing
+        if rtt.srtt is None or rtt.srtt <= 0:
+            return None
+        gain = 2.0 if self.cwnd < self.ssthresh else 1.2
+        return gain * self.cwnd / rtt.srtt
+
+
+class Reno(CongestionControl):
+    """Slow start + AIMD, exactly as TCPSimSender did it before."""
+
+    name = "reno"
+
+    def on_ack(self, acked, rtt, now, inflight):
+        if self.cwnd < self.ssthresh:
+            self.cwnd += 1  # Slow Start
+        else:
+            self.cwnd += 1.0 / int(self.cwnd)  # Congestion Avoidance
+
+    def on_fast_retransmit(self, now):
+        self.ssthresh = max(self.cwnd / 2, 2)
+        self.cwnd = self.ssthresh
+
+    def on_timeout(self, now):
+        self.ssthresh = max(self.cwnd / 2, 2)
+        self.cwnd = 1.0
+
+
+class Cubic(CongestionControl):
+    """
+    CUBIC (RFC 8312): after a loss, cwnd follows W(t) = C(t - K)^3 + W_max,
+    flattening out near the previous maximum and probing beyond it, with
+    the Reno-friendly estimate as a floor.
+    """
+
+    name = "cubic"
+
+    def __init__(self, c=0.4, beta=0.7, fast_convergence=True, **kwargs):
+        super().__init__(**kwargs)
+        self.c = c
+        self.beta = beta
+        self.fast_convergence = fast_convergence
+        self.w_max = 0.0
+        self.k = 0.0
+        self.epoch_start = None
+        self.w_est = self.cwnd
+
+    def on_ack(self, acked, rtt, now, inflight):
+        if self.cwnd < self.ssthresh:
+            self.cwnd += 1
+            return
+
+        if self.epoch_start is None:
+            self.epoch_start = now
+            if self.cwnd < self.w_max:
+                self.k = ((self.w_max - self.cwnd) / self.c) ** (1 / 3)
+            else:
+                self.k = 0.0
+                self.w_max = self.cwnd
+            self.w_est = self.cwnd
+
+        t = now - self.epoch_start + (rtt.srtt or 0.0)
+        target = self.c * (t - self.k) ** 3 + self.w_max
+        if target > self.cwnd:
+            self.cwnd += (target - self.cwnd) / self.cwnd
+        else:
+            self.cwnd += 0.01 / self.cwnd
+
+        # Reno-friendly region
+        self.w_est += 3 * (1 - self.beta) / (1 + self.beta) / self.cwnd
+        self.cwnd = max(self.cwnd, self.w_est)
+
+    def reduce(self):
+        if self.fast_convergence and self.cwnd < self.w_max:
+            self.w_max = self.cwnd * (1 + self.beta) / 2
+        else:
+            self.w_max = self.cwnd
+        self.epoch_start = None
+        self.ssthresh = max(self.cwnd * self.beta, 2)
+
+    def on_fast_retransmit(self, now):
+        self.reduce()
+        self.cwnd = self.ssthresh
+
+    def on_timeout(self, now):
+        self.reduce()
+        self.cwnd = 1.0
+
+
+class BBR(CongestionControl):
+    """
+    BBR-style model-based control: estimates bottleneck bandwidth (windowed
+    max of delivery rate) and min RTT, paces at gain * bandwidth and caps
+    cwnd at 2 * BDP. Loss is not treated as a congestion signal.
+
+    States: STARTUP (2/ln2 gain until bandwidth stops growing 25% for three
+    rounds), DRAIN (empty the queue STARTUP built), PROBE_BW (8-phase gain
+    cycle, one phase per min RTT).
+    """
+
+    name = "bbr"
+
+    STARTUP_GAIN = 2 / math.log(2)
+    PROBE_BW_GAINS = [1.25, 0.75, 1, 1, 1, 1, 1, 1]
+    CWND_GAIN = 2.0
+    MIN_CWND = 4
+    MIN_RTT_WINDOW = 10.0  # seconds
+    BW_WINDOW_ROUNDS = 10
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.cwnd = max(self.cwnd, self.MIN_CWND)
+        self.state = "STARTUP"
+        self.pacing_gain = self.STARTUP_GAIN
+        self.btl_bw = 0.0  # packets/sec
+        self.min_rtt = None
+        self.min_rtt_stamp = 0.0
+
+        self.delivered = 0
+        self.delivery_marks = deque()  # (time, delivered) over the last min RTT
+        self.bw_samples = deque()  # (round, rate)
+        self.round_count = 0
+        self.next_round_delivered = 0
+
+        self.full_bw = 0.0
+        self.full_bw_rounds = 0
+        self.cycle_index = 0
+        self.cycle_stamp = 0.0
+
+    def bdp(self):
+        if self.min_rtt is None or not self.btl_bw:
+            return None
+        return self.btl_bw * self.min_rtt
+
+    def on_ack(self, acked, rtt, now, inflight):
+        self.delivered += acked
+        if rtt.latest_rtt is not None and (self.min_rtt is None or rtt.latest_rtt <= self.min_rtt
+                                           or now - self.min_rtt_stamp > self.MIN_RTT_WINDOW):
+            self.min_rtt = rtt.latest_rtt
+            self.min_rtt_stamp = now
+
+        round_start = self.delivered >= self.next_round_delivered
+        if round_start:
+            self.round_count += 1
+            self.next_round_delivered = self.delivered + max(inflight, 1)
+
+        # Delivery rate over (roughly) the last min RTT
+        self.delivery_marks.append((now, self.delivered))
+        horizon = now - (self.min_rtt or 0.0)
+        while len(self.delivery_marks) > 2 and self.delivery_marks[1][0] <= horizon:
+            self.delivery_marks.popleft()
+        t0, d0 = self.delivery_marks[0]
+        if now > t0:
+            self.bw_samples.append((self.round_count, (self.delivered - d0) / (now - t0)))
+        while self.bw_samples and self.bw_samples[0][0] <= self.round_count - self.BW_WINDOW_ROUNDS:
+            self.bw_samples.popleft()
+        self.btl_bw = max((rate for _, rate in self.bw_samples), default=0.0)
+
+        self.update_state(now, inflight, round_start)
+
+        bdp = self.bdp()
+        if bdp is not None:
+            self.cwnd = max(self.MIN_CWND, self.CWND_GAIN * bdp)
+        elif self.state == "STARTUP":
+            self.cwnd += acked  # no model yet: grow like slow start
+
+    def update_state(self, now, inflight, round_start):
+        if self.state == "STARTUP" and round_start:
+            if self.btl_bw >= self.full_bw * 1.25:
+                self.full_bw = self.btl_bw
+                self.full_bw_rounds = 0
+            else:
+                self.full_bw_rounds += 1
+                if self.full_bw_rounds >= 3:
+                    self.state = "DRAIN"
+                    self.pacing_gain = 1 / self.STARTUP_GAIN
+
+        if self.state == "DRAIN":
+            bdp = self.bdp()
+            if bdp is None or inflight <= bdp:
+                self.state = "PROBE_BW"
+                self.cycle_index = 0
+                self.cycle_stamp = now
+                self.pacing_gain = self.PROBE_BW_GAINS[0]
+
+        if self.state == "PROBE_BW" and self.min_rtt and now - self.cycle_stamp > self.min_rtt:
+            self.cycle_index = (self.cycle_index + 1) % len(self.PROBE_BW_GAINS)
+            self.cycle_stamp = now
+            self.pacing_gain = self.PROBE_BW_GAINS[self.cycle_index]
+
+    def on_fast_retransmit(self, now):
+        pass  # the model, not loss, sets the rate
+
+    def on_timeout(self, now):
+        # Go conservative until ACKs refresh the model
+        self.cwnd = self.MIN_CWND
+
+    def pacing_rate(self, rtt):
+        if not self.btl_bw:
+            return None
+        return self.pacing_gain * self.btl_bw
+
+
+CONTROLLERS = {cls.name: cls for cls in (Reno, Cubic, BBR)}
+
+
+def make_controller(cc):
+    """Accepts a controller name ("reno", "cubic", "bbr") or an instance."""
+    if isinstance(cc, CongestionControl):
+        return cc
+    return CONTROLLERS[cc]()
+
+
+class Pacer:
+    """
+    Spreads sends at a given rate instead of bursting the whole window.
+    Up to max_burst packets of credit can build up, so timer/sleep jitter
+    does not turn into lost sending opportunities.
+    """
+
+    def __init__(self, max_burst=2):
+        self.max_burst = max_burst
+        self.next_send_time = 0.0
+
+    def delay(self, now):
+        """Seconds to wait before the next packet may go out (0 if now)."""
+        return max(0.0, self.next_send_time - now)
+
+    def on_send(self, now, rate):
+        if not rate:
+            return
+        interval = 1.0 / rate
+        self.next_send_time = max(self.next_send_time, now - self.max_burst * interval) + interval
@@ -0,0 +1,57 @@
+import heapq
+import itertools
+import time
+
+
+class DelayLine:
+    """
+    Scheduled delay line: a heap of (deliver_at, seq, item).
+
+    Items are released by whichever event loop owns the line (see
+    next_timeout / pop_due), so any number of packets can be in flight at
+    once instead of each one blocking the loop for the full delay.
+
+    With bandwidth_bps set, items are also serialised onto a bottleneck link:
+    each one occupies the link for size*8/bandwidth seconds before its
+    propagation delay starts. In-flight capacity is then the usual
+    bandwidth-delay product.
+    """
+
+    def __init__(self, bandwidth_bps=None):
+        self.bandwidth_bps = bandwidth_bps
+        self.heap = []
+        self.counter = itertools.count()  # FIFO tie-break for equal deadlines
+        self.link_free_at = 0.0
+
+    def __len__(self):
+        return len(self.heap)
+
+    def schedule(self, delay, item, size=0, now=None):
+        if now is None:
+            now = time.monotonic()
+        start = now
+        if self.bandwidth_bps:
+            start = max(now, self.link_free_at) + (size * 8) / self.bandwidth_bps
+            self.link_free_at = start
+        deliver_at = start + delay
+        heapq.heappush(self.heap, (deliver_at, next(self.counter), item))
+        return deliver_at
+
+    def next_timeout(self, now=None):
+        """Seconds until the next item is due (None if the line is empty)."""
+        if not self.heap:
+            return None
+        if now is None:
+            now = time.monotonic()
+        return max(0.0, self.heap[0][0] - now)
+
+    def pop_due(self, now=None):
+        if now is None:
+            now = time.monotonic()
+        heap = self.heap
+        while heap and heap[0][0] <= now:
+            yield heapq.heappop(heap)[2]
+
+    def clear(self):
+        self.heap.clear()
+        self.link_free_at = 0.0
@@ -0,0 +1,266 @@
+import multiprocessing
+import os
+import selectors
+import sys
+import time
+from functools import partial
+
+import numpy as np
+import matplotlib.pyplot as plt
+
+from comparative_analyzer import UDPSender, TCPSimSender, service_window
+from congestion_control import Pacer
+from netem_proxy import DropTail, Link, NetemProxy
+from network_receiver import start_receiver
+from packet_format import configure_run, new_run_id, parse_ack
+from stream_transfer import generate_data
+
+RECEIVER_PORT = 12360
+PROXY_PORT = 12361
+
+
+def jain_index(rates):
+    """Jain's fairness index: 1 when all rates are equal, 1/n when one flow takes everything."""
+    rates = np.asarray(rates, dtype=float)
+    if len(rates) == 0 or not rates.any():
+        return float("nan")
+    return rates.sum() ** 2 / (len(rates) * (rates ** 2).sum())
+
+
+class Flow:
+    """One sender in the experiment, plus what the event loop needs to drive and measure it."""
+
+    def __init__(self, name, sender, start_offset):
+        self.name = name
+        self.sender = sender
+        self.start_offset = start_offset
+        self.pacer = Pacer()
+        self.wake_at = None
+        self.started = None
+        self.finished = None
+        self.acked_bins = []  # packets newly acknowledged in each bin
+
+    def count_acked(self, bin_index, packets):
+        if bin_index >= len(self.acked_bins):
+            self.acked_bins.extend([0] * (bin_index + 1 - len(self.acked_bins)))
+        self.acked_bins[bin_index] += packets
+
+
+def _receiver_process(host, port):
+    sys.stdout = open(os.devnull, "w")
+    start_receiver(host, port)
+
+
+def _proxy_process(host, listen_port, target_port, bottleneck_mbps, queue_limit, delay_ms, seed):
+    forward = Link(rate_bps=bottleneck_mbps * 1e6, queue=DropTail(queue_limit), delay=delay_ms / 2000, seed=seed)
+    reverse = Link(delay=delay_ms / 2000)
+    NetemProxy((host, listen_port), (host, target_port), forward, reverse).run()
+
+
+def run_flows(flows, duration, host='127.0.0.1', port=PROXY_PORT, bin_s=0.25):
+    """
+    Drives every flow from one selectors loop: no threads and no locks, so
+    hundreds of flows cost one socket each. Flows start at their
+    start_offset (seconds), each as its own run on the receiver, and all
+    stop duration seconds after the loop starts (iperf-style). Returns the
+    loop start time.
+
+    Every run is configured before the loop starts: configure_run blocks
+    until the receiver replies, and inside the loop it would stall the
+    timers and ACK handling of every flow already running.
+    """
+    for flow in flows:
+        sender = flow.sender
+        sender.host, sender.port = host, port
+        configure_run(sender.sock, (host, port), new_run_id(), mode=sender.receiver_mode)
+        sender.sock.setblocking(False)
+
+    selector = selectors.DefaultSelector()
+    pending = sorted(flows, key=lambda f: f.start_offset)
+    active = []
+    t0 = time.monotonic()
+    end = t0 + duration
+
+    while (pending or active) and time.monotonic() < end:
+        now = time.monotonic()
+        while pending and t0 + pending[0].start_offset <= now:
+            flow = pending.pop(0)
+            selector.register(flow.sender.sock, selectors.EVENT_READ, flow)
+            flow.started = flow.wake_at = time.monotonic()
+            active.append(flow)
+
+        wakes = [end] + [f.wake_at for f in active if f.wake_at is not None]
+        if pending:
+            wakes.append(t0 + pending[0].start_offset)
+        timeout = max(0.0, min(wakes) - time.monotonic())
+
+        for key, _ in selector.select(timeout):
+            flow = key.data
+            sender = flow.sender
+            base = sender.base
+            while True:
+                try:
+                    data = sender.sock.recv(1024)
+                except BlockingIOError:
+                    break
+                ack = parse_ack(data)
+                if ack is not None:
+                    sender.on_ack(*ack)
+            if sender.base > base:
+                flow.count_acked(int((time.monotonic() - t0) / bin_s), sender.base - base)
+            flow.wake_at = time.monotonic()  # the window may have opened
+
+        now = time.monotonic()
+        for flow in active:
+            if flow.wake_at is None or flow.wake_at > now:
+                continue
+            wait = service_window(flow.sender, flow.pacer)
+            flow.wake_at = None if wait is None else time.monotonic() + wait
+
+        for flow in [f for f in active if f.sender.base >= len(f.sender.packets)]:
+            flow.finished = time.monotonic()
+            selector.unregister(flow.sender.sock)
+            flow.sender.sock.close()
+            active.remove(flow)
+
+    for flow in active:
+        flow.finished = time.monotonic()
+        flow.sender.sock.close()
+    for flow in pending:
+        flow.started = flow.finished = end  # never got to start
+    selector.close()
+    return t0
+
+
+def analyze(flows, t0, bin_s=0.25, chunk_size=1024, threshold=0.9):
+    """
+    Per-flow goodput, Jain's index per time bin (over the flows active for
+    the whole bin), and convergence time: how long after the last flow
+    starts until the index stays at or above threshold for as long as all
+    flows are running.
+    """
+    n_bins = max(len(f.acked_bins) for f in flows)
+    rates = np.zeros((len(flows), n_bins))
+    active = np.zeros((len(flows), n_bins), dtype=bool)
+    bin_start = np.arange(n_bins) * bin_s
+    for i, flow in enumerate(flows):
+        rates[i, :len(flow.acked_bins)] = np.array(flow.acked_bins) * chunk_size * 8 / bin_s
+        active[i] = (bin_start >= flow.started - t0) & (bin_start + bin_s <= flow.finished - t0)
+
+    jain = np.array([jain_index(rates[active[:, b], b]) if active[:, b].sum() >= 2 else np.nan
+                     for b in range(n_bins)])
+
+    last_start = max(f.started for f in flows) - t0
+    first_finish = min(f.finished for f in flows) - t0
+    shared = (bin_start >= last_start) & (bin_start + bin_s <= first_finish)
+    convergence = None
+    shared_bins = np.flatnonzero(shared)
+    for b in shared_bins:
+        if np.all(jain[shared_bins[shared_bins >= b]] >= threshold):
+            convergence = bin_start[b] - last_start
+            break
+
+    per_flow = []
+    for i, flow in enumerate(flows):
+        duration = flow.finished - flow.started
+        per_flow.append(dict(name=flow.name, start=flow.started - t0, duration=duration,
+                             goodput_bps=sum(flow.acked_bins) * chunk_size * 8 / duration if duration > 0 else 0.0,
+                             shared_bps=rates[i, shared].mean() if shared.any() else float("nan"),
+                             retransmissions=flow.sender.retransmissions))
+    shared_jain = jain_index([f["shared_bps"] for f in per_flow]) if shared.any() else float("nan")
+    return dict(flows=per_flow, rates=rates, jain=jain, bin_s=bin_s, shared_jain=shared_jain,
+                convergence_time=convergence)
+
+
+def run_fairness(flow_specs, duration=15.0, bottleneck_mbps=20, queue_limit=100, delay_ms=20,
+                 bin_s=0.25, threshold=0.9, host='127.0.0.1', seed=1):
+    """
+    flow_specs: list of (name, sender_factory, start_offset_s). Every flow
+    streams until duration seconds after the first start, through one shared
+    NetemProxy bottleneck (token bucket + drop-tail queue, delay_ms RTT) in
+    front of one multi-session network_receiver.
+    """
+    receiver = multiprocessing.Process(target=_receiver_process, args=(host, RECEIVER_PORT), daemon=True)
+    proxy = multiprocessing.Process(target=_proxy_process, daemon=True,
+                                    args=(host, PROXY_PORT, RECEIVER_PORT, bottleneck_mbps, queue_limit, delay_ms, seed))
+    receiver.start()
+    proxy.start()
+    time.sleep(0.5)  # let both bind
+
+    flows = []
+    for name, factory, start_offset in flow_specs:
+        sender = factory()
+        # Endless source, generated lazily: memory per flow is just the sender's ring
+        sender.create_stream(generate_data(1 << 40, block_size=64 * 1024 + 7, seed=len(flows)))
+        flows.append(Flow(name, sender, start_offset))
+
+    try:
+        cpu_start = time.process_time()
+        t0 = run_flows(flows, duration, host, PROXY_PORT, bin_s)
+        cpu = time.process_time() - cpu_start
+    finally:
+        proxy.terminate()
+        receiver.terminate()
+        proxy.join()
+        receiver.join()
+
+    result = analyze(flows, t0, bin_s, threshold=threshold)
+    result["loop_cpu_s"] = cpu
+    return result
+
+
+def print_report(result, title):
+    print(f"\n{title}")
+    print("=" * 84)
+    print(f"{'Flow':<24} | {'Start (s)':>9} | {'Duration (s)':>12} | {'Goodput (bps)':>14} | {'Shared (bps)':>13} | {'Retx':>5}")
+    print("-" * 84)
+    for f in result["flows"]:
+        print(f"{f['name']:<24} | {f['start']:>9.2f} | {f['duration']:>12.2f} | {f['goodput_bps']:>14.0f} | "
+              f"{f['shared_bps']:>13.0f} | {f['retransmissions']:>5}")
+    print("-" * 84)
+    convergence = result["convergence_time"]
+    print(f"Jain's index while all flows share the link: {result['shared_jain']:.3f}")
+    print(f"Convergence time: {'never' if convergence is None else f'{convergence:.2f}s'}, "
+          f"event loop CPU: {result['loop_cpu_s']:.2f}s")
+
+
+def plot_result(result, path='fairness_plot.png'):
+    t = np.arange(result["rates"].shape[1]) * result["bin_s"]
+    fig, (ax_rate, ax_jain) = plt.subplots(2, 1, figsize=(14, 9), sharex=True)
+    for flow, rates in zip(result["flows"], result["rates"]):
+        ax_rate.plot(t, rates / 1e6, label=flow["name"])
+    ax_rate.set_title('Per-flow Goodput through the Shared Bottleneck')
+    ax_rate.set_ylabel('Goodput (Mbit/s)')
+    ax_rate.legend(fontsize='small', ncol=2)
+    ax_rate.grid(True)
+    ax_jain.plot(t, result["jain"], marker='.')
+    ax_jain.set_title("Jain's Fairness Index over Active Flows")
+    ax_jain.set_ylabel("Jain's index")
+    ax_jain.set_xlabel('Time (s)')
+    ax_jain.set_ylim(0, 1.05)
+    ax_jain.grid(True)
+    plt.tight_layout()
+    plt.savefig(path)
+    print(f"Fairness plot saved as '{path}'")
+
+
+if __name__ == "__main__":
+    # Mixed protocols, one new flow every second
+    mixed = [
+        ("Reno #1", TCPSimSender, 0.0),
+        ("Reno #2", TCPSimSender, 1.0),
+        ("CUBIC #1", partial(TCPSimSender, cc="cubic"), 2.0),
+        ("CUBIC #2", partial(TCPSimSender, cc="cubic"), 3.0),
+        ("BBR-like", partial(TCPSimSender, cc="bbr"), 4.0),
+        ("UDP (Go-Back-N)", UDPSender, 5.0),
+    ]
+    result = run_fairness(mixed, duration=20.0, bottleneck_mbps=20)
+    print_report(result, "Mixed protocols sharing a 20 Mbit/s bottleneck (20 ms RTT)")
+    plot_result(result)
+
+    # Scale: many Reno flows on the same single event loop
+    many = [(f"Reno #{i}", TCPSimSender, i * 0.01) for i in range(200)]
+    result = run_fairness(many, duration=15.0, bottleneck_mbps=50, queue_limit=400)
+    print(f"\n200 Reno flows over 50 Mbit/s: Jain's index {result['shared_jain']:.3f}, "
+          f"aggregate {sum(f['shared_bps'] for f in result['flows']) / 1e6:.1f} Mbit/s, "
+          f"event loop CPU {result['loop_cpu_s']:.2f}s")
@@ -0,0 +1,453 @@
+import math
+import time
+from functools import lru_cache
+
+import numpy as np
+
+from packet_format import (HEADER, HEADER_SIZE, TS_HEADER_SIZE, MAGIC, FLAG_EOF, FLAG_FEC, FLAG_TS,
+                           FEC_HEADER, parse_fec_report)
+
+CODE_XOR, CODE_RS = 0, 1
+CODES = {"xor": CODE_XOR, "rs": CODE_RS}
+
+# GF(2^8) with the usual 0x11d polynomial. Multiplication is one lookup in a
+# 256x256 table, so a coefficient times a whole symbol is MUL[c, symbol]
+# and a matrix product over symbols is a fancy index plus an XOR reduce.
+_GF_POLY = 0x11D
+_EXP = np.zeros(512, dtype=np.int64)
+_LOG = np.zeros(256, dtype=np.int64)
+_x = 1
+for _i in range(255):
+    _EXP[_i] = _x
+    _LOG[_x] = _i
+    _x <<= 1
+    if _x & 0x100:
+        _x ^= _GF_POLY
+_EXP[255:510] = _EXP[:255]
+MUL = np.zeros((256, 256), dtype=np.uint8)
+MUL[1:, 1:] = _EXP[_LOG[1:, None] + _LOG[None, 1:]]
+INV = np.zeros(256, dtype=np.uint8)
+INV[1:] = _EXP[255 - _LOG[1:]]
+
+
+def gf_matmul(a, b):
+    """(r x k) coefficients times (k x L) symbols over GF(2^8)."""
+    return np.bitwise_xor.reduce(MUL[a[:, :, None], b[None, :, :]], axis=1)
+
+
+def gf_inverse(matrix):
+    """Gauss-Jordan inverse of a square matrix over GF(2^8)."""
+    n = len(matrix)
+    a = np.concatenate((matrix.astype(np.uint8), np.eye(n, dtype=np.uint8)), axis=1)
+    for col in range(n):
+        pivot = col + np.flatnonzero(a[col:, col])[0]
+        if pivot != col:
+            a[[col, pivot]] = a[[pivot, col]]
+        a[col] = MUL[INV[a[col, col]], a[col]]
+        factors = a[:, col].copy()
+        factors[col] = 0
+        a ^= MUL[factors[:, None], a[col][None, :]]
+    return a[:, n:]
+
+
+@lru_cache(maxsize=None)
+def cauchy(k, m):
+    """
+    Parity rows of a systematic Reed-Solomon code: C[j, i] = 1 / (x_j + y_i)
+    with x_j = k + j, y_i = i. Every square submatrix of a Cauchy matrix is
+    invertible, so any k of the k + m packets rebuild the block.
+    """
+    if k + m > 256:
+        raise ValueError(f"k + m must be at most 256, got {k} + {m}")
+    x = np.arange(k, k + m)[:, None]
+    y = np.arange(k)[None, :]
+    return INV[x ^ y]
+
+
+def encode(code, symbols, m):
+    """Parity symbols (m x L) for a block of k symbols (k x L, uint8)."""
+    if code == CODE_XOR:
+        return np.bitwise_xor.reduce(symbols, axis=0, keepdims=True)
+    return gf_matmul(cauchy(len(symbols), m), symbols)
+
+
+def _binomial_tail(n, p, more_than):
+    """P(X > more_than) for X ~ Binomial(n, p)."""
+    return sum(math.comb(n, i) * p ** i * (1 - p) ** (n - i) for i in range(more_than + 1, n + 1))
+
+
+@lru_cache(maxsize=4096)
+def parity_needed(k, loss, target, max_parity):
+    """Fewest parity packets for which a k-packet block fails to decode with probability <= target."""
+    for m in range(max_parity + 1):
+        if _binomial_tail(k + m, loss, m) <= target:
+            return m
+    return max_parity
+
+
+@lru_cache(maxsize=4096)
+def xor_block_size(max_k, loss):
+    """Block size that gets the most data through one XOR parity: k / (k + 1) * P(at most one loss)."""
+    return max(range(1, max_k + 1), key=lambda k: k / (k + 1) * (1 - _binomial_tail(k + 1, loss, 1)))
+
+
+def _symbols(datagrams, length):
+    """
+    Datagrams as zero-padded rows. Send timestamps are zeroed: a
+    retransmission carries a new one, and must still match the copy the
+    parity was computed over.
+    """
+    symbols = np.zeros((len(datagrams), length), dtype=np.uint8)
+    for row, data in zip(symbols, datagrams):
+        row[:len(data)] = np.frombuffer(data, dtype=np.uint8)
+    symbols[(symbols[:, 1] & FLAG_TS) != 0, HEADER_SIZE:TS_HEADER_SIZE] = 0
+    return symbols
+
+
+class FecEncoder:
+    """
+    Sender half of the FEC layer. Packets are grouped into blocks of
+    consecutive seqs in the order they are sent, retransmissions included
+    (a go-back-N resend is protected like the first copy), and each block
+    is followed by its parity packets.
+
+    code="xor" sends one parity packet per block and picks the block size
+    (up to k) that gets the most data through at the estimated loss.
+    code="rs" keeps blocks of k packets and adds the fewest parity packets
+    for which a block fails with probability at most target, unless parity
+    fixes the count.
+
+    Loss is estimated from the receive reports the receiver puts in its
+    ACKs (see on_ack), as lost / sent over roughly the last history
+    datagrams. A block also closes when no packet has joined it for
+    half an RTT, so a stalled window still gets its parity out instead of
+    waiting for the retransmission timer.
+    """
+
+    def __init__(self, code="rs", k=8, parity=None, target=0.01, initial_loss=0.05,
+                 history=64, min_hold=0.002):
+        self.code = CODES[code]
+        self.k = k
+        self.parity = parity
+        self.target = target
+        self.loss = initial_loss
+        self.min_hold = min_hold
+
+        self.block = []  # datagrams of the open block
+        self.block_k = k
+        self.first = None
+        self.last_add = 0.0
+
+        self.sent = 0  # every datagram, data and parity
+        self.parity_sent = 0
+        self.blocks = 0
+        self.mark_sent = 0
+        self.mark_received = 0
+        # Exponentially decayed counts; initial_loss counts as a few datagrams of history
+        self.decay = 1 - 1 / history
+        self.sent_weight = 8.0
+        self.lost_weight = initial_loss * self.sent_weight
+
+    def block_size(self):
+        if self.code == CODE_XOR:
+            return xor_block_size(self.k, round(self.loss, 2))
+        return self.k
+
+    def parity_count(self, k):
+        if self.code == CODE_XOR:
+            return 1
+        if self.parity is not None:
+            return self.parity
+        return parity_needed(k, min(round(self.loss, 2), 0.99), self.target, 256 - k)
+
+    def on_send(self, seq, packet, now):
+        """Called for every data packet sent. Returns the parity packets to send right after it."""
+        self.sent += 1
+        parity = []
+        if self.block and seq != self.first + len(self.block):
+            parity = self.close()  # sender went back: the resend starts a new block
+        if not self.block:
+            self.first = seq
+            self.block_k = self.block_size()
+        self.block.append(bytes(packet))
+        self.last_add = now
+        if len(self.block) >= self.block_k or packet[1] & FLAG_EOF:
+            parity += self.close()
+        return parity
+
+    def hold_until(self, srtt):
+        """When the open block closes if nothing else joins it."""
+        return self.last_add + max(self.min_hold, (srtt or 0.0) / 2)
+
+    def close(self):
+        """Ends the open block, returning its parity packets."""
+        k = len(self.block)
+        m = self.parity_count(k)
+        self.blocks += 1
+        length = max(len(d) for d in self.block)
+        parity = encode(self.code, _symbols(self.block, length), m)
+        header = HEADER.pack(MAGIC, FLAG_FEC, FEC_HEADER.size + length, self.first)
+        self.block = []
+        self.sent += m
+        self.parity_sent += m
+        return [header + FEC_HEADER.pack(self.code, k, m, j) + parity[j].tobytes() for j in range(m)]
+
+    def on_ack(self, data):
+        """Folds the receive report carried by an ACK (if any) into the loss estimate."""
+        received = parse_fec_report(data)
+        if received is None or received <= self.mark_received:
+            return
+        # Datagrams still in flight count as lost here and are credited back
+        # by a later report (received can then exceed sent for the interval)
+        self.fold(self.sent - self.mark_sent, received - self.mark_received)
+        self.mark_sent = self.sent
+        self.mark_received = received
+
+    def on_timeout(self):
+        """
+        Retransmission timeout: until a report says otherwise, everything
+        sent since the last one is taken as lost. Without this a sender
+        whose every packet is lost would never see a report to learn from.
+        """
+        self.fold(self.sent - self.mark_sent, 0)
+        self.mark_sent = self.sent
+
+    def fold(self, sent, received):
+        decay = self.decay ** sent
+        self.sent_weight = self.sent_weight * decay + sent
+        self.lost_weight = self.lost_weight * decay + sent - received
+        self.loss = min(max(self.lost_weight / self.sent_weight, 0.0), 0.99)
+
+
+class FecDecoder:
+    """
+    Receiver half: keeps recently received data packets and the parity of
+    blocks that still have holes, and rebuilds missing packets once any k of
+    a block's k + m packets are in. Rebuilt packets are the original
+    datagrams, header included, except for a zeroed send timestamp.
+    """
+
+    def __init__(self):
+        self.sources = {}  # seq -> datagram
+        # (first seq, k, m) -> (code, {parity index: symbol}). Timestamps are
+        # not encoded, so every copy of a block gives the same parity.
+        self.blocks = {}
+        self.max_k = 1
+        self.parity_received = 0
+        self.recovered = 0
+
+    def clear(self):
+        self.sources.clear()
+        self.blocks.clear()
+        self.parity_received = 0
+        self.recovered = 0
+
+    def add_source(self, seq, data):
+        """Stores a data packet; returns any packets its arrival lets the decoder rebuild."""
+        self.sources[seq] = data
+        for key in self.blocks:
+            first, k, _ = key
+            if first <= seq < first + k:
+                return self.decode(key)
+        return []
+
+    def add_parity(self, data, delivered):
+        """
+        Stores a parity packet; returns the packets it lets the decoder
+        rebuild. delivered is the receiver's next expected seq: blocks below
+        it are complete already, and older data packets are dropped.
+        """
+        self.parity_received += 1
+        _, _, length, first = HEADER.unpack_from(data)
+        code, k, m, index = FEC_HEADER.unpack_from(data, HEADER_SIZE)
+        if first + k <= delivered:
+            return []
+        self.max_k = max(self.max_k, k)
+        key = (first, k, m)
+        start = HEADER_SIZE + FEC_HEADER.size
+        self.blocks.setdefault(key, (code, {}))[1][index] = data[start:start + length - FEC_HEADER.size]
+
+        floor = delivered - self.max_k
+        for seq in [s for s in self.sources if s < floor]:
+            del self.sources[seq]
+        for old in [b for b in self.blocks if b[0] + b[1] <= delivered]:
+            del self.blocks[old]
+        return self.decode(key)
+
+    def decode(self, key):
+        first, k, m = key
+        code, parity = self.blocks[key]
+        present = [i for i in range(k) if first + i in self.sources]
+        missing = [i for i in range(k) if first + i not in self.sources]
+        if not missing:
+            del self.blocks[key]
+            return []
+        if len(present) + len(parity) < k:
+            return []
+        del self.blocks[key]
+
+        length = len(next(iter(parity.values())))
+        known = _symbols([self.sources[first + i] for i in present], length)
+        if code == CODE_XOR:
+            rebuilt = np.bitwise_xor.reduce(np.vstack((known, _symbols(list(parity.values()), length))),
+                                            axis=0, keepdims=True)
+        else:
+            # Parity rows minus what the packets we have contribute leaves a
+            # small square Cauchy system in the missing packets only
+            rows = sorted(parity)[:len(missing)]
+            coefficients = cauchy(k, m)
+            rhs = _symbols([parity[j] for j in rows], length)
+            if present:
+                rhs ^= gf_matmul(coefficients[np.ix_(rows, present)], known)
+            rebuilt = gf_matmul(gf_inverse(coefficients[np.ix_(rows, missing)]), rhs)
+
+        packets = []
+        for i, symbol in zip(missing, rebuilt):
+            magic, flags, payload_length, seq = HEADER.unpack_from(symbol)
+            if magic != MAGIC or seq != first + i:
+                continue  # block was not what the parity describes (sender restarted?)
+            size = (TS_HEADER_SIZE if flags & FLAG_TS else HEADER_SIZE) + payload_length
+            packets.append(symbol[:size].tobytes())
+        self.recovered += len(packets)
+        return packets
+
+
+def benchmark(k=16, chunk_size=1024, rounds=20):
+    """Encode and decode throughput of both codes over one block of k packets."""
+    rng = np.random.default_rng(0)
+    symbols = rng.integers(0, 256, (k, chunk_size + TS_HEADER_SIZE), dtype=np.uint8)
+    rows = []
+    for name, code, m in (("XOR", CODE_XOR, 1), ("Reed-Solomon", CODE_RS, 4), ("Reed-Solomon", CODE_RS, k)):
+        best_encode = best_decode = float("inf")
+        parity = encode(code, symbols, m)
+        lost = list(range(m))  # worst case for the decoder: as many data packets lost as there is parity
+        kept = [i for i in range(k) if i not in lost]
+        for _ in range(rounds):
+            start = time.perf_counter()
+            encode(code, symbols, m)
+            best_encode = min(best_encode, time.perf_counter() - start)
+            start = time.perf_counter()
+            if code == CODE_XOR:
+                rebuilt = np.bitwise_xor.reduce(np.vstack((symbols[kept], parity)), axis=0, keepdims=True)
+            else:
+                rhs = parity ^ gf_matmul(cauchy(k, m)[:, kept], symbols[kept])
+                rebuilt = gf_matmul(gf_inverse(cauchy(k, m)[:, lost]), rhs)
+            best_decode = min(best_decode, time.perf_counter() - start)
+        assert np.array_equal(rebuilt, symbols[lost])
+        mbits = symbols.size * 8 / 1e6
+        rows.append((f"{name} k={k} m={m}", mbits / best_encode, mbits / best_decode))
+
+    print(f"\nFEC codec throughput ({k} x {chunk_size}B blocks, data Mbit/s)")
+    print("=" * 58)
+    print(f"{'Code':<26} | {'Encode':>12} | {'Decode':>12}")
+    print("-" * 58)
+    for name, enc, dec in rows:
+        print(f"{name:<26} | {enc:>12.0f} | {dec:>12.0f}")
+    print("=" * 58)
+    return rows
+
+
+def _receiver_process(host, port):
+    import os
+    import random
+    import sys
+    from network_receiver import start_receiver
+    random.seed()
+    sys.stdout = open(os.devnull, "w")
+    start_receiver(host, port)
+
+
+def run_fec_test(sender_factory, loss, data_kb, fec=None, host='127.0.0.1', port=12370, deadline_s=30.0):
+    """
+    One transfer through network_receiver at the given loss rate, with
+    fec=None (retransmission only) or FecEncoder keyword arguments. Runs
+    that have not finished after deadline_s count as never completing.
+    """
+    import threading
+    from comparative_analyzer import drive_window_sender
+    from packet_format import configure_run, new_run_id
+
+    sender = sender_factory(host=host, port=port)
+    sender.create_packets(np.random.default_rng(0).bytes(data_kb * 1024))
+    sender.fec = FecEncoder(**fec) if fec is not None else None
+    configure_run(sender.sock, (host, port), new_run_id(), mode=sender.receiver_mode, loss=loss,
+                  fec=fec is not None)
+
+    listener = threading.Thread(target=sender.ack_listener)
+    listener.start()
+    start = time.monotonic()
+    drive_window_sender(sender, send_gap=0.001, deadline=start + deadline_s)
+    duration = time.monotonic() - start
+    sender.running = False
+    listener.join()
+    sender.sock.close()
+
+    complete = sender.base >= len(sender.packets)
+    parity = sender.fec.parity_sent if sender.fec is not None else 0
+    return dict(goodput_bps=data_kb * 1024 * 8 / duration if complete else 0.0,
+                completion_s=duration if complete else float("inf"),
+                retransmissions=sender.retransmissions,
+                overhead=(sender.packets_sent + parity) / len(sender.packets) - 1,
+                loss_estimate=sender.fec.loss if sender.fec is not None else float("nan"))
+
+
+if __name__ == "__main__":
+    import multiprocessing
+    from functools import partial
+    import matplotlib.pyplot as plt
+    from comparative_analyzer import UDPSender, TCPSimSender
+
+    benchmark()
+
+    loss_rates = [0.1, 0.3, 0.5, 0.7, 0.9]
+    protocols = [("Go-Back-N", partial(UDPSender, window_size=16)), ("TCP-Sim (Reno)", TCPSimSender)]
+    variants = [("ARQ only", None), ("XOR parity", dict(code="xor", k=16)), ("Reed-Solomon", dict(code="rs", k=16))]
+    trials, data_kb = 5, 32
+
+    port = 12370
+    receiver = multiprocessing.Process(target=_receiver_process, args=('127.0.0.1', port), daemon=True)
+    receiver.start()
+    time.sleep(0.5)  # let the receiver bind
+
+    results = {}
+    print(f"\n{'Loss %':<7} | {'Protocol':<15} | {'FEC':<13} | {'Goodput (bps)':>13} | {'p95 done (s)':>12} | "
+          f"{'Overhead':>8} | {'Loss est.':>9}")
+    print("-" * 96)
+    try:
+        for loss in loss_rates:
+            for proto, factory in protocols:
+                for variant, fec in variants:
+                    runs = [run_fec_test(factory, loss, data_kb, fec, port=port) for _ in range(trials)]
+                    goodput = float(np.median([r["goodput_bps"] for r in runs]))
+                    # "higher" picks an actual run, so one that never finished reads inf rather than nan
+                    p95 = float(np.percentile([r["completion_s"] for r in runs], 95, method="higher"))
+                    overhead = float(np.mean([r["overhead"] for r in runs]))
+                    estimate = float(np.mean([r["loss_estimate"] for r in runs]))
+                    results[(proto, variant, loss)] = (goodput, p95)
+                    print(f"{loss*100:<7.0f} | {proto:<15} | {variant:<13} | {goodput:>13.0f} | {p95:>12.2f} | "
+                          f"{overhead:>7.0%} | {estimate:>9.2f}")
+    finally:
+        receiver.terminate()
+        receiver.join()
+
+    fig, (ax_goodput, ax_tail) = plt.subplots(1, 2, figsize=(16, 6))
+    for (proto, _), linestyle in zip(protocols, ['-', '--']):
+        for variant, _ in variants:
+            label = f"{proto}, {variant}"
+            ax_goodput.plot([l * 100 for l in loss_rates], [results[(proto, variant, l)][0] for l in loss_rates],
+                            marker='o', linestyle=linestyle, label=label)
+            ax_tail.plot([l * 100 for l in loss_rates], [results[(proto, variant, l)][1] for l in loss_rates],
+                         marker='o', linestyle=linestyle, label=label)
+    ax_goodput.set_title('Median Goodput vs. Packet Loss')
+    ax_goodput.set_ylabel('Goodput (bits per second)')
+    ax_goodput.set_yscale('log')
+    ax_tail.set_title(f'95th Percentile Completion Time ({data_kb}KB transfers)')
+    ax_tail.set_ylabel('Completion time (s, did-not-finish off the chart)')
+    ax_tail.set_yscale('log')
+    for ax in (ax_goodput, ax_tail):
+        ax.set_xlabel('Packet Loss Rate (%)')
+        ax.legend(fontsize='small')
+        ax.grid(True)
+    plt.tight_layout()
+    plt.savefig('fec_comparison_plot.png')
+    print("\nFEC comparison plot saved as 'fec_comparison_plot.png'")
@@ -0,0 +1,167 @@
+import argparse
+import json
+import os
+import select
+import socket
+import sys
+import time
+
+# Its own port (trace_recorder uses 12399); SIM_METRICS_PORT overrides it for
+# both the publishers and the viewer
+METRICS_PORT = int(os.environ.get("SIM_METRICS_PORT", 12410))
+ABORT = b"ABORT"
+
+
+class MetricsPublisher:
+    """
+    Streams a running simulation's counters to the live viewer (run this
+    file) as one small JSON datagram per interval over loopback UDP. Fire
+    and forget: with no viewer listening the datagrams are dropped, and
+    publishing never blocks the caller's loop.
+
+    One publisher can carry several streams (one per run or per receiver
+    session); each gets its throughput from the bytes it reported over its
+    last interval. The viewer can answer with ABORT, after which aborted is
+    True and the simulation is expected to wind down.
+    """
+
+    def __init__(self, source, addr=('127.0.0.1', METRICS_PORT), interval=0.5):
+        self.source = source
+        self.addr = addr
+        self.interval = interval
+        self.pid = os.getpid()
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        self.next_at = 0.0
+        self.last = {}  # stream -> (time, bytes) of its previous update
+        self.aborted = False
+
+    def due(self, now):
+        return now >= self.next_at
+
+    def publish(self, now, bytes_done, stream="", **fields):
+        """
+        Sends one update for stream: bytes_done is cumulative, fields are any
+        other gauges and counters. Callers normally check due(now) first;
+        several streams can be published at the same tick.
+        """
+        last_t, last_bytes = self.last.get(stream, (None, 0))
+        rate = (bytes_done - last_bytes) * 8 / (now - last_t) if last_t is not None and now > last_t else 0.0
+        self.last[stream] = (now, bytes_done)
+        message = dict(source=self.source, pid=self.pid, stream=stream, bytes=bytes_done, throughput_bps=rate,
+                       **fields)
+        try:
+            self.sock.sendto(json.dumps(message).encode(), self.addr)
+        except OSError:
+            pass  # viewer gone or socket buffer full: metrics are best effort
+        self.next_at = now + self.interval
+        self.poll_abort()
+
+    def finish(self, stream=""):
+        """Forgets stream, so a later run under the same name starts its rate afresh."""
+        self.last.pop(stream, None)
+
+    def poll_abort(self):
+        while True:
+            try:
+                data = self.sock.recv(64)
+            except OSError:
+                return
+            if data == ABORT:
+                self.aborted = True
+
+    def close(self):
+        self.sock.close()
+
+
+def window_sender_fields(sender):
+    """The usual gauges and counters of a window sender (network_sender / comparative_analyzer)."""
+    rtt = sender.rtt
+    return dict(cwnd=float(sender.cwnd) if hasattr(sender, 'cc') else float(sender.window_size),
+                srtt_ms=rtt.srtt * 1000 if rtt.srtt is not None else None,
+                rto_ms=rtt.rto * 1000,
+                acked=sender.base,
+                sent=getattr(sender, 'packets_sent', None),
+                retransmissions=getattr(sender, 'retransmissions', None),
+                timeouts=rtt.timeouts)
+
+
+def _cell(value, fmt):
+    # Missing values keep the column's alignment and width ('>6.1f' -> '>6')
+    return format("-", fmt.split(".")[0]) if value is None else format(value, fmt)
+
+
+def render(rows, now, stale_after, port=METRICS_PORT):
+    lines = [f"Live simulation metrics on port {port}   (a <row> + Enter aborts that process, q quits)", ""]
+    lines.append(f"{'#':>2} | {'Source':<24} | {'Stream':<28} | {'Mbit/s':>8} | {'cwnd':>6} | {'SRTT ms':>7} | "
+                 f"{'RTO ms':>7} | {'Sent':>7} | {'Retx':>6} | {'TOs':>4} | {'Loss %':>6} | {'Age s':>5}")
+    lines.append("-" * len(lines[-1]))
+    for i, ((source, pid, stream), (message, received_at, _)) in enumerate(rows.items()):
+        age = now - received_at
+        lines.append(f"{i:>2} | {f'{source}[{pid}]':<24.24} | {stream:<28.28} | "
+                     f"{message['throughput_bps'] / 1e6:>8.2f} | {_cell(message.get('cwnd'), '>6.1f')} | "
+                     f"{_cell(message.get('srtt_ms'), '>7.2f')} | {_cell(message.get('rto_ms'), '>7.1f')} | "
+                     f"{_cell(message.get('sent'), '>7')} | {_cell(message.get('retransmissions'), '>6')} | "
+                     f"{_cell(message.get('timeouts'), '>4')} | {_cell(message.get('loss_pct'), '>6.2f')} | "
+                     f"{age:>5.1f}{'  (stale)' if age > stale_after else ''}")
+    return "\n".join(lines)
+
+
+def run_viewer(host='127.0.0.1', port=METRICS_PORT, refresh=0.5, stale_after=5.0, forget_after=60.0):
+    """
+    Terminal viewer: keeps the latest update of every stream and redraws the
+    table every refresh seconds. Reads commands from stdin: "a <row>" sends
+    ABORT to the process publishing that row, "q" quits.
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind((host, port))
+    sock.setblocking(False)
+    rows = {}  # (source, pid, stream) -> (latest message, time received, publisher address)
+    next_draw = 0.0
+    inputs = [sock, sys.stdin]
+
+    try:
+        while True:
+            now = time.monotonic()
+            readable, _, _ = select.select(inputs, [], [], max(0.0, next_draw - now))
+            now = time.monotonic()
+            if sock in readable:
+                while True:
+                    try:
+                        data, addr = sock.recvfrom(65536)
+                    except BlockingIOError:
+                        break
+                    try:
+                        message = json.loads(data)
+                        rows[(message["source"], message["pid"], message["stream"])] = (message, now, addr)
+                    except (ValueError, KeyError):
+                        continue
+            if sys.stdin in readable:
+                line = sys.stdin.readline()
+                if not line:
+                    inputs.remove(sys.stdin)  # stdin closed: keep watching, Ctrl-C to quit
+                command = line.split()
+                if command == ["q"]:
+                    break
+                if len(command) == 2 and command[0] == "a" and command[1].isdigit() and int(command[1]) < len(rows):
+                    _, _, addr = list(rows.values())[int(command[1])]
+                    sock.sendto(ABORT, addr)
+            if now >= next_draw:
+                for key in [k for k, (_, received_at, _) in rows.items() if now - received_at > forget_after]:
+                    del rows[key]
+                sys.stdout.write("\x1b[H\x1b[2J" + render(rows, now, stale_after, port) + "\n> ")
+                sys.stdout.flush()
+                next_draw = now + refresh
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sock.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Live viewer for simulation metrics")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=METRICS_PORT,
+                        help="publishers send to SIM_METRICS_PORT, 12410 by default")
+    args = parser.parse_args()
+    run_viewer(args.host, args.port)
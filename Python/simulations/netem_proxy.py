@@ -0,0 +1,469 @@
+import argparse
+import random
+import selectors
+import socket
+import time
+from collections import deque
+
+from delay_line import DelayLine
+from packet_format import MAGIC
+
+MTU = 1500  # smallest burst a rate-limited link accepts
+RECV_BATCH = 256  # datagrams read per wakeup, so a flooded socket cannot starve the links' timers
+
+# Impairment stages a datagram goes through on one direction of the proxy:
+#
+#   arrival -> burst loss -> queue admission -> FIFO -> token bucket -> delay/jitter/reorder -> out
+#
+# Every random decision comes from its own generator seeded from the link
+# seed, so the loss pattern of a given seed does not depend on timing. Queue
+# drops depend on arrival times by nature.
+
+
+class GilbertElliott:
+    """
+    Two-state burst loss: GOOD and BAD states with per-packet transition
+    probabilities p (GOOD -> BAD) and r (BAD -> GOOD) and a loss
+    probability in each state. Mean loss is
+    (r * loss_good + p * loss_bad) / (p + r).
+    """
+
+    def __init__(self, p=0.0, r=1.0, loss_good=0.0, loss_bad=1.0, rng=None):
+        self.p = p
+        self.r = r
+        self.loss_good = loss_good
+        self.loss_bad = loss_bad
+        self.rng = rng or random.Random()
+        self.bad = False
+
+    @classmethod
+    def from_loss(cls, mean_loss, burst_length=None, rng=None):
+        """
+        Simple Gilbert model: every packet in BAD is lost, bursts last
+        burst_length packets on average. Independent losses already give
+        bursts of 1 / (1 - mean_loss) packets, the shortest this model can
+        produce (p would exceed 1 below it, and the loss rate would cap), so
+        a shorter burst_length is raised to that with a note. None asks for
+        independent losses.
+        """
+        if not 0 <= mean_loss <= 1:
+            raise ValueError(f"mean loss {mean_loss} is not a probability")
+        if mean_loss == 0:
+            return cls(p=0.0, r=1.0, rng=rng)
+        if mean_loss == 1:
+            return cls(p=1.0, r=0.0, rng=rng)  # enters BAD on the first packet and never leaves
+        shortest = 1.0 / (1 - mean_loss)
+        if burst_length is None:
+            burst_length = shortest
+        elif burst_length < shortest:
+            print(f"GilbertElliott: a mean loss of {mean_loss} needs bursts of at least {shortest:.2f} "
+                  f"packets; using that instead of {burst_length}")
+            burst_length = shortest
+        r = 1.0 / burst_length
+        return cls(p=r * mean_loss / (1 - mean_loss), r=r, rng=rng)
+
+    def lose(self):
+        rand = self.rng.random
+        if self.bad:
+            if rand() < self.r:
+                self.bad = False
+        elif rand() < self.p:
+            self.bad = True
+        return rand() < (self.loss_bad if self.bad else self.loss_good)
+
+
+class DropTail:
+    """Admits packets while fewer than limit are queued."""
+
+    def __init__(self, limit=100):
+        self.limit = limit
+
+    def admit(self, qlen):
+        return qlen < self.limit
+
+
+class RED:
+    """
+    Random Early Detection (Floyd & Jacobson): drops with a probability that
+    rises from 0 at min_th to max_p at max_th of the EWMA queue length, and
+    spaces the drops out using the count since the last one. limit is the
+    hard queue size.
+    """
+
+    def __init__(self, limit=100, min_th=None, max_th=None, max_p=0.1, w_q=0.002, rng=None):
+        self.limit = limit
+        self.min_th = limit / 4 if min_th is None else min_th
+        self.max_th = limit * 3 / 4 if max_th is None else max_th
+        self.max_p = max_p
+        self.w_q = w_q
+        self.rng = rng or random.Random()
+        self.avg = 0.0
+        self.count = -1
+
+    def admit(self, qlen):
+        self.avg += self.w_q * (qlen - self.avg)
+        if qlen >= self.limit or self.avg >= self.max_th:
+            self.count = 0
+            return False
+        if self.avg < self.min_th:
+            self.count = -1
+            return True
+        self.count += 1
+        p_b = self.max_p * (self.avg - self.min_th) / (self.max_th - self.min_th)
+        p_a = p_b / max(1e-9, 1 - self.count * p_b)
+        if self.rng.random() < p_a:
+            self.count = 0
+            return False
+        return True
+
+
+class Link:
+    """
+    One direction of the emulated path. rate_bps=None means no bottleneck
+    (and so no queue); delay/jitter are seconds. With probability reorder a
+    packet skips the delay and overtakes the ones in flight (netem's
+    reordering), and jitter larger than the packet spacing reorders too.
+    """
+
+    def __init__(self, rate_bps=None, burst_bytes=3000, queue=None, delay=0.0, jitter=0.0,
+                 reorder=0.0, loss=None, seed=None):
+        if rate_bps and burst_bytes < MTU:
+            raise ValueError(f"burst_bytes {burst_bytes} is below the {MTU}-byte MTU")
+        seeds = random.Random(seed)
+        self.rate_bytes = rate_bps / 8 if rate_bps else None
+        self.burst_bytes = burst_bytes
+        self.tokens = burst_bytes
+        self.last_refill = time.monotonic()
+        self.queue_policy = queue or DropTail()
+        if isinstance(self.queue_policy, RED):
+            self.queue_policy.rng.seed(seeds.random())
+        self.queue = deque()
+        self.delay = delay
+        self.jitter = jitter
+        self.reorder = reorder
+        self.delay_rng = random.Random(seeds.random())
+        self.loss = loss
+        if loss is not None:
+            loss.rng.seed(seeds.random())
+        # Constant delay keeps packets in order, so a FIFO is enough; jitter
+        # and reordering need the delay line's heap
+        self.in_order = deque()
+        self.propagation = DelayLine()
+
+        self.arrived = 0
+        self.lost = 0
+        self.queue_drops = 0
+        self.delivered = 0
+        self.max_queue = 0
+
+    def submit(self, item, size, now):
+        self.arrived += 1
+        if self.loss is not None and self.loss.lose():
+            self.lost += 1
+            return
+        if self.rate_bytes is None:
+            self.transmit(item, size, now)
+            return
+        if self.queue:
+            # Keep the link busy while the event loop is still reading a batch
+            self.service(now)
+        if not self.queue:
+            # Idle link: goes straight out if the bucket has the tokens
+            self.refill(now, size)
+            if self.tokens >= size:
+                self.tokens -= size
+                self.transmit(item, size, now)
+                return
+        if not self.queue_policy.admit(len(self.queue)):
+            self.queue_drops += 1
+            return
+        self.queue.append((item, size))
+        if len(self.queue) > self.max_queue:
+            self.max_queue = len(self.queue)
+
+    def refill(self, now, need=0):
+        """Adds the tokens earned since the last refill, up to the burst (or need, for a packet larger than it)."""
+        self.tokens = min(max(self.burst_bytes, need), self.tokens + (now - self.last_refill) * self.rate_bytes)
+        self.last_refill = now
+
+    def service(self, now):
+        """Moves queued packets onto the wire as tokens allow."""
+        if not self.queue:
+            return
+        self.refill(now, self.queue[0][1])
+        queue = self.queue
+        while queue and self.tokens >= queue[0][1]:
+            item, size = queue.popleft()
+            self.tokens -= size
+            self.transmit(item, size, now)
+
+    def transmit(self, item, size, now):
+        if not self.jitter and not self.reorder:
+            self.in_order.append((now + self.delay, item))
+            return
+        rand = self.delay_rng.random
+        delay = self.delay
+        if self.jitter:
+            delay = max(0.0, delay + self.jitter * (2 * rand() - 1))
+        if self.reorder and rand() < self.reorder:
+            delay = 0.0
+        self.propagation.schedule(delay, item, now=now)
+
+    def next_timeout(self, now):
+        timeouts = []
+        t = self.propagation.next_timeout(now)
+        if t is not None:
+            timeouts.append(t)
+        if self.in_order:
+            timeouts.append(max(0.0, self.in_order[0][0] - now))
+        if self.queue:
+            self.refill(now, self.queue[0][1])
+            timeouts.append(max(0.0, (self.queue[0][1] - self.tokens) / self.rate_bytes))
+        return min(timeouts) if timeouts else None
+
+    def pop_due(self, now):
+        in_order = self.in_order
+        while in_order and in_order[0][0] <= now:
+            self.delivered += 1
+            yield in_order.popleft()[1]
+        for item in self.propagation.pop_due(now):
+            self.delivered += 1
+            yield item
+
+    def stats(self):
+        return dict(arrived=self.arrived, lost=self.lost, queue_drops=self.queue_drops,
+                    delivered=self.delivered, max_queue=self.max_queue)
+
+
+class NetemProxy:
+    """
+    UDP proxy that sits between any sender and receiver in this directory:
+    senders send to listen_addr, the proxy forwards to target_addr through
+    the forward Link and relays replies back through the reverse Link.
+
+    Each client gets its own upstream socket, so the receiver still sees
+    one address per sender (network_receiver keys flows by it). Control
+    commands (anything not starting with MAGIC) bypass the impairments,
+    as they do in the receivers.
+    """
+
+    def __init__(self, listen_addr=('127.0.0.1', 12300), target_addr=('127.0.0.1', 12345),
+                 forward=None, reverse=None, idle_timeout=60.0):
+        self.listen_addr = listen_addr
+        self.target_addr = target_addr
+        self.forward = forward or Link()
+        self.reverse = reverse or Link()
+        self.idle_timeout = idle_timeout
+
+        self.selector = selectors.DefaultSelector()
+        self.sock = self.open_socket(listen_addr)
+        self.selector.register(self.sock, selectors.EVENT_READ, None)
+        self.upstream = {}  # client addr -> [socket, last activity]
+        self.running = False
+
+    def open_socket(self, bind_addr):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4 * 1024 * 1024)
+        sock.bind(bind_addr)
+        sock.setblocking(False)
+        return sock
+
+    def upstream_for(self, client, now):
+        entry = self.upstream.get(client)
+        if entry is None:
+            sock = self.open_socket((self.listen_addr[0], 0))
+            self.selector.register(sock, selectors.EVENT_READ, client)
+            entry = self.upstream[client] = [sock, now]
+        entry[1] = now
+        return entry[0]
+
+    def drain(self, sock, client):
+        """Reads up to RECV_BATCH datagrams; the selector reports the socket again if more are waiting."""
+        clock = time.monotonic
+        for _ in range(RECV_BATCH):
+            try:
+                data, addr = sock.recvfrom(65536)
+            except BlockingIOError:
+                return
+            # Per-packet clock: a batch read in one go must not arrive "at once" at the token bucket
+            now = clock()
+            if client is None:
+                # Client -> target
+                out = self.upstream_for(addr, now)
+                if data and data[0] == MAGIC:
+                    self.forward.submit((out, self.target_addr, data), len(data), now)
+                else:
+                    out.sendto(data, self.target_addr)
+            else:
+                # Target -> client, out of the listening socket so the client sees the proxy address
+                if data and data[0] == MAGIC:
+                    self.reverse.submit((self.sock, client, data), len(data), now)
+                else:
+                    self.sock.sendto(data, client)
+
+    def sweep_idle(self, now):
+        for client, (sock, last_seen) in list(self.upstream.items()):
+            if now - last_seen > self.idle_timeout:
+                self.selector.unregister(sock)
+                sock.close()
+                del self.upstream[client]
+
+    def run(self, duration=None):
+        self.running = True
+        start = last_sweep = time.monotonic()
+        try:
+            while self.running:
+                now = time.monotonic()
+                timeouts = [t for t in (self.forward.next_timeout(now), self.reverse.next_timeout(now))
+                            if t is not None]
+                for key, _ in self.selector.select(min(timeouts, default=1.0)):
+                    self.drain(key.fileobj, key.data)
+
+                now = time.monotonic()
+                for link in (self.forward, self.reverse):
+                    link.service(now)
+                    for sock, dest, data in link.pop_due(now):
+                        try:
+                            sock.sendto(data, dest)
+                        except (BlockingIOError, OSError):
+                            pass  # full send buffer is one more drop
+
+                if now - last_sweep > 1.0:
+                    last_sweep = now
+                    self.sweep_idle(now)
+                if duration is not None and now - start > duration:
+                    break
+        finally:
+            self.running = False
+
+    def close(self):
+        for sock, _ in self.upstream.values():
+            sock.close()
+        self.upstream.clear()
+        self.selector.close()
+        self.sock.close()
+
+
+def check_loss(rates=(0.1, 0.5, 0.9), burst_lengths=(None, 4.0), packets=200000, seed=1, tolerance=0.01):
+    """
+    Measures the loss rate and mean burst length from_loss actually gives
+    for each rate and burst length, and fails if the loss rate is off by
+    more than tolerance.
+    """
+    print(f"\nGilbert-Elliott achieved loss ({packets} packets)")
+    print("=" * 62)
+    print(f"{'Asked':>6} | {'Burst asked':>11} | {'Achieved':>9} | {'Mean burst':>10} | {'Expected burst':>14}")
+    print("-" * 62)
+    for burst_length in burst_lengths:
+        for rate in rates:
+            model = GilbertElliott.from_loss(rate, burst_length, rng=random.Random(seed))
+            lost = bursts = 0
+            previous = False
+            for _ in range(packets):
+                dropped = model.lose()
+                lost += dropped
+                bursts += dropped and not previous
+                previous = dropped
+            achieved = lost / packets
+            asked = "indep." if burst_length is None else f"{burst_length:g}"
+            print(f"{rate:>6.2f} | {asked:>11} | {achieved:>9.4f} | {lost / max(bursts, 1):>10.2f} | "
+                  f"{1 / model.r:>14.2f}")
+            assert abs(achieved - rate) <= tolerance, f"asked for {rate} loss, got {achieved:.4f}"
+    print("=" * 62)
+
+
+def _blast(proxy_addr, num_packets, payload):
+    tx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    pkt = bytes([MAGIC]) + bytes(payload - 1)
+    for i in range(num_packets):
+        tx.sendto(pkt, proxy_addr)
+        if i % 32 == 0:
+            time.sleep(0)  # yield, so a single core is shared with the proxy and loopback does not overflow
+    tx.close()
+
+
+def benchmark(num_packets=200000, payload=64, seed=1):
+    """
+    Blasts packets at the proxy from another process and reports how many
+    packets per second of proxy CPU time it handles, with no impairments
+    and with the whole chain enabled. The sink is never read; loopback
+    discards what overflows its buffer, which costs the proxy nothing.
+    """
+    import multiprocessing
+
+    def one_run(name, forward):
+        sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sink.bind(('127.0.0.1', 0))
+        proxy = NetemProxy(('127.0.0.1', 0), sink.getsockname(), forward=forward)
+        blaster = multiprocessing.Process(target=_blast, args=(proxy.sock.getsockname(), num_packets, payload))
+
+        cpu_start = time.process_time()
+        blaster.start()
+        while blaster.is_alive():
+            proxy.run(duration=0.1)
+        proxy.run(duration=0.3)  # flush the delay line
+        cpu = time.process_time() - cpu_start
+        blaster.join()
+
+        stats = proxy.forward.stats()
+        proxy.close()
+        sink.close()
+        print(f"{name:<34} | {stats['arrived']:>7} in | {stats['delivered']:>7} out | "
+              f"{stats['arrived'] / cpu:>8.0f} pkt/s per CPU-s | lost {stats['lost']:>5} | "
+              f"queue drops {stats['queue_drops']:>6}")
+
+    print(f"\nnetem proxy benchmark: {num_packets} x {payload}B packets")
+    one_run("passthrough", Link(seed=seed))
+    one_run("GE loss + drop-tail + rate + delay", Link(rate_bps=400e6, queue=DropTail(limit=1000), delay=0.001,
+                                                       loss=GilbertElliott.from_loss(0.01, 4), seed=seed))
+    one_run("GE loss + RED + rate + jitter", Link(rate_bps=400e6, queue=RED(limit=1000), delay=0.001,
+                                                   jitter=0.0005, reorder=0.01,
+                                                   loss=GilbertElliott.from_loss(0.01, 4), seed=seed))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Userspace netem-style UDP proxy")
+    parser.add_argument("--listen-port", type=int, default=12300)
+    parser.add_argument("--target-port", type=int, default=12345)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--rate-mbps", type=float, default=0, help="bottleneck rate, 0 = unlimited")
+    parser.add_argument("--burst-bytes", type=int, default=3000)
+    parser.add_argument("--queue", choices=["droptail", "red"], default="droptail")
+    parser.add_argument("--limit", type=int, default=100, help="queue size in packets")
+    parser.add_argument("--delay-ms", type=float, default=0.0, help="one-way delay")
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--reorder", type=float, default=0.0, help="probability a packet skips the delay")
+    parser.add_argument("--loss", type=float, default=0.0, help="mean Gilbert-Elliott loss rate")
+    parser.add_argument("--burst", type=float, default=None,
+                        help="mean loss burst length in packets (default: independent losses)")
+    parser.add_argument("--reverse", action="store_true", help="apply delay/jitter to the ACK path too")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--benchmark", action="store_true")
+    parser.add_argument("--check-loss", action="store_true", help="measure the loss rate the model achieves")
+    args = parser.parse_args()
+    if args.rate_mbps and args.burst_bytes < MTU:
+        parser.error(f"--burst-bytes must be at least the {MTU}-byte MTU")
+    if not 0 <= args.loss <= 1:
+        parser.error("--loss must be between 0 and 1")
+
+    if args.check_loss:
+        check_loss()
+    elif args.benchmark:
+        benchmark(seed=args.seed)
+    else:
+        queue = RED(limit=args.limit) if args.queue == "red" else DropTail(limit=args.limit)
+        forward = Link(rate_bps=args.rate_mbps * 1e6 or None, burst_bytes=args.burst_bytes, queue=queue,
+                       delay=args.delay_ms / 1000, jitter=args.jitter_ms / 1000, reorder=args.reorder,
+                       loss=GilbertElliott.from_loss(args.loss, args.burst), seed=args.seed)
+        reverse = Link(delay=args.delay_ms / 1000, jitter=args.jitter_ms / 1000,
+                       seed=None if args.seed is None else args.seed + 1) if args.reverse else Link()
+        proxy = NetemProxy((args.host, args.listen_port), (args.host, args.target_port), forward, reverse)
+        print(f"netem proxy {args.host}:{args.listen_port} -> {args.host}:{args.target_port}")
+        try:
+            proxy.run()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            print(f"forward: {proxy.forward.stats()}\nreverse: {proxy.reverse.stats()}")
+            proxy.close()
@@ -1,74 +1,315 @@
+import json
 import socket
 import random
+import select
 import time
 
-def start_receiver(host='127.0.0.1', port=12345):
+from delay_line import DelayLine
+from fec import FecDecoder
+from metrics import MetricsPublisher
+from packet_format import (HEADER, HEADER_SIZE, TIMESTAMP, MAGIC, MAX_DATAGRAM, FLAG_EOF, FLAG_FEC, FLAG_TS,
+                           AckCoalescer, make_ack, parse_ack_setting, parse_command, sack_blocks_for)
+
+SESSION_IDLE_TIMEOUT = 60.0  # seconds without traffic before a flow's state is dropped
+RECV_BATCH = 256  # datagrams read per wakeup, so a flooded socket cannot starve the delay lines
+
+class Session:
+    """
+    Receiver state for one flow, keyed by (client address, run_id): its own
+    loss/RTT/bandwidth/mode settings, reassembly state, delay lines and
+    statistics, so any number of senders can run experiments at once.
+    """
+
+    def __init__(self, addr, run_id):
+        self.addr = addr
+        self.run_id = run_id
+        self.loss_rate = 0.0
+        self.rtt_s = 0.0  # Round Trip Time in seconds
+        # "gbn": discard out-of-order packets; "sack": buffer them and report
+        # them in SACK blocks (Selective Repeat / SACK senders)
+        self.mode = "gbn"
+        # With FEC on, parity packets rebuild lost data packets, out-of-order
+        # packets are kept (whatever the mode) so a rebuilt packet can fill
+        # the hole under them, and ACKs carry a receive report
+        self.fec = None
+        # One ACK per packet unless SET_ACK asks for coalescing
+        self.acks = AckCoalescer()
+        # Forward path (data) and return path (ACKs) each add RTT / 2.
+        # Packets wait in the delay lines instead of blocking the loop, so
+        # throughput is bounded by window / RTT, not 1 packet per RTT.
+        self.inbound = DelayLine()
+        self.outbound = DelayLine()
+        self.started = False
+        self.last_seen = time.monotonic()
+        self.reset()
+
+    def reset(self):
+        self.expected_seq_num = 0
+        self.buffered = set()
+        self.total_received = 0
+        self.total_pkts = 0
+        self.dropped_pkts = 0
+        self.acks_sent = 0
+        self.acks.take()
+        self.eof_seq = None
+        self.start_time = time.monotonic()
+        self.end_time = None
+        self.inbound.clear()
+        self.outbound.clear()
+        if self.fec is not None:
+            self.fec.clear()
+
+    def next_timeout(self, now):
+        timeouts = [t for t in (self.inbound.next_timeout(now), self.outbound.next_timeout(now),
+                                self.acks.next_timeout(now)) if t is not None]
+        return min(timeouts) if timeouts else None
+
+    def on_packet(self, data, now):
+        self.last_seen = now
+        self.total_pkts += 1
+
+        # Simulate packet loss
+        if random.random() < self.loss_rate:
+            self.dropped_pkts += 1
+            return
+
+        # Simulate one-way trip delay (RTT / 2)
+        self.inbound.schedule(self.rtt_s / 2.0, data, size=len(data), now=now)
+
+    def deliver(self, data, now):
+        """Handles a packet that has come out of the inbound delay line."""
+        magic, flags, length, seq_num = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError(f"unknown message {data[:16]!r}")
+
+        if self.fec is None:
+            self.accept(data, flags, length, seq_num, now)
+            return
+        if flags & FLAG_FEC:
+            rebuilt = self.fec.add_parity(data, self.expected_seq_num)
+        else:
+            rebuilt = self.fec.add_source(seq_num, data)
+            self.accept(data, flags, length, seq_num, now)
+        for packet in rebuilt:
+            # No send timestamp survives decoding, so the ACK echoes none (no RTT sample)
+            _, flags, length, seq_num = HEADER.unpack_from(packet)
+            self.accept(packet, flags & ~FLAG_TS, length, seq_num, now)
+
+    def accept(self, data, flags, length, seq_num, now):
+        sack_blocks = ()
+        in_order = seq_num == self.expected_seq_num
+        if in_order:
+            self.expected_seq_num += 1
+            if not flags & FLAG_EOF:
+                self.total_received += length
+            while self.expected_seq_num in self.buffered:
+                self.buffered.discard(self.expected_seq_num)
+                self.expected_seq_num += 1
+        elif ((self.mode == "sack" or self.fec is not None)
+              and seq_num > self.expected_seq_num and seq_num not in self.buffered):
+            self.buffered.add(seq_num)
+            if not flags & FLAG_EOF:
+                self.total_received += length
+        if self.buffered and self.mode == "sack":
+            sack_blocks = sack_blocks_for(self.buffered, seq_num)
+
+        echo_ts = TIMESTAMP.unpack_from(data, HEADER_SIZE)[0] if flags & FLAG_TS else None
+        # Out of order, a hole still open or just filled, or EOF: the sender needs this one now
+        urgent = (not in_order or self.buffered or self.expected_seq_num > seq_num + 1
+                  or flags & FLAG_EOF)
+        if self.acks.on_packet(echo_ts, now, urgent):
+            self.send_ack(sack_blocks, now)
+
+        if flags & FLAG_EOF:
+            self.eof_seq = seq_num
+        # Complete once everything up to EOF is in order (in sack mode EOF can arrive before a hole is filled)
+        if self.eof_seq is not None and self.expected_seq_num > self.eof_seq and self.end_time is None:
+            self.end_time = now
+            loss = (self.dropped_pkts / self.total_pkts) * 100 if self.total_pkts else 0.0
+            print(f"Run Complete [{self.addr[0]}:{self.addr[1]} run {self.run_id}]. "
+                  f"Recv: {self.total_received} bytes, Loss: {loss:.2f}%")
+
+    def send_ack(self, sack_blocks, now):
+        # Cumulative ACK echoing the sender's timestamp, delayed by the return-way trip (RTT / 2)
+        received = self.total_pkts - self.dropped_pkts if self.fec is not None else None
+        ack = make_ack(self.expected_seq_num - 1, self.acks.take(), sack_blocks, received)
+        self.outbound.schedule(self.rtt_s / 2.0, ack, now=now)
+        self.acks_sent += 1
+
+    def flush_acks(self, now):
+        """Sends the coalesced ACK once its delay is up."""
+        if self.acks.next_timeout(now) == 0.0:
+            self.send_ack((), now)
+
+    def live_fields(self):
+        """Counters for the live metrics viewer (see metrics.py)."""
+        return dict(sent=self.total_pkts, acked=self.expected_seq_num, rtt_ms=self.rtt_s * 1000,
+                    loss_pct=self.dropped_pkts / self.total_pkts * 100 if self.total_pkts else 0.0)
+
+    def stats(self):
+        end = self.end_time if self.end_time is not None else time.monotonic()
+        return {
+            "run_id": self.run_id,
+            "addr": f"{self.addr[0]}:{self.addr[1]}",
+            "mode": self.mode,
+            "loss_rate": self.loss_rate,
+            "rtt_ms": self.rtt_s * 1000,
+            "bandwidth_bps": self.inbound.bandwidth_bps,
+            "packets": self.total_pkts,
+            "dropped": self.dropped_pkts,
+            "acks_sent": self.acks_sent,
+            "bytes_received": self.total_received,
+            "delivered_seq": self.expected_seq_num,
+            "fec_parity": self.fec.parity_received if self.fec is not None else 0,
+            "fec_recovered": self.fec.recovered if self.fec is not None else 0,
+            "complete": self.end_time is not None,
+            "duration": end - self.start_time,
+        }
+
+def handle_command(sessions, active, addr, name, value, run_id):
+    """
+    Applies one control command to the (addr, run_id) session and returns
+    the reply payload. Raises ValueError for anything it cannot apply.
+
+    Commands with a run_id are idempotent, so a sender can safely resend
+    one whose acknowledgement was lost: a repeated SET_LOSS does not restart
+    a run that is already going. Old-style commands without a run_id reset
+    the run on every SET_LOSS, as before.
+    """
+    if name == "PING":
+        return ""  # liveness check, touches no flow state
+
+    key = (addr, run_id)
+    session = sessions.get(key)
+    if name == "GET_STATS":
+        if session is None:
+            raise ValueError(f"unknown run {run_id}")
+        return json.dumps(session.stats())
+
+    if session is None:
+        session = sessions[key] = Session(addr, run_id)
+    previous = active.get(addr)
+    if previous is not session:
+        # A new run from the same socket supersedes the old one; drop its in-flight packets
+        if previous is not None:
+            previous.inbound.clear()
+            previous.outbound.clear()
+            previous.acks.take()  # a held coalesced ACK would keep it out of the idle sweep
+        active[addr] = session
+    session.last_seen = time.monotonic()
+
+    if name == "SET_LOSS":
+        session.loss_rate = float(value)
+        if run_id is None or not session.started:
+            session.reset()
+            session.started = True
+            print(f"\n--- New Run [{addr[0]}:{addr[1]} run {run_id}]: Loss={session.loss_rate*100}%, "
+                  f"RTT={session.rtt_s*1000:.1f}ms, mode={session.mode} ---")
+    elif name == "SET_RTT":
+        session.rtt_s = float(value) / 1000.0  # Convert ms to s
+    elif name == "SET_MODE":
+        if value not in ("gbn", "sack"):
+            raise ValueError(f"unknown mode {value}")
+        session.mode = value
+    elif name == "SET_FEC":
+        if value not in ("on", "off"):
+            raise ValueError(f"unknown FEC setting {value}")
+        session.fec = FecDecoder() if value == "on" else None
+    elif name == "SET_ACK":
+        session.acks = AckCoalescer(*parse_ack_setting(value))
+    elif name == "SET_BW":
+        # Bottleneck bandwidth in Mbit/s, 0 = unlimited
+        bw_mbps = float(value)
+        session.inbound.bandwidth_bps = bw_mbps * 1e6 if bw_mbps > 0 else None
+    else:
+        raise ValueError(f"unknown command {name}")
+    return ""
+
+def start_receiver(host='127.0.0.1', port=12345, reuse_port=False, shard=None, metrics=None):
+    """
+    Runs the receiver loop until interrupted. With reuse_port, several
+    processes can bind the same port and the kernel spreads flows across
+    them by address hash (see sharded_receiver.py); shard, if given, gets
+    this process's running counters once per loop iteration. A
+    MetricsPublisher as metrics streams every active run's progress.
+    """
     sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    # Large windows over a long RTT put many packets in flight at once
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
     sock.bind((host, port))
+    sock.setblocking(False)
     print(f"Network Receiver listening on {host}:{port}")
 
-    current_loss_rate = 0.0
-    current_rtt_s = 0.0  # Round Trip Time in seconds
-    expected_seq_num = 0
-    total_received = 0
-    total_pkts = 0
-    dropped_pkts = 0
+    sessions = {}  # (addr, run_id) -> Session, kept until idle so stats can be queried
+    active = {}  # addr -> Session currently receiving that address's data
+    last_sweep = time.monotonic()
+    packets = data_bytes = acks = 0
 
     try:
         while True:
-            data, addr = sock.recvfrom(2048)
-            msg = data.decode()
-            
-            # Simulate one-way trip delay (RTT / 2)
-            if current_rtt_s > 0:
-                time.sleep(current_rtt_s / 2.0)
-
-            # Handle commands
-            if msg.startswith("CMD:SET_LOSS:"):
-                current_loss_rate = float(msg.split(":")[2])
-                print(f"\n--- New Run: Loss={current_loss_rate*100}%, RTT={current_rtt_s*1000:.1f}ms ---")
-                expected_seq_num = 0
-                total_received = 0
-                total_pkts = 0
-                dropped_pkts = 0
-                sock.sendto(b"ACK_CMD", addr)
-                continue
-            
-            if msg.startswith("CMD:SET_RTT:"):
-                current_rtt_s = float(msg.split(":")[2]) / 1000.0  # Convert ms to s
-                print(f"RTT updated to {current_rtt_s*1000:.1f}ms")
-                sock.sendto(b"ACK_CMD", addr)
-                continue
-            
-            total_pkts += 1
-            
-            # Simulate packet loss
-            if random.random() < current_loss_rate:
-                dropped_pkts += 1
-                continue
-
-            try:
-                seq_num_str, payload = msg.split('|', 1)
-                seq_num = int(seq_num_str)
-                
-                if seq_num == expected_seq_num:
-                    expected_seq_num += 1
-                    total_received += len(payload)
-                
-                # Cumulative ACK
-                ack = str(expected_seq_num - 1).encode()
-                
-                # Simulate return-way trip delay (RTT / 2)
-                if current_rtt_s > 0:
-                    time.sleep(current_rtt_s / 2.0)
-                    
-                sock.sendto(ack, addr)
-                
-                if payload == "EOF":
-                    print(f"Run Complete. Recv: {total_received-3} bytes, Loss: {(dropped_pkts/total_pkts)*100:.2f}%")
-
-            except Exception as e:
-                print(f"Error: {e}")
+            now = time.monotonic()
+            timeouts = [t for t in (s.next_timeout(now) for s in active.values()) if t is not None]
+            readable, _, _ = select.select([sock], [], [], min(timeouts, default=1.0))
+
+            if readable:
+                now = time.monotonic()
+                for _ in range(RECV_BATCH):
+                    try:
+                        data, addr = sock.recvfrom(MAX_DATAGRAM)
+                    except BlockingIOError:
+                        break
+
+                    if data and data[0] == MAGIC:
+                        packets += 1
+                        data_bytes += len(data)
+                        session = active.get(addr)
+                        if session is None:
+                            # Sender that skipped the control channel: old single-run behaviour
+                            session = sessions[(addr, None)] = active[addr] = Session(addr, None)
+                            session.started = True
+                        session.on_packet(data, now)
+                        continue
+
+                    # Control commands (not subject to emulated loss or delay)
+                    try:
+                        command = parse_command(data)
+                        if command is None:
+                            print(f"Error: unknown message {data[:16]!r} from {addr}")
+                            continue
+                        payload = handle_command(sessions, active, addr, *command)
+                        sock.sendto(b"ACK_CMD:" + data + b"\n" + payload.encode(), addr)
+                    except ValueError as e:
+                        sock.sendto(b"ERR_CMD:" + data + b"\n" + str(e).encode(), addr)
+
+            now = time.monotonic()
+            for session in active.values():
+                for data in session.inbound.pop_due(now):
+                    try:
+                        session.deliver(data, now)
+                    except Exception as e:
+                        print(f"Error: {e}")
+                session.flush_acks(now)
+                for ack in session.outbound.pop_due(now):
+                    sock.sendto(ack, session.addr)
+                    acks += 1
+
+            if shard is not None:
+                shard.publish(packets, data_bytes, acks, len(sessions))
+            if metrics is not None and metrics.due(now):
+                for session in active.values():
+                    if session.started and session.end_time is None:
+                        stream = f"{session.addr[0]}:{session.addr[1]} run {session.run_id}"
+                        metrics.publish(now, session.total_received, stream, **session.live_fields())
+
+            if now - last_sweep > 1.0:
+                last_sweep = now
+                for key, session in list(sessions.items()):
+                    if now - session.last_seen > SESSION_IDLE_TIMEOUT and session.next_timeout(now) is None:
+                        del sessions[key]
+                        if active.get(session.addr) is session:
+                            del active[session.addr]
 
     except KeyboardInterrupt:
         print("\nReceiver shutting down.")
@@ -76,4 +317,4 @@ def start_receiver(host='127.0.0.1', port=12345):
         sock.close()
 
 if __name__ == "__main__":
-    start_receiver()
+    start_receiver(metrics=MetricsPublisher("network_receiver"))
@@ -3,12 +3,18 @@ import time
 import threading
 import matplotlib.pyplot as plt
 
+from metrics import MetricsPublisher, window_sender_fields
+from packet_format import PacketBuffer, configure_run, new_run_id, parse_ack
+from rtt_estimator import RttEstimator
+
 class NetworkSender:
-    def __init__(self, host='127.0.0.1', port=12345, window_size=10, timeout=0.2):
+    def __init__(self, host='127.0.0.1', port=12345, window_size=10, timeout=0.2, adaptive_rto=True, metrics=None):
         self.host = host
         self.port = port
         self.window_size = window_size
         self.timeout = timeout
+        # RTO from echoed timestamps; adaptive_rto=False keeps it fixed at timeout
+        self.rtt = RttEstimator(initial_rto=timeout, adaptive=adaptive_rto)
         
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self.sock.settimeout(0.1)
@@ -20,22 +26,25 @@ class NetworkSender:
         self.lock = threading.Lock()
         self.running = True
         self.results = []
+        self.packets_sent = 0
+        self.retransmissions = 0
+        # Optional MetricsPublisher: live progress for metrics.py's viewer, which can also abort the sweep
+        self.metrics = metrics
 
     def create_packets(self, data, chunk_size=1024):
-        self.packets = []
-        for i in range(0, len(data), chunk_size):
-            chunk = data[i:i+chunk_size]
-            seq_num = len(self.packets)
-            self.packets.append(f"{seq_num}|{chunk}")
-        self.packets.append(f"{len(self.packets)}|EOF")
+        self.packets = PacketBuffer(data, chunk_size, timestamps=True)
 
     def ack_listener(self):
         while self.running:
             try:
                 data, _ = self.sock.recvfrom(1024)
-                ack_num = int(data.decode())
+                ack = parse_ack(data)
+                if ack is None:
+                    continue
+                ack_num, echo_ts = ack
                 with self.lock:
                     if ack_num >= self.base:
+                        self.rtt.on_ack(ack_num, echo_ts)
                         self.base = ack_num + 1
                         if self.base == self.next_seq_num:
                             self.timer_start_time = None
@@ -52,13 +61,15 @@ class NetworkSender:
 
         for loss in loss_rates:
             print(f"\n>>> Running test for {loss*100}% loss...")
-            # Set loss rate on receiver
-            self.sock.sendto(f"CMD:SET_LOSS:{loss}".encode(), (self.host, self.port))
-            time.sleep(1.0) # Wait for receiver to sync
+            # Set loss rate on receiver (waits for its acknowledgement)
+            configure_run(self.sock, (self.host, self.port), new_run_id(), loss=loss)
 
             self.base = 0
             self.next_seq_num = 0
+            self.packets_sent = 0
+            self.retransmissions = 0
             self.running = True
+            self.rtt = RttEstimator(initial_rto=self.timeout, adaptive=self.rtt.adaptive)
             
             listener_thread = threading.Thread(target=self.ack_listener)
             listener_thread.start()
@@ -69,30 +80,50 @@ class NetworkSender:
                 with self.lock:
                     while self.next_seq_num < self.base + self.window_size and self.next_seq_num < len(self.packets):
                         pkt = self.packets[self.next_seq_num]
-                        self.sock.sendto(pkt.encode(), (self.host, self.port))
+                        self.packets.stamp(self.next_seq_num)
+                        self.sock.sendto(pkt, (self.host, self.port))
+                        self.packets_sent += 1
                         if self.base == self.next_seq_num:
                             self.timer_start_time = time.time()
                         self.next_seq_num += 1
                         # Small delay to prevent local socket buffer overflow
                         time.sleep(0.005)
 
-                    if self.timer_start_time and (time.time() - self.timer_start_time > self.timeout):
+                    if self.timer_start_time and (time.time() - self.timer_start_time > self.rtt.rto):
                         print(f"    Timeout! Retransmitting from {self.base}")
+                        self.rtt.on_timeout(self.base)
                         self.timer_start_time = time.time()
                         for i in range(self.base, self.next_seq_num):
-                            self.sock.sendto(self.packets[i].encode(), (self.host, self.port))
+                            self.packets.stamp(i)
+                            self.sock.sendto(self.packets[i], (self.host, self.port))
+                            self.packets_sent += 1
+                            self.retransmissions += 1
                 
                 if self.base % 50 == 0:
                     print(f"    Progress: {self.base}/{len(self.packets)} packets ACKed")
+
+                now = time.monotonic()
+                if self.metrics is not None and self.metrics.due(now):
+                    self.metrics.publish(now, min(self.base * self.packets.chunk_size, len(data)),
+                                         stream=f"loss {loss*100:g}%", loss_pct=loss * 100,
+                                         **window_sender_fields(self))
+                    if self.metrics.aborted:
+                        print(f"    Aborted from the metrics viewer at {self.base}/{len(self.packets)} packets")
+                        break
                 
                 time.sleep(0.01)
 
             duration = time.time() - start_time
-            bps = total_data_bits / duration
-            self.results.append((loss * 100, bps))
-            
             self.running = False
             listener_thread.join()
+            if self.metrics is not None:
+                self.metrics.publish(time.monotonic(), min(self.base * self.packets.chunk_size, len(data)),
+                                     stream=f"loss {loss*100:g}%", loss_pct=loss * 100, **window_sender_fields(self))
+                self.metrics.finish(f"loss {loss*100:g}%")
+                if self.metrics.aborted:
+                    break
+            bps = total_data_bits / duration
+            self.results.append((loss * 100, bps))
             print(f"Done. Throughput: {bps:.2f} bits/sec")
 
         self.display_results()
@@ -120,7 +151,8 @@ class NetworkSender:
         print("Plot saved as 'throughput_plot.png'")
 
 if __name__ == "__main__":
-    sender = NetworkSender(window_size=10, timeout=0.2)
+    # Watch (or abort) the sweep live with `python metrics.py` in another terminal
+    sender = NetworkSender(window_size=10, timeout=0.2, metrics=MetricsPublisher("network_sender"))
     loss_rates_to_test = [0, 0.01, 0.05, 0.10, 0.50, 0.90]
     # Use 500KB to make it reasonably fast but stable
     sender.run_simulation(data_size_kb=500, loss_rates=loss_rates_to_test)
@@ -0,0 +1,503 @@
+import os
+import select
+import socket
+import struct
+import time
+import zlib
+
+# Wire format shared by every sender and receiver in this directory.
+#
+#   data packet: | magic | flags | length | seq | [timestamp] | payload |
+#   EOF packet:  | magic | flags | 12     | seq | [timestamp] | total bytes | crc32 |
+#   ACK:         | magic | flags | 8*n    | ack | [echoed timestamp] | n SACK blocks | [received] |
+#   parity:      | magic | flags | 4+L    | first seq of block | code | k | m | index | L-byte symbol |
+#
+# Parity packets (FLAG_FEC) protect a block of k consecutive data packets;
+# each symbol covers whole datagrams, zero-padded to the block's longest
+# (see fec.py). An ACK with FLAG_FEC carries the count of datagrams the
+# receiver has seen, so the sender can estimate loss.
+#
+# Text control messages never start with MAGIC, so receivers can tell them
+# apart from data by the first byte:
+#
+#   command: CMD:<name>:<value>[:<run_id>]
+#   reply:   ACK_CMD:<command>\n[<payload>]   or   ERR_CMD:<command>\n<reason>
+MAGIC = 0xA7
+
+FLAG_EOF = 0x01
+FLAG_ACK = 0x02
+FLAG_TS = 0x04
+FLAG_FEC = 0x08
+
+HEADER = struct.Struct("!BBHi")  # magic, flags, payload length, seq (signed: ACK -1 = nothing yet)
+TIMESTAMP = struct.Struct("!Q")  # sender clock, nanoseconds
+HEADER_SIZE = HEADER.size
+TS_HEADER_SIZE = HEADER.size + TIMESTAMP.size
+EOF_TRAILER = struct.Struct("!QI")  # transfer size in bytes, zlib.crc32 of the payload
+SACK_BLOCK = struct.Struct("!ii")  # first, last seq of a contiguous run held above the cumulative ACK
+MAX_SACK_BLOCKS = 4
+FEC_HEADER = struct.Struct("!BBBB")  # code, k, m, parity index
+FEC_REPORT = struct.Struct("!I")  # datagrams received this run (data and parity)
+MAX_DATAGRAM = 65507  # largest UDP payload over IPv4; receivers size their buffers for it
+
+
+class PacketBuffer:
+    """
+    Every packet of a transfer pre-encoded back to back in one bytearray.
+
+    packets[i] is a memoryview slice over header + payload, so a send or a
+    retransmission is a single sendto() with no string formatting, encoding
+    or copying. With timestamps=True each header carries a send timestamp
+    that stamp() rewrites in place just before the packet goes out.
+    """
+
+    def __init__(self, data, chunk_size=1024, timestamps=False):
+        if isinstance(data, str):
+            data = data.encode()
+        self.chunk_size = chunk_size
+        self.timestamps = timestamps
+        self.payload_bytes = len(data)
+
+        header_size = TS_HEADER_SIZE if timestamps else HEADER_SIZE
+        base_flags = FLAG_TS if timestamps else 0
+        num_data = (len(data) + chunk_size - 1) // chunk_size
+        self.buffer = bytearray(num_data * header_size + len(data) + header_size + EOF_TRAILER.size)
+        self.offsets = []
+
+        src = memoryview(data)
+        offset = 0
+        for seq in range(num_data):
+            chunk = src[seq * chunk_size:(seq + 1) * chunk_size]
+            HEADER.pack_into(self.buffer, offset, MAGIC, base_flags, len(chunk), seq)
+            self.buffer[offset + header_size:offset + header_size + len(chunk)] = chunk
+            self.offsets.append(offset)
+            offset += header_size + len(chunk)
+        # EOF packet, carrying the size and checksum so receivers can verify the transfer
+        HEADER.pack_into(self.buffer, offset, MAGIC, base_flags | FLAG_EOF, EOF_TRAILER.size, num_data)
+        EOF_TRAILER.pack_into(self.buffer, offset + header_size, len(data), zlib.crc32(data))
+        self.offsets.append(offset)
+        self.offsets.append(offset + header_size + EOF_TRAILER.size)
+
+        view = memoryview(self.buffer)
+        self.views = [view[self.offsets[i]:self.offsets[i + 1]] for i in range(num_data + 1)]
+
+    def __len__(self):
+        return len(self.views)
+
+    def __getitem__(self, seq):
+        return self.views[seq]
+
+    @property
+    def slots(self):
+        """Packets that can be outstanding at once (all of them: nothing is ever released)."""
+        return len(self.views)
+
+    def stamp(self, seq, now_ns=None):
+        """Write the send time into packet seq's header (no-op without timestamps)."""
+        if self.timestamps:
+            TIMESTAMP.pack_into(self.buffer, self.offsets[seq] + HEADER_SIZE,
+                                time.perf_counter_ns() if now_ns is None else now_ns)
+
+    def release(self, base):
+        """Everything stays in memory; see PacketStream."""
+
+
+class PacketStream:
+    """
+    PacketBuffer's interface over a source that is read lazily: a file path,
+    a binary file object or an iterable of bytes chunks.
+
+    Packets are built on first access into a ring of fixed-size packet
+    slots. Files are read straight into the slot with readinto. The
+    sender calls release(base) as its window advances, and a slot is reused
+    only once the packet in it has been released. Memory therefore stays at
+    slots * (header + chunk_size) however long the transfer is. slots must
+    be at least the sender's window.
+
+    The total packet count is known only once the source is exhausted.
+    Until then len() is one more than the packets built so far, so the
+    usual "seq < len(packets)" loops keep pulling packets. The CRC in the
+    EOF trailer is computed as the data streams past.
+    """
+
+    def __init__(self, source, chunk_size=1024, slots=64, timestamps=False):
+        self.chunk_size = chunk_size
+        self.timestamps = timestamps
+        self.header_size = TS_HEADER_SIZE if timestamps else HEADER_SIZE
+        self.base_flags = FLAG_TS if timestamps else 0
+        self.slots = slots
+        self.slot_size = self.header_size + max(chunk_size, EOF_TRAILER.size)
+        self.buffer = bytearray(slots * self.slot_size)
+        buffer_view = memoryview(self.buffer)
+        self.slot_views = [buffer_view[i * self.slot_size:(i + 1) * self.slot_size] for i in range(slots)]
+        self.views = [None] * slots  # current packet in each slot
+
+        self.built = 0
+        self.released = 0
+        self.total = None
+        self.payload_bytes = 0
+        self.crc = 0
+
+        self.owned_file = None
+        self.pending = memoryview(b"")
+        if isinstance(source, (str, os.PathLike)):
+            source = self.owned_file = open(source, "rb")
+        if hasattr(source, "readinto"):
+            self.read_chunk = self.read_file
+            self.file = source
+        else:
+            self.read_chunk = self.read_iterator
+            self.chunks = iter(source)
+
+    def __len__(self):
+        return self.total if self.total is not None else self.built + 1
+
+    def __getitem__(self, seq):
+        while self.built <= seq:
+            self.build_next()
+        if seq < self.built - self.slots:
+            raise IndexError(f"packet {seq} was released and its slot reused")
+        return self.views[seq % self.slots]
+
+    def read_file(self, dest):
+        filled = 0
+        while filled < len(dest):
+            n = self.file.readinto(dest[filled:])
+            if not n:
+                break
+            filled += n
+        return filled
+
+    def read_iterator(self, dest):
+        filled = 0
+        while filled < len(dest):
+            if not self.pending:
+                chunk = next(self.chunks, None)
+                if chunk is None:
+                    break
+                self.pending = memoryview(chunk.encode() if isinstance(chunk, str) else chunk)
+            n = min(len(dest) - filled, len(self.pending))
+            dest[filled:filled + n] = self.pending[:n]
+            self.pending = self.pending[n:]
+            filled += n
+        return filled
+
+    def build_next(self):
+        seq = self.built
+        if self.total is not None:
+            raise IndexError(f"packet {seq} is past EOF")
+        if seq - self.released >= self.slots:
+            raise BufferError(f"window wider than the {self.slots}-slot stream ring")
+        slot = self.slot_views[seq % self.slots]
+        payload = slot[self.header_size:self.header_size + self.chunk_size]
+        n = self.read_chunk(payload)
+        if n:
+            HEADER.pack_into(slot, 0, MAGIC, self.base_flags, n, seq)
+            self.crc = zlib.crc32(payload[:n], self.crc)
+            self.payload_bytes += n
+            self.views[seq % self.slots] = slot[:self.header_size + n]
+        else:
+            # Source exhausted: EOF packet with the size and checksum of everything sent
+            HEADER.pack_into(slot, 0, MAGIC, self.base_flags | FLAG_EOF, EOF_TRAILER.size, seq)
+            EOF_TRAILER.pack_into(slot, self.header_size, self.payload_bytes, self.crc)
+            self.views[seq % self.slots] = slot[:self.header_size + EOF_TRAILER.size]
+            self.total = seq + 1
+            if self.owned_file is not None:
+                self.owned_file.close()
+        self.built += 1
+
+    def stamp(self, seq, now_ns=None):
+        if self.timestamps:
+            TIMESTAMP.pack_into(self.buffer, (seq % self.slots) * self.slot_size + HEADER_SIZE,
+                                time.perf_counter_ns() if now_ns is None else now_ns)
+
+    def release(self, base):
+        """Packets below base are acknowledged and their slots may be reused."""
+        if base > self.released:
+            self.released = base
+
+
+def parse_packet(data):
+    """
+    Returns (seq, flags, timestamp_ns, payload) for a data packet, or None
+    if the datagram is not in the binary format. payload is a memoryview
+    into data, so nothing is copied or decoded.
+    """
+    if len(data) < HEADER_SIZE or data[0] != MAGIC:
+        return None
+    _, flags, length, seq = HEADER.unpack_from(data)
+    start = HEADER_SIZE
+    timestamp = None
+    if flags & FLAG_TS:
+        (timestamp,) = TIMESTAMP.unpack_from(data, HEADER_SIZE)
+        start = TS_HEADER_SIZE
+    return seq, flags, timestamp, memoryview(data)[start:start + length]
+
+
+def make_ack(ack_num, echo_ts=None, sack_blocks=(), received=None):
+    sack = b"".join(SACK_BLOCK.pack(first, last) for first, last in sack_blocks[:MAX_SACK_BLOCKS])
+    # The receive report sits after the SACK blocks, outside length, so parsers that don't know it skip it
+    flags = FLAG_ACK
+    report = b""
+    if received is not None:
+        flags |= FLAG_FEC
+        report = FEC_REPORT.pack(received & 0xFFFFFFFF)
+    if echo_ts is None:
+        return HEADER.pack(MAGIC, flags, len(sack), ack_num) + sack + report
+    return HEADER.pack(MAGIC, flags | FLAG_TS, len(sack), ack_num) + TIMESTAMP.pack(echo_ts) + sack + report
+
+
+def parse_ack(data):
+    """Returns (ack_num, echoed_timestamp_ns or None), or None if data is not an ACK."""
+    if len(data) < HEADER_SIZE or data[0] != MAGIC:
+        return None
+    _, flags, _, ack_num = HEADER.unpack_from(data)
+    if not flags & FLAG_ACK:
+        return None
+    if flags & FLAG_TS and len(data) >= TS_HEADER_SIZE:
+        return ack_num, TIMESTAMP.unpack_from(data, HEADER_SIZE)[0]
+    return ack_num, None
+
+
+def parse_sack_blocks(data):
+    """SACK blocks carried by an ACK, as a list of (first, last) seq pairs."""
+    _, flags, length, _ = HEADER.unpack_from(data)
+    start = TS_HEADER_SIZE if flags & FLAG_TS else HEADER_SIZE
+    return [SACK_BLOCK.unpack_from(data, offset)
+            for offset in range(start, start + length, SACK_BLOCK.size)]
+
+
+def parse_fec_report(data):
+    """Datagrams received as reported by an ACK, or None if it carries no report."""
+    if len(data) < HEADER_SIZE or data[0] != MAGIC:
+        return None
+    _, flags, length, _ = HEADER.unpack_from(data)
+    if not flags & FLAG_ACK or not flags & FLAG_FEC:
+        return None
+    offset = (TS_HEADER_SIZE if flags & FLAG_TS else HEADER_SIZE) + length
+    if len(data) < offset + FEC_REPORT.size:
+        return None
+    return FEC_REPORT.unpack_from(data, offset)[0]
+
+
+def sack_blocks_for(buffered, latest):
+    """
+    SACK blocks for the out-of-order seqs in buffered: the run containing
+    latest first (RFC 2018), then the others from the highest down.
+    """
+    runs = []
+    for seq in sorted(buffered):
+        if runs and seq == runs[-1][1] + 1:
+            runs[-1][1] = seq
+        else:
+            runs.append([seq, seq])
+    first = [tuple(r) for r in runs if r[0] <= latest <= r[1]]
+    rest = [tuple(r) for r in reversed(runs) if not r[0] <= latest <= r[1]]
+    return (first + rest)[:MAX_SACK_BLOCKS]
+
+
+class AckCoalescer:
+    """
+    Delayed cumulative ACKs. Instead of one ACK per data packet, the
+    receiver ACKs every `every` in-order packets, or `delay` seconds after
+    the first one it is holding, whichever comes first. Anything the sender
+    must hear about at once (a gap, a duplicate, EOF) is urgent and ACKed
+    immediately, so dup-ACK fast retransmit still works. An ACK echoes the
+    timestamp of the oldest packet it covers, so RTT samples include the
+    hold time (as RFC 7323 does for delayed ACKs).
+
+    every=1 is the usual one ACK per packet.
+    """
+
+    def __init__(self, every=1, delay=0.005):
+        self.every = every
+        self.delay = delay
+        self.pending = 0
+        self.echo_ts = None
+        self.deadline = None
+
+    def on_packet(self, echo_ts, now, urgent=False):
+        """Counts one data packet. True if an ACK should go out now; send it with take()'s timestamp."""
+        if not self.pending:
+            self.echo_ts = echo_ts
+            self.deadline = now + self.delay
+        self.pending += 1
+        return urgent or self.pending >= self.every or now >= self.deadline
+
+    def take(self):
+        """Timestamp to echo in the ACK being sent; nothing is held afterwards."""
+        echo_ts = self.echo_ts
+        self.pending = 0
+        self.echo_ts = self.deadline = None
+        return echo_ts
+
+    def next_timeout(self, now):
+        """Seconds until held packets must be ACKed (None if nothing is held)."""
+        if not self.pending:
+            return None
+        return max(0.0, self.deadline - now)
+
+
+def parse_ack_setting(value):
+    """SET_ACK's value, "<every>" or "<every>,<delay ms>", as (every, delay seconds)."""
+    every, _, delay_ms = value.partition(",")
+    every = int(every)
+    if every < 1:
+        raise ValueError(f"ACK every {every} packets")
+    return every, float(delay_ms) / 1000 if delay_ms else AckCoalescer().delay
+
+
+def new_run_id():
+    """Random id for one experiment run, so concurrent runs never share receiver state."""
+    return int.from_bytes(os.urandom(4), "big") & 0x7FFFFFFF
+
+
+def make_command(name, value="", run_id=None):
+    cmd = f"CMD:{name}:{value}"
+    if run_id is not None:
+        cmd += f":{run_id}"
+    return cmd.encode()
+
+
+def parse_command(data):
+    """
+    Returns (name, value, run_id or None) for a control command, or None.
+    Raises ValueError for a command whose run id is not a number.
+    """
+    if not data.startswith(b"CMD:"):
+        return None
+    parts = data.decode(errors="replace").split(":")
+    if len(parts) < 3:
+        return None
+    run_id = None
+    if len(parts) > 3 and parts[3]:
+        try:
+            run_id = int(parts[3])
+        except ValueError:
+            raise ValueError(f"run id {parts[3]!r} is not a number") from None
+    return parts[1], parts[2], run_id
+
+
+def send_command(sock, addr, name, value="", run_id=None, retries=5, timeout=0.25):
+    """
+    Sends a control command and waits for the receiver to acknowledge it,
+    resending up to retries times. Returns the reply payload (usually "").
+    Any other datagram that arrives meanwhile (e.g. a late ACK from the
+    previous run) is discarded. Raises TimeoutError if no reply arrives and
+    ValueError if the receiver rejects the command.
+    """
+    cmd = make_command(name, value, run_id)
+    ok_prefix = b"ACK_CMD:" + cmd + b"\n"
+    err_prefix = b"ERR_CMD:" + cmd + b"\n"
+    for _ in range(retries):
+        sock.sendto(cmd, addr)
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            readable, _, _ = select.select([sock], [], [], remaining)
+            if not readable:
+                break
+            try:
+                data, _ = sock.recvfrom(65536)
+            except (BlockingIOError, socket.timeout):
+                continue
+            if data.startswith(ok_prefix):
+                return data[len(ok_prefix):].decode()
+            if data.startswith(err_prefix):
+                raise ValueError(data[len(err_prefix):].decode())
+    raise TimeoutError(f"no reply to {cmd.decode()} from {addr}")
+
+
+def configure_run(sock, addr, run_id, mode="gbn", loss=0.0, rtt_ms=None, bw_mbps=None, fec=False,
+                  ack_every=1, ack_delay_ms=None):
+    """
+    Sets up one run on network_receiver.py through the acknowledged control
+    channel. SET_LOSS goes last because it starts the run.
+    """
+    send_command(sock, addr, "SET_MODE", mode, run_id)
+    if ack_every > 1:
+        value = str(ack_every) if ack_delay_ms is None else f"{ack_every},{ack_delay_ms}"
+        send_command(sock, addr, "SET_ACK", value, run_id)
+    if fec:
+        send_command(sock, addr, "SET_FEC", "on", run_id)
+    if rtt_ms is not None:
+        send_command(sock, addr, "SET_RTT", rtt_ms, run_id)
+    if bw_mbps is not None:
+        send_command(sock, addr, "SET_BW", bw_mbps, run_id)
+    send_command(sock, addr, "SET_LOSS", loss, run_id)
+
+
+def benchmark(data_size_kb=4096, chunk_size=1024, rounds=5):
+    """
+    Packets per second for the old text format against the binary one:
+    build + sendto on the sender side (loopback), parse on the receiver side.
+    """
+    data = "A" * (data_size_kb * 1024)
+
+    # Old path: formatted strings, .encode() per send, decode + split per receive
+    text_packets = []
+    for i in range(0, len(data), chunk_size):
+        text_packets.append(f"{len(text_packets)}|{data[i:i+chunk_size]}")
+    text_packets.append(f"{len(text_packets)}|EOF")
+    binary_packets = PacketBuffer(data, chunk_size)
+
+    rx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    rx.bind(('127.0.0.1', 0))
+    addr = rx.getsockname()
+    tx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def best_rate(fn, count):
+        best = float("inf")
+        for _ in range(rounds):
+            start = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - start)
+        return count / best
+
+    def send_text():
+        for pkt in text_packets:
+            tx.sendto(pkt.encode(), addr)
+
+    def send_binary():
+        for pkt in binary_packets:
+            tx.sendto(pkt, addr)
+
+    wire_text = [pkt.encode() for pkt in text_packets]
+    wire_binary = [bytes(pkt) for pkt in binary_packets]
+
+    def parse_text():
+        for raw in wire_text:
+            seq_num_str, payload = raw.decode().split('|', 1)
+            int(seq_num_str)
+
+    def parse_binary():
+        # What the receivers do: header fields only, payload never touched
+        for raw in wire_binary:
+            HEADER.unpack_from(raw)
+
+    # Receiver socket is never drained; loopback drops the overflow, which
+    # is fine since only the sending cost is being measured. Fill it once
+    # first so neither format gets timed against an empty queue.
+    send_text()
+    n = len(text_packets)
+    rows = [
+        ("sendto (build + send)", best_rate(send_text, n), best_rate(send_binary, n)),
+        ("parse (receiver side)", best_rate(parse_text, n), best_rate(parse_binary, n)),
+    ]
+    tx.close()
+    rx.close()
+
+    print(f"\nPacket format benchmark: {n} packets x {chunk_size}B payload")
+    print("=" * 70)
+    print(f"{'Path':<24} | {'Text (pkt/s)':>12} | {'Binary (pkt/s)':>14} | {'Speedup':>7}")
+    print("-" * 70)
+    for name, before, after in rows:
+        print(f"{name:<24} | {before:>12.0f} | {after:>14.0f} | {after / before:>6.2f}x")
+    print("=" * 70 + "\n")
+    return rows
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,101 @@
+import asyncio
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from async_transport import send_data
+from bulk_receiver import BulkReceiver
+from packet_format import MAX_DATAGRAM, TS_HEADER_SIZE, PacketBuffer
+
+IP_UDP_HEADERS = 28
+
+
+def loopback_mtu(interface="lo"):
+    try:
+        with open(f"/sys/class/net/{interface}/mtu") as f:
+            return int(f.read())
+    except OSError:
+        return 65536  # Linux default for lo
+
+
+def max_chunk_size(mtu=None):
+    """Largest payload per packet that still fits one unfragmented datagram."""
+    mtu = mtu or loopback_mtu()
+    return min(mtu - IP_UDP_HEADERS, MAX_DATAGRAM) - TS_HEADER_SIZE
+
+
+def _receiver_process(out_path, port, size, chunk_size, ack_every, results):
+    sys.stdout = open(os.devnull, "w")
+    try:
+        receiver = BulkReceiver(out_path, port=port, chunk_size=chunk_size, expected_size=size,
+                                ack_every=ack_every, linger=0.2)
+        results.put(receiver.receive())
+    finally:
+        os.remove(out_path)
+
+
+def run_probe_transfer(data, chunk_size, ack_every=1, port=12350, window_bytes=2 * 1024 * 1024, timeout=0.05):
+    """
+    One asyncio Go-Back-N transfer of data to a BulkReceiver at this payload
+    size. The window is window_bytes worth of packets, so every size keeps
+    the same bytes in flight. Socket calls are counted at both ends: the
+    sender's sendto per packet and recvfrom per ACK, and the receiver's
+    recvfrom_into per packet, sendto per ACK and the failed read + select
+    each time it drains.
+    """
+    out_path = os.path.join(tempfile.gettempdir(), f"payload_probe_{port}.bin")
+    results = multiprocessing.Queue()
+    receiver = multiprocessing.Process(target=_receiver_process,
+                                       args=(out_path, port, len(data), chunk_size, ack_every, results))
+    receiver.start()
+    time.sleep(0.3)  # let the receiver bind
+
+    packets = PacketBuffer(data, chunk_size, timestamps=True)
+    window = max(8, window_bytes // chunk_size)
+    start = time.perf_counter()
+    protocol = asyncio.run(send_data(packets, port=port, window_size=window, timeout=timeout))
+    duration = time.perf_counter() - start
+    received = results.get()
+    receiver.join()
+
+    mb = len(data) / (1024 * 1024)
+    return dict(chunk_size=chunk_size, ack_every=ack_every, window=window,
+                goodput_mbps=len(data) * 8 / duration / 1e6,
+                sender_calls_per_mb=(protocol.packets_sent + protocol.acks_received) / mb,
+                receiver_calls_per_mb=(received["packets"] + received["acks"] + 2 * received["waits"]) / mb,
+                packets_per_ack=received["packets"] / max(received["acks"], 1),
+                retransmissions=protocol.retransmissions,
+                checksum_ok=received["checksum_ok"])
+
+
+def probe_payload_size(size_mb=16, sizes=None, ack_every=1, port=12350):
+    """
+    Probe mode: sends size_mb MiB at each payload size, doubling from 512
+    bytes up to what the loopback MTU allows, and picks the one with the best
+    goodput. Returns (best chunk size, one result dict per size).
+    """
+    data = os.urandom(size_mb * 1024 * 1024)
+    if sizes is None:
+        largest = max_chunk_size()
+        sizes = [size for size in (1 << n for n in range(9, 17)) if size < largest] + [largest]
+    runs = [run_probe_transfer(data, size, ack_every, port) for size in sizes]
+    best = max(runs, key=lambda r: r["goodput_mbps"] if r["checksum_ok"] else 0.0)
+    return best["chunk_size"], runs
+
+
+if __name__ == "__main__":
+    print(f"Loopback MTU {loopback_mtu()}, largest payload per packet {max_chunk_size()} bytes")
+    print("\n" + "=" * 100)
+    print(f"{'Payload (B)':>11} | {'ACK every':>9} | {'Window':>6} | {'Mbit/s':>8} | {'Sender calls/MB':>15} | "
+          f"{'Recv calls/MB':>13} | {'Pkts/ACK':>8} | {'Retx':>5} | {'CRC':>3}")
+    print("-" * 100)
+    for ack_every in (1, 16):
+        best, runs = probe_payload_size(ack_every=ack_every)
+        for r in runs:
+            print(f"{r['chunk_size']:>11} | {r['ack_every']:>9} | {r['window']:>6} | {r['goodput_mbps']:>8.1f} | "
+                  f"{r['sender_calls_per_mb']:>15.0f} | {r['receiver_calls_per_mb']:>13.0f} | "
+                  f"{r['packets_per_ack']:>8.1f} | {r['retransmissions']:>5} | {'OK' if r['checksum_ok'] else 'BAD':>3}")
+        print(f"Best payload with ACKs every {ack_every} packet(s): {best} bytes")
+        print("-" * 100)
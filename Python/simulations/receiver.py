@@ -2,6 +2,8 @@ import socket
 import random
 import time
 
+from packet_format import HEADER, HEADER_SIZE, TIMESTAMP, MAGIC, FLAG_EOF, FLAG_TS, make_ack
+
 def start_receiver(host='127.0.0.1', port=12345, loss_rate=0.01):
     sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     sock.bind((host, port))
@@ -19,34 +21,38 @@ def start_receiver(host='127.0.0.1', port=12345, loss_rate=0.01):
             
             # Simulate packet loss
             if random.random() < loss_rate:
-                print(f"DEBUG: Dropping packet with seq {data.decode().split('|')[0]}")
+                seq = HEADER.unpack_from(data)[3] if len(data) >= HEADER_SIZE else None
+                print(f"DEBUG: Dropping packet with seq {seq}")
                 dropped_pkts += 1
                 continue
 
             try:
-                msg = data.decode()
-                seq_num_str, payload = msg.split('|', 1)
-                seq_num = int(seq_num_str)
+                if data[0] != MAGIC:
+                    raise ValueError("not a data packet")
+                _, flags, length, seq_num = HEADER.unpack_from(data)
                 
                 if seq_num == expected_seq_num:
                     # print(f"Received in-order: {seq_num}")
                     expected_seq_num += 1
-                    total_received += len(payload)
+                    if not flags & FLAG_EOF:
+                        total_received += length
                 else:
                     # Ignore out-of-order packets (Go-Back-N)
                     # print(f"Received out-of-order: {seq_num}, expected: {expected_seq_num}")
                     pass
                 
                 # Cumulative ACK: acknowledge the highest in-order sequence number received
-                ack = str(expected_seq_num - 1).encode()
+                # (echoing the packet's send timestamp for the sender's RTT estimator)
+                echo_ts = TIMESTAMP.unpack_from(data, HEADER_SIZE)[0] if flags & FLAG_TS else None
+                ack = make_ack(expected_seq_num - 1, echo_ts)
                 sock.sendto(ack, addr)
                 
-                if payload == "EOF":
+                if flags & FLAG_EOF:
                     print("\n--- Transmission Complete ---")
                     print(f"Total packets handled: {total_pkts}")
                     print(f"Packets dropped (simulated): {dropped_pkts}")
                     print(f"Actual loss rate: {(dropped_pkts/total_pkts)*100:.2f}%")
-                    print(f"Total data received: {total_received - 3} bytes") # subtract 'EOF' size
+                    print(f"Total data received: {total_received} bytes")
                     # Reset for next run or exit
                     expected_seq_num = 0
                     total_received = 0
@@ -1,155 +1,109 @@
-import socket
 import time
 import threading
+from functools import partial
 import matplotlib.pyplot as plt
+import numpy as np
 
-# Reuse the protocol logic from comparative_analyzer.py
-# (For a real system we'd import, but for simplicity in a single script:)
+import throughput_model
+# Shared with comparative_analyzer.py so both sweeps run the same protocol code
+from comparative_analyzer import UDPSender, TCPSimSender, drive_window_sender
+from packet_format import configure_run, new_run_id
+from rtt_estimator import RttEstimator
 
-class BaseSender:
-    def __init__(self, host='127.0.0.1', port=12345, timeout_mult=2.5):
-        self.host = host
-        self.port = port
-        self.timeout_mult = timeout_mult
-        self.timeout = 0.5  # Default
-        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self.sock.settimeout(0.05)
-        self.base = 0
-        self.next_seq_num = 0
-        self.packets = []
-        self.timer_start_time = None
-        self.lock = threading.Lock()
-        self.running = True
+TIMEOUT_MULT = 2.5
+INITIAL_RTO = 1.0  # RFC 6298 initial RTO for the adaptive estimator
 
-    def create_packets(self, data, chunk_size=1024):
-        self.packets = []
-        for i in range(0, len(data), chunk_size):
-            chunk = data[i:i+chunk_size]
-            seq_num = len(self.packets)
-            self.packets.append(f"{seq_num}|{chunk}")
-        self.packets.append(f"{len(self.packets)}|EOF")
-
-class UDPSender(BaseSender):
-    def __init__(self, window_size=10, **kwargs):
-        super().__init__(**kwargs)
-        self.window_size = window_size
-
-    def ack_listener(self):
-        while self.running:
-            try:
-                data, _ = self.sock.recvfrom(1024)
-                ack_num = int(data.decode())
-                with self.lock:
-                    if ack_num >= self.base:
-                        self.base = ack_num + 1
-                        self.timer_start_time = time.time() if self.base != self.next_seq_num else None
-            except: continue
-
-class TCPSimSender(BaseSender):
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        self.cwnd = 1.0
-        self.ssthresh = 64
-        self.dup_acks = 0
-        self.last_ack = -1
-
-    def ack_listener(self):
-        while self.running:
-            try:
-                data, _ = self.sock.recvfrom(1024)
-                ack_num = int(data.decode())
-                with self.lock:
-                    if ack_num >= self.base:
-                        if ack_num > self.last_ack:
-                            if self.cwnd < self.ssthresh: self.cwnd += 1
-                            else: self.cwnd += 1.0 / int(self.cwnd)
-                            self.base = ack_num + 1
-                            self.last_ack = ack_num
-                            self.dup_acks = 0
-                        else:
-                            self.dup_acks += 1
-                            if self.dup_acks == 3:
-                                self.ssthresh = max(self.cwnd / 2, 2)
-                                self.cwnd = self.ssthresh
-                                self.next_seq_num = self.base
-                        
-                        self.timer_start_time = time.time() if self.base != self.next_seq_num else None
-            except: continue
-
-def run_rtt_test(sender_class, rtt_ms, loss_rate, data_size_kb):
-    sender = sender_class(host='127.0.0.1', port=12345)
-    # RTT-Aware Timeout: timeout should be larger than RTT
-    sender.timeout = max(0.001, (rtt_ms / 1000.0) * sender.timeout_mult)
+def run_rtt_test(sender_class, rtt_ms, loss_rate, data_size_kb, adaptive_rto=True, host='127.0.0.1', port=12345,
+                 stats=None):
+    """
+    Returns (throughput in bits/sec, spurious timeout rate). Pass a dict as
+    stats to get the sender's final SRTT and RTO (seconds) back in it.
+    """
+    if adaptive_rto:
+        # Learns the RTT from echoed timestamps, like a real sender has to
+        sender = sender_class(host=host, port=port, timeout=INITIAL_RTO)
+    else:
+        # Baseline: fixed timeout derived from the configured RTT (an oracle)
+        sender = sender_class(host=host, port=port, adaptive_rto=False)
+        sender.rtt = RttEstimator(initial_rto=max(0.001, (rtt_ms / 1000.0) * TIMEOUT_MULT), adaptive=False)
     
     data = "Y" * (data_size_kb * 1024)
     sender.create_packets(data)
     
-    # Handshake to set RTT and Loss
-    sender.sock.sendto(f"CMD:SET_RTT:{rtt_ms}".encode(), (sender.host, sender.port))
-    time.sleep(0.5)
-    sender.sock.sendto(f"CMD:SET_LOSS:{loss_rate}".encode(), (sender.host, sender.port))
-    time.sleep(0.5)
+    # Acknowledged handshake to set RTT and Loss for this run only
+    configure_run(sender.sock, (sender.host, sender.port), new_run_id(),
+                  mode=sender.receiver_mode, loss=loss_rate, rtt_ms=rtt_ms)
 
     listener = threading.Thread(target=sender.ack_listener)
     listener.start()
     
     start_time = time.time()
-    while sender.base < len(sender.packets):
-        with sender.lock:
-            limit = sender.window_size if hasattr(sender, 'window_size') else int(sender.cwnd)
-            while sender.next_seq_num < sender.base + limit and sender.next_seq_num < len(sender.packets):
-                sender.sock.sendto(sender.packets[sender.next_seq_num].encode(), (sender.host, sender.port))
-                if sender.base == sender.next_seq_num: sender.timer_start_time = time.time()
-                sender.next_seq_num += 1
-                # No extra sleep here to let RTT be the limiting factor
-
-            if sender.timer_start_time and (time.time() - sender.timer_start_time > sender.timeout):
-                if hasattr(sender, 'cwnd'):
-                    sender.ssthresh = max(sender.cwnd / 2, 2)
-                    sender.cwnd = 1.0
-                sender.next_seq_num = sender.base
-                sender.timer_start_time = time.time()
-        time.sleep(0.001)
+    # No fixed send gap here to let RTT be the limiting factor (TCP-Sim still paces per its controller)
+    drive_window_sender(sender, send_gap=0.0, poll_interval=0.001)
 
     duration = time.time() - start_time
     sender.running = False
     listener.join()
     sender.sock.close()
-    return (len(data) * 8) / duration
+    if stats is not None:
+        stats.update(srtt_s=sender.rtt.srtt, rto_s=sender.rtt.rto)
+    return (len(data) * 8) / duration, sender.rtt.spurious_rate
+
+PROTOCOLS = [
+    ("UDP (Go-Back-N)", UDPSender),
+    ("TCP-Sim (AIMD/Reno)", TCPSimSender),
+    ("TCP-Sim (CUBIC)", partial(TCPSimSender, cc="cubic")),
+    ("TCP-Sim (BBR-like)", partial(TCPSimSender, cc="bbr")),
+]
+RTO_MODES = [("adaptive", True), ("fixed", False)]
 
 if __name__ == "__main__":
     rtts = [0.1, 1.0, 10, 100, 500] # ms
     fixed_loss = 0.01 # 1% loss
     data_size = 32 # 32KB to make high-latency runs finish faster
     
-    udp_results = []
-    tcp_results = []
+    runs = [(name, mode) for name, _ in PROTOCOLS for mode, _ in RTO_MODES]
+    throughput = {run: [] for run in runs}
+    spurious = {run: [] for run in runs}
 
     print(f"RTT Analysis (Loss={fixed_loss*100}% on 32KB payload)")
-    print(f"{'RTT (ms)':<10} | {'UDP (bps)':<15} | {'TCP-Sim (bps)':<15}")
-    print("-" * 45)
+    print(f"{'RTT (ms)':<10} | {'Protocol':<20} | {'RTO':<8} | {'Throughput (bps)':>16} | {'Spurious RTO':>12}")
+    print("-" * 78)
 
     for rtt in rtts:
-        print(f"Testing RTT={rtt}ms...")
-        udp_bps = run_rtt_test(UDPSender, rtt, fixed_loss, data_size)
-        print(f"  UDP: {udp_bps:.2f} bps")
-        tcp_bps = run_rtt_test(TCPSimSender, rtt, fixed_loss, data_size)
-        print(f"  TCP: {tcp_bps:.2f} bps")
-        
-        udp_results.append(udp_bps)
-        tcp_results.append(tcp_bps)
-        
-        print(f"{rtt:<10.1f} | {udp_bps:<15.2f} | {tcp_bps:<15.2f}")
+        for name, sender_class in PROTOCOLS:
+            for mode, adaptive in RTO_MODES:
+                bps, spurious_rate = run_rtt_test(sender_class, rtt, fixed_loss, data_size, adaptive_rto=adaptive)
+                throughput[(name, mode)].append(bps)
+                spurious[(name, mode)].append(spurious_rate * 100)
+                print(f"{rtt:<10.1f} | {name:<20} | {mode:<8} | {bps:>16.2f} | {spurious_rate*100:>11.1f}%")
 
-    # Plotting
-    plt.figure(figsize=(10, 6))
-    plt.plot(rtts, udp_results, marker='o', label='UDP (Go-Back-N)')
-    plt.plot(rtts, tcp_results, marker='s', label='TCP-Sim (AIMD/Reno)')
-    plt.xscale('log') # Log scale for RTT since it spans orders of magnitude
-    plt.title(f'Protocol Throughput vs. Latency (RTT) at {fixed_loss*100}% Loss')
-    plt.xlabel('Round Trip Time (ms) - Log Scale')
-    plt.ylabel('Throughput (bits per second)')
-    plt.legend()
-    plt.grid(True, which="both", ls="-")
+    # Plotting: solid = adaptive RTO, dashed = fixed RTT x TIMEOUT_MULT baseline, dotted black = analytic models
+    markers = ['o', 's', 'v', 'P']
+    fig, (ax_bps, ax_spurious) = plt.subplots(1, 2, figsize=(16, 6))
+    for (name, _), marker in zip(PROTOCOLS, markers):
+        for mode, adaptive in RTO_MODES:
+            style = dict(marker=marker, linestyle='-' if adaptive else '--', label=f"{name} ({mode} RTO)")
+            ax_bps.plot(rtts, throughput[(name, mode)], **style)
+            ax_spurious.plot(rtts, spurious[(name, mode)], **style)
+    # Steady-state models; 32KB transfers spend much of their time in slow start, so expect to fall short at long RTTs
+    model_rtt = np.geomspace(min(rtts), max(rtts), 200) / 1000
+    ax_bps.plot(model_rtt * 1000, throughput_model.gbn(fixed_loss, model_rtt, window=10),
+                color='k', linestyle=':', label='Go-Back-N model (W=10)')
+    ax_bps.plot(model_rtt * 1000, throughput_model.padhye(fixed_loss, model_rtt),
+                color='tab:gray', linestyle=':', label='Padhye model (Reno)')
+    ax_bps.plot(model_rtt * 1000, throughput_model.mathis(fixed_loss, model_rtt),
+                color='tab:gray', linestyle='-.', label='Mathis model (Reno)')
+    ax_bps.set_yscale('log')
+    ax_bps.set_title(f'Protocol Throughput vs. Latency (RTT) at {fixed_loss*100}% Loss')
+    ax_bps.set_ylabel('Throughput (bits per second)')
+    ax_spurious.set_title('Spurious Timeouts vs. Latency (RTT)')
+    ax_spurious.set_ylabel('Spurious Timeouts (% of timeouts)')
+    for ax in (ax_bps, ax_spurious):
+        ax.set_xscale('log') # Log scale for RTT since it spans orders of magnitude
+        ax.set_xlabel('Round Trip Time (ms) - Log Scale')
+        ax.legend()
+        ax.grid(True, which="both", ls="-")
+    plt.tight_layout()
     plt.savefig('rtt_impact_plot.png')
     print("\nRTT impact plot saved as 'rtt_impact_plot.png'")
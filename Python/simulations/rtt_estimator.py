@@ -0,0 +1,96 @@
+import time
+
+
+class RttEstimator:
+    """
+    Retransmission timeout estimator (Jacobson/Karels, RFC 6298).
+
+    SRTT/RTTVAR are fed from send timestamps echoed back in ACKs. Each
+    transmission is re-stamped, so an echoed timestamp always identifies
+    the copy that was ACKed. Karn's rule still applies to ACKs that carry no
+    echo: samples for retransmitted packets are discarded and the backed-off
+    RTO is kept until a clean sample arrives. Timeouts double the RTO up to
+    max_rto.
+
+    With adaptive=False the RTO stays fixed at initial_rto (the old
+    behaviour), but timeouts and spurious retransmissions are still counted,
+    so both modes can be compared on the same runs.
+
+    A timeout is counted as spurious (Eifel detection) when the ACK that
+    covers the retransmitted packet echoes a timestamp older than the
+    retransmission, i.e. the original copy was never lost.
+    """
+
+    def __init__(self, initial_rto=1.0, min_rto=0.01, max_rto=60.0, adaptive=True,
+                 alpha=1 / 8, beta=1 / 4, k=4, granularity=0.001):
+        self.initial_rto = initial_rto
+        self.min_rto = min_rto
+        self.max_rto = max_rto
+        self.adaptive = adaptive
+        self.alpha = alpha
+        self.beta = beta
+        self.k = k
+        self.granularity = granularity
+
+        self.srtt = None
+        self.rttvar = None
+        self.latest_rtt = None
+        self.base_rto = initial_rto
+        self.backoff = 1
+
+        self.samples = 0
+        self.timeouts = 0
+        self.spurious_timeouts = 0
+        self.retransmitted_at = {}  # seq -> ns of its first timeout retransmission
+
+    @property
+    def rto(self):
+        if not self.adaptive:
+            return self.initial_rto
+        return min(self.base_rto * self.backoff, self.max_rto)
+
+    @property
+    def spurious_rate(self):
+        return self.spurious_timeouts / self.timeouts if self.timeouts else 0.0
+
+    def sample(self, rtt):
+        """Folds one RTT measurement (seconds) into SRTT/RTTVAR."""
+        self.samples += 1
+        self.latest_rtt = rtt
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = (1 - self.beta) * self.rttvar + self.beta * abs(self.srtt - rtt)
+            self.srtt = (1 - self.alpha) * self.srtt + self.alpha * rtt
+        self.base_rto = max(self.min_rto, self.srtt + max(self.granularity, self.k * self.rttvar))
+        self.backoff = 1
+
+    def on_ack(self, ack_num, echo_ts_ns=None, sent_ns=None, retransmitted=False, now_ns=None):
+        """
+        Called for every new (non-duplicate) ACK. Pass echo_ts_ns when the
+        ACK echoes a timestamp; otherwise sent_ns/retransmitted describe the
+        ACKed packet and Karn's rule decides whether it is a valid sample.
+        """
+        if now_ns is None:
+            now_ns = time.perf_counter_ns()
+
+        if self.retransmitted_at:
+            for seq in [s for s in self.retransmitted_at if s <= ack_num]:
+                retx_ns = self.retransmitted_at.pop(seq)
+                if echo_ts_ns is not None and echo_ts_ns < retx_ns:
+                    self.spurious_timeouts += 1
+
+        if echo_ts_ns is not None:
+            self.sample((now_ns - echo_ts_ns) / 1e9)
+        elif sent_ns is not None and not retransmitted:
+            self.sample((now_ns - sent_ns) / 1e9)
+        # else: ambiguous sample (Karn's rule), keep the current RTO
+
+    def on_timeout(self, seq, now_ns=None):
+        """Called when the timer for seq fires, before it is retransmitted."""
+        self.timeouts += 1
+        if seq not in self.retransmitted_at:
+            self.retransmitted_at[seq] = time.perf_counter_ns() if now_ns is None else now_ns
+        if self.adaptive:
+            self.backoff = min(self.backoff * 2, 1 << 16)
@@ -0,0 +1,155 @@
+import select
+import socket
+import time
+
+from packet_format import PacketBuffer, PacketStream, parse_ack, parse_sack_blocks
+from rtt_estimator import RttEstimator
+from timer_wheel import TimerWheel
+
+
+class SelectiveRepeatSender:
+    """
+    Selective Repeat: every packet has its own retransmission timer and only
+    the packets that time out are resent, never the whole window.
+
+    The receiver must run in "sack" mode (it buffers out-of-order packets
+    and reports them in SACK blocks). Plain SR only trusts the first block,
+    which always covers the packet that triggered the ACK, i.e. it sees
+    per-packet ACKs.
+    """
+
+    receiver_mode = "sack"
+
+    def __init__(self, host='127.0.0.1', port=12345, window_size=10, timeout=0.2, adaptive_rto=True):
+        self.host = host
+        self.port = port
+        self.window_size = window_size
+        self.timeout = timeout
+        # RTO from echoed timestamps; adaptive_rto=False keeps it fixed at timeout
+        self.rtt = RttEstimator(initial_rto=timeout, adaptive=adaptive_rto)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.settimeout(0.05)
+        self.base = 0
+        self.next_seq_num = 0
+        self.packets = []
+        self.acked = bytearray()
+        self.timers = None
+        self.packets_sent = 0
+        self.retransmissions = 0
+
+    def create_packets(self, data, chunk_size=1024):
+        self.packets = PacketBuffer(data, chunk_size, timestamps=True)
+        self.acked = bytearray(self.window_size)
+
+    def create_stream(self, source, chunk_size=1024):
+        """Streams from a file path, file object or chunk iterator in window-sized memory."""
+        self.packets = PacketStream(source, chunk_size, slots=self.window_size, timestamps=True)
+        self.acked = bytearray(self.window_size)
+
+    def send_packet(self, seq):
+        self.packets.stamp(seq)
+        self.sock.sendto(self.packets[seq], (self.host, self.port))
+        self.packets_sent += 1
+        self.timers.schedule(seq, self.rtt.rto)
+
+    def retransmit(self, seq):
+        self.retransmissions += 1
+        self.send_packet(seq)
+
+    # Per-packet state lives in window-sized rings indexed by seq % window_size,
+    # so it does not grow with the transfer
+    def mark_acked(self, first, last):
+        for seq in range(max(first, self.base), min(last + 1, self.next_seq_num)):
+            slot = seq % self.window_size
+            if not self.acked[slot]:
+                self.acked[slot] = 1
+                self.timers.cancel(seq)
+
+    def advance_base(self):
+        while self.acked[self.base % self.window_size]:
+            self.acked[self.base % self.window_size] = 0
+            self.base += 1
+        self.packets.release(self.base)
+
+    def on_ack(self, ack_num, sack_blocks):
+        self.mark_acked(self.base, ack_num)
+        for first, last in sack_blocks[:1]:
+            self.mark_acked(first, last)
+
+    def on_timeout(self, seq):
+        if seq >= self.base and not self.acked[seq % self.window_size]:
+            self.rtt.on_timeout(seq)
+            self.retransmit(seq)
+
+    def transfer(self):
+        """Runs the whole transfer on one select() loop; no threads, no polling sleeps."""
+        self.timers = TimerWheel()
+        self.sock.setblocking(False)
+
+        # len(packets) is re-read each time: a stream only knows its length at EOF
+        while self.base < len(self.packets):
+            while self.next_seq_num < self.base + self.window_size and self.next_seq_num < len(self.packets):
+                self.send_packet(self.next_seq_num)
+                self.next_seq_num += 1
+
+            readable, _, _ = select.select([self.sock], [], [], self.timers.next_timeout())
+            if readable:
+                while True:
+                    try:
+                        data, _ = self.sock.recvfrom(1024)
+                    except BlockingIOError:
+                        break
+                    ack = parse_ack(data)
+                    if ack is None:
+                        continue
+                    ack_num, echo_ts = ack
+                    # Each ACK echoes the stamp of the copy that triggered it, so every echo is a valid sample
+                    self.rtt.on_ack(ack_num, echo_ts)
+                    self.on_ack(ack_num, parse_sack_blocks(data))
+                self.advance_base()
+
+            for seq in self.timers.advance(time.monotonic()):
+                self.on_timeout(seq)
+
+
+class SackSender(SelectiveRepeatSender):
+    """
+    SACK-based recovery: uses every SACK block, and treats a hole as lost
+    (retransmitting it at once, RFC 6675 style) when dup_thresh packets
+    above it have been SACKed, instead of waiting for its timer.
+    """
+
+    def __init__(self, dup_thresh=3, **kwargs):
+        super().__init__(**kwargs)
+        self.dup_thresh = dup_thresh
+        self.fast_retransmitted = bytearray()
+
+    def create_packets(self, data, chunk_size=1024):
+        super().create_packets(data, chunk_size)
+        self.fast_retransmitted = bytearray(self.window_size)
+
+    def create_stream(self, source, chunk_size=1024):
+        super().create_stream(source, chunk_size)
+        self.fast_retransmitted = bytearray(self.window_size)
+
+    def advance_base(self):
+        for seq in range(self.base, self.next_seq_num):
+            if not self.acked[seq % self.window_size]:
+                break
+            self.fast_retransmitted[seq % self.window_size] = 0
+        super().advance_base()
+
+    def on_ack(self, ack_num, sack_blocks):
+        self.mark_acked(self.base, ack_num)
+        for first, last in sack_blocks:
+            self.mark_acked(first, last)
+
+        sacked_above = 0
+        for seq in range(self.next_seq_num - 1, self.base - 1, -1):
+            slot = seq % self.window_size
+            if self.acked[slot]:
+                sacked_above += 1
+            elif sacked_above >= self.dup_thresh and not self.fast_retransmitted[slot]:
+                # Once per hole; if the retransmission is lost too, the timer recovers it
+                self.fast_retransmitted[slot] = 1
+                self.retransmit(seq)
@@ -2,12 +2,17 @@ import socket
 import time
 import threading
 
+from packet_format import PacketBuffer, parse_ack
+from rtt_estimator import RttEstimator
+
 class Sender:
-    def __init__(self, host='127.0.0.1', port=12345, window_size=5, timeout=0.5):
+    def __init__(self, host='127.0.0.1', port=12345, window_size=5, timeout=0.5, adaptive_rto=True):
         self.host = host
         self.port = port
         self.window_size = window_size
         self.timeout = timeout
+        # RTO from echoed timestamps; adaptive_rto=False keeps it fixed at timeout
+        self.rtt = RttEstimator(initial_rto=timeout, adaptive=adaptive_rto)
         
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self.sock.settimeout(0.1) # short timeout for non-blocking recv
@@ -20,28 +25,27 @@ class Sender:
         self.running = True
 
     def create_packets(self, data, chunk_size=1024):
-        self.packets = []
-        for i in range(0, len(data), chunk_size):
-            chunk = data[i:i+chunk_size]
-            seq_num = len(self.packets)
-            self.packets.append(f"{seq_num}|{chunk}")
-        # Add EOF packet
-        self.packets.append(f"{len(self.packets)}|EOF")
+        # Pre-encoded binary packets (EOF packet included)
+        self.packets = PacketBuffer(data, chunk_size, timestamps=True)
 
     def ack_listener(self):
         while self.running:
             try:
                 data, _ = self.sock.recvfrom(1024)
-                ack_num = int(data.decode())
+                ack = parse_ack(data)
+                if ack is None:
+                    continue
+                ack_num, echo_ts = ack
                 with self.lock:
                     if ack_num >= self.base:
+                        self.rtt.on_ack(ack_num, echo_ts)
                         print(f"ACK received: {ack_num}")
                         self.base = ack_num + 1
                         if self.base == self.next_seq_num:
                             self.timer_start_time = None # Stop timer
                         else:
                             self.timer_start_time = time.time() # Restart timer
-            except (socket.timeout, ValueError):
+            except socket.timeout:
                 continue
             except Exception as e:
                 if self.running:
@@ -53,7 +57,7 @@ class Sender:
         listener_thread.start()
 
         start_time = time.time()
-        total_data_sent = sum(len(p.split('|', 1)[1]) for p in self.packets if '|' in p)
+        total_data_sent = self.packets.payload_bytes
         
         print(f"Starting transmission of {len(self.packets)} packets...")
 
@@ -63,18 +67,21 @@ class Sender:
                 while self.next_seq_num < self.base + self.window_size and self.next_seq_num < len(self.packets):
                     pkt = self.packets[self.next_seq_num]
                     # print(f"Sending packet: {self.next_seq_num}")
-                    self.sock.sendto(pkt.encode(), (self.host, self.port))
+                    self.packets.stamp(self.next_seq_num)
+                    self.sock.sendto(pkt, (self.host, self.port))
                     if self.base == self.next_seq_num:
                         self.timer_start_time = time.time()
                     self.next_seq_num += 1
 
                 # Check for timeout
-                if self.timer_start_time and (time.time() - self.timer_start_time > self.timeout):
-                    print(f"Timeout! Retransmitting window from {self.base}")
+                if self.timer_start_time and (time.time() - self.timer_start_time > self.rtt.rto):
+                    print(f"Timeout! Retransmitting window from {self.base} (RTO {self.rtt.rto*1000:.1f}ms)")
+                    self.rtt.on_timeout(self.base)
                     self.timer_start_time = time.time()
                     for i in range(self.base, self.next_seq_num):
                         pkt = self.packets[i]
-                        self.sock.sendto(pkt.encode(), (self.host, self.port))
+                        self.packets.stamp(i)
+                        self.sock.sendto(pkt, (self.host, self.port))
 
             time.sleep(0.01) # Small sleep to avoid CPU pinning
 
@@ -85,6 +92,9 @@ class Sender:
         print("\n--- Sender Statistics ---")
         print(f"Total time: {duration:.2f} seconds")
         print(f"Effective throughput: {throughput:.2f} kbps")
+        if self.rtt.srtt is not None:
+            print(f"SRTT: {self.rtt.srtt*1000:.2f} ms, RTO: {self.rtt.rto*1000:.1f} ms")
+        print(f"Timeouts: {self.rtt.timeouts} ({self.rtt.spurious_timeouts} spurious)")
         
         self.running = False
         listener_thread.join()
@@ -0,0 +1,138 @@
+"""
+Runs network_receiver as one process per core behind SO_REUSEPORT and
+measures how receive throughput scales with the number of workers.
+
+Near-linear scaling is still unverified: the only numbers so far come
+from a single-core host, where extra workers just take a larger share of
+the one CPU. Run this module on a multi-core host to check it.
+"""
+import ctypes
+import multiprocessing
+import os
+import random
+import socket
+import sys
+import time
+
+from network_receiver import start_receiver
+from packet_format import PacketBuffer
+
+COUNTERS = ("packets", "bytes", "acks", "flows")
+
+
+class ShardStats:
+    """
+    Running counters of every receiver worker in one shared-memory array,
+    one row per worker. Each worker writes only its own row, so there is no
+    lock; a reader may catch a row mid-update, which is harmless for rates.
+    """
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.array = multiprocessing.Array(ctypes.c_uint64, workers * len(COUNTERS), lock=False)
+        self.offset = None
+
+    def for_worker(self, index):
+        """Points publish() at worker index's row (called in the worker after fork)."""
+        self.offset = index * len(COUNTERS)
+        return self
+
+    def publish(self, *values):
+        self.array[self.offset:self.offset + len(COUNTERS)] = values
+
+    def snapshot(self):
+        """One dict of counters per worker."""
+        values = self.array[:]
+        return [dict(zip(COUNTERS, values[i * len(COUNTERS):(i + 1) * len(COUNTERS)]))
+                for i in range(self.workers)]
+
+    def totals(self):
+        rows = self.snapshot()
+        return {name: sum(row[name] for row in rows) for name in COUNTERS}
+
+
+def _worker_process(host, port, index, stats):
+    random.seed()  # forked workers would otherwise drop the same packets
+    sys.stdout = open(os.devnull, "w")
+    start_receiver(host, port, reuse_port=True, shard=stats.for_worker(index))
+
+
+def start_sharded_receiver(host='127.0.0.1', port=12345, workers=None):
+    """
+    Forks workers network_receiver processes that all bind (host, port)
+    with SO_REUSEPORT. The kernel hashes each flow's address to one worker,
+    and since a sender's control commands and data come from the same
+    socket, that worker holds all of the flow's state. Returns the processes
+    and the ShardStats they publish into.
+    """
+    workers = workers or os.cpu_count() or 1
+    stats = ShardStats(workers)
+    processes = [multiprocessing.Process(target=_worker_process, args=(host, port, i, stats), daemon=True)
+                 for i in range(workers)]
+    for process in processes:
+        process.start()
+    return processes, stats
+
+
+def stop_sharded_receiver(processes):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.join()
+
+
+def _blaster_process(host, port, duration):
+    """Sends data packets as fast as it can for duration seconds, ignoring ACKs."""
+    packets = PacketBuffer(os.urandom(1024 * 1024))
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.connect((host, port))  # fixes the source port, so the flow stays on one worker
+    data = [packets[seq] for seq in range(len(packets) - 1)]  # no EOF: the run never completes
+    end = time.monotonic() + duration
+    while time.monotonic() < end:
+        for packet in data[:256]:
+            sock.send(packet)
+        data = data[256:] + data[:256]
+    sock.close()
+
+
+def measure_pps(workers, flows=16, duration=3.0, host='127.0.0.1', port=12380, warmup=0.5):
+    """
+    Receiver packet rate with workers shards under flows blasting senders,
+    from the shared counters over duration seconds after warmup.
+    """
+    processes, stats = start_sharded_receiver(host, port, workers)
+    time.sleep(0.3)  # let the workers bind
+    blasters = [multiprocessing.Process(target=_blaster_process, args=(host, port, warmup + duration + 1.0))
+                for _ in range(flows)]
+    try:
+        for blaster in blasters:
+            blaster.start()
+        time.sleep(warmup)
+        before, start = stats.totals(), time.monotonic()
+        time.sleep(duration)
+        after, elapsed = stats.totals(), time.monotonic() - start
+        per_worker = stats.snapshot()
+    finally:
+        for blaster in blasters:
+            blaster.terminate()
+            blaster.join()
+        stop_sharded_receiver(processes)
+
+    return dict(workers=workers, pps=(after["packets"] - before["packets"]) / elapsed,
+                ack_pps=(after["acks"] - before["acks"]) / elapsed,
+                flows_per_worker=[row["flows"] for row in per_worker])
+
+
+if __name__ == "__main__":
+    cores = os.cpu_count() or 1
+    counts = sorted({1, 2, 4, cores} - {0})
+    runs = [measure_pps(n, port=12380 + i) for i, n in enumerate(counts)]
+
+    print(f"\nSO_REUSEPORT receiver scaling on loopback ({cores} cores)")
+    print("=" * 70)
+    print(f"{'Workers':>7} | {'Recv pps':>10} | {'ACK pps':>10} | {'Speedup':>7} | Flows per worker")
+    print("-" * 70)
+    for r in runs:
+        print(f"{r['workers']:>7} | {r['pps']:>10.0f} | {r['ack_pps']:>10.0f} | "
+              f"{r['pps'] / runs[0]['pps']:>7.2f} | {r['flows_per_worker']}")
+    print("=" * 70 + "\n")
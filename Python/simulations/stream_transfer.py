@@ -0,0 +1,94 @@
+import asyncio
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+from async_transport import send_data
+from bulk_receiver import BulkReceiver
+from packet_format import PacketBuffer, PacketStream
+
+
+def generate_data(total_bytes, block_size=(1 << 20) + 7, seed=0):
+    """
+    Yields total_bytes of pseudo-random data, one reusable block at a time.
+    The block size is deliberately not a multiple of the packet size, so a
+    payload written at the wrong offset still changes the CRC.
+    """
+    block = memoryview(random.Random(seed).randbytes(block_size))
+    remaining = total_bytes
+    while remaining > 0:
+        n = min(block_size, remaining)
+        yield block[:n]
+        remaining -= n
+
+
+def _receiver_process(out_path, port, results):
+    sys.stdout = open(os.devnull, "w")
+    receiver = BulkReceiver(out_path, port=port, expected_size=64 * 1024 * 1024)
+    try:
+        results.put(receiver.receive())
+    finally:
+        os.remove(out_path)
+
+
+def _sender_process(size_bytes, port, window_size, timeout, mode, results):
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if mode == "stream":
+        packets = PacketStream(generate_data(size_bytes), slots=window_size)
+    else:
+        # Old way for comparison: whole payload in memory before the first send
+        packets = PacketBuffer(b"".join(generate_data(size_bytes)))
+    start = time.perf_counter()
+    protocol = asyncio.run(send_data(packets, port=port, window_size=window_size, timeout=timeout))
+    duration = time.perf_counter() - start
+    rss_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # KiB on Linux
+    results.put(dict(duration=duration, packets_sent=protocol.packets_sent,
+                     retransmissions=protocol.retransmissions,
+                     rss_growth_mib=(rss_peak - rss_before) / 1024))
+
+
+def run_stream_transfer(size_mb=1024, mode="stream", port=12346, window_size=256, timeout=0.05):
+    """
+    Sends size_mb MiB to a BulkReceiver through the asyncio sender and
+    returns the sustained rate and how much the sender's peak RSS grew.
+    mode="stream" builds packets lazily in a window-sized PacketStream;
+    mode="buffer" materialises a PacketBuffer first, as before.
+    """
+    size_bytes = size_mb * 1024 * 1024
+    out_path = os.path.join(tempfile.gettempdir(), f"stream_transfer_{port}.bin")
+    receiver_results, sender_results = multiprocessing.Queue(), multiprocessing.Queue()
+    receiver = multiprocessing.Process(target=_receiver_process, args=(out_path, port, receiver_results))
+    receiver.start()
+    time.sleep(0.5)  # let the receiver bind
+
+    sender = multiprocessing.Process(target=_sender_process,
+                                     args=(size_bytes, port, window_size, timeout, mode, sender_results))
+    sender.start()
+    sent = sender_results.get()
+    received = receiver_results.get()
+    sender.join()
+    receiver.join()
+
+    return dict(mode=mode, size_mb=size_mb,
+                sender_mbps=size_bytes * 8 / sent["duration"] / 1e6,
+                receiver_mbps=received["bytes"] * 8 / received["duration"] / 1e6,
+                rss_growth_mib=sent["rss_growth_mib"],
+                retransmissions=sent["retransmissions"],
+                checksum_ok=received["checksum_ok"] and received["bytes"] == size_bytes)
+
+
+if __name__ == "__main__":
+    runs = [run_stream_transfer(64, "buffer"), run_stream_transfer(64, "stream"), run_stream_transfer(1024, "stream")]
+
+    print("\n" + "=" * 92)
+    print(f"{'Mode':<8} | {'Size (MiB)':>10} | {'Sender Mbit/s':>13} | {'Receiver Mbit/s':>15} | "
+          f"{'Sender RSS +MiB':>15} | {'Retx':>6} | {'Checksum':>8}")
+    print("-" * 92)
+    for r in runs:
+        print(f"{r['mode']:<8} | {r['size_mb']:>10} | {r['sender_mbps']:>13.1f} | {r['receiver_mbps']:>15.1f} | "
+              f"{r['rss_growth_mib']:>15.1f} | {r['retransmissions']:>6} | {'OK' if r['checksum_ok'] else 'BAD':>8}")
+    print("=" * 92 + "\n")
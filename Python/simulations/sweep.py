@@ -0,0 +1,158 @@
+import multiprocessing
+import os
+import random
+import socket
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+import comparative_analyzer
+import rtt_analyzer
+import throughput_model
+from network_receiver import start_receiver
+from packet_format import send_command
+
+BASE_PORT = 12400
+
+_worker_port = None  # port of the receiver this pool worker talks to
+
+
+def _receiver_process(host, port):
+    # Forked receivers inherit the parent's RNG state; reseed so trials on
+    # different receivers do not drop exactly the same packets
+    random.seed()
+    sys.stdout = open(os.devnull, "w")
+    start_receiver(host, port)
+
+
+def _init_worker(ports):
+    global _worker_port
+    _worker_port = ports.get()
+
+
+def wait_until_ready(host, port, timeout=5.0):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        send_command(sock, (host, port), "PING", retries=int(timeout / 0.1), timeout=0.1)
+    finally:
+        sock.close()
+
+
+def loss_grid(loss_rates, data_size_kb=128, trials=3, protocols=None):
+    """Points for comparative_analyzer's sweep: protocol x RTO mode x loss rate x trial."""
+    protocols = protocols or [name for name, _ in comparative_analyzer.PROTOCOLS]
+    return [dict(experiment="loss", protocol=name, rto=mode, loss=loss, rtt_ms=0.0,
+                 data_kb=data_size_kb, trial=trial)
+            for name in protocols
+            for mode, _ in comparative_analyzer.RTO_MODES
+            for loss in loss_rates
+            for trial in range(trials)]
+
+
+def rtt_grid(rtts, loss=0.01, data_size_kb=32, trials=3, protocols=None):
+    """Points for rtt_analyzer's sweep: protocol x RTO mode x RTT x trial."""
+    protocols = protocols or [name for name, _ in rtt_analyzer.PROTOCOLS]
+    return [dict(experiment="rtt", protocol=name, rto=mode, loss=loss, rtt_ms=rtt,
+                 data_kb=data_size_kb, trial=trial)
+            for name in protocols
+            for mode, _ in rtt_analyzer.RTO_MODES
+            for rtt in rtts
+            for trial in range(trials)]
+
+
+def run_point(point, host='127.0.0.1'):
+    """Runs one grid point against this worker's receiver; returns the point with its results."""
+    adaptive = point["rto"] == "adaptive"
+    stats = {}
+    start = time.perf_counter()
+    if point["experiment"] == "loss":
+        sender_class = dict(comparative_analyzer.PROTOCOLS)[point["protocol"]]
+        bps, retx_ratio, spurious_rate = comparative_analyzer.run_protocol_test(
+            sender_class, point["loss"], point["data_kb"], point["protocol"],
+            adaptive_rto=adaptive, host=host, port=_worker_port, stats=stats)
+    else:
+        sender_class = dict(rtt_analyzer.PROTOCOLS)[point["protocol"]]
+        bps, spurious_rate = rtt_analyzer.run_rtt_test(
+            sender_class, point["rtt_ms"], point["loss"], point["data_kb"],
+            adaptive_rto=adaptive, host=host, port=_worker_port, stats=stats)
+        retx_ratio = float("nan")
+    srtt = stats.get("srtt_s")
+    return dict(point, goodput_bps=bps, retx_ratio=retx_ratio, spurious_rate=spurious_rate,
+                srtt_ms=srtt * 1000 if srtt else float("nan"), rto_s=stats.get("rto_s", float("nan")),
+                wall_s=time.perf_counter() - start, port=_worker_port)
+
+
+def run_sweep(points, workers=None, host='127.0.0.1', base_port=BASE_PORT, verbose=True):
+    """
+    Runs every point on a pool of isolated receiver/sender pairs: one
+    network_receiver process per worker, each on its own port, so points
+    never share receiver state or a socket queue. Returns a DataFrame with
+    one row per point.
+    """
+    # Points spend most of their time waiting on timers and emulated RTT,
+    # so more workers than cores still pays off
+    workers = workers or max(4, os.cpu_count() or 1)
+    ports = multiprocessing.Queue()
+    receivers = []
+    for i in range(workers):
+        port = base_port + i
+        receiver = multiprocessing.Process(target=_receiver_process, args=(host, port), daemon=True)
+        receiver.start()
+        receivers.append(receiver)
+        ports.put(port)
+
+    # Longest points first, so the pool is not left waiting on one straggler at the end
+    points = sorted(points, key=lambda p: (p["rtt_ms"], p["loss"]), reverse=True)
+    rows = []
+    try:
+        for i in range(workers):
+            wait_until_ready(host, base_port + i)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(ports,)) as pool:
+            futures = [pool.submit(run_point, point, host) for point in points]
+            for done, future in enumerate(as_completed(futures), 1):
+                row = future.result()
+                rows.append(row)
+                if verbose:
+                    print(f"[{done:>4}/{len(points)}] {row['experiment']:<4} | {row['protocol']:<20} | "
+                          f"{row['rto']:<8} | loss {row['loss']*100:>5.1f}% | RTT {row['rtt_ms']:>6.1f}ms | "
+                          f"trial {row['trial']} | {row['goodput_bps']:>12.0f} bps")
+    finally:
+        for receiver in receivers:
+            receiver.terminate()
+            receiver.join()
+
+    columns = ["experiment", "protocol", "rto", "loss", "rtt_ms", "trial"]
+    return pd.DataFrame(rows).sort_values(columns).reset_index(drop=True)
+
+
+def summarize(df):
+    """Mean and standard deviation over trials for every grid point (and the model's prediction, if annotated)."""
+    columns = ["goodput_bps", "retx_ratio", "spurious_rate"] + (["model_bps"] if "model_bps" in df else [])
+    return (df.groupby(["experiment", "protocol", "rto", "loss", "rtt_ms"])[columns]
+              .agg(["mean", "std"]))
+
+
+if __name__ == "__main__":
+    # Same grids as comparative_analyzer.py and rtt_analyzer.py, with 3 trials per point
+    points = (loss_grid([0, 0.01, 0.05, 0.10, 0.20, 0.50, 0.70], data_size_kb=128, trials=3)
+              + rtt_grid([0.1, 1.0, 10, 100, 500], loss=0.01, data_size_kb=32, trials=3))
+
+    start = time.perf_counter()
+    df = run_sweep(points)
+    wall = time.perf_counter() - start
+
+    # Analytic models at the loopback RTT the loss-free runs measured
+    base_rtt_ms = df.loc[(df["experiment"] == "loss") & (df["loss"] == 0), "srtt_ms"].median()
+    df = throughput_model.annotate(df, base_rtt_ms=base_rtt_ms)
+
+    pd.set_option("display.width", 160)
+    print(summarize(df))
+    print(f"\nModels at {base_rtt_ms:.2f} ms base RTT: {int(df['emulator_bound'].sum())} runs emulator-bound, "
+          f"{int(df['model_miss'].sum())} below half the prediction")
+    df.to_csv("sweep_results.csv", index=False)
+    # Sum of per-point times is what the sequential analyzers would have needed, minus their handshake sleeps
+    sequential = df["wall_s"].sum()
+    print(f"\n{len(df)} runs in {wall:.1f}s wall ({sequential:.1f}s of sequential run time, "
+          f"{sequential / wall:.1f}x). Results saved as 'sweep_results.csv'")
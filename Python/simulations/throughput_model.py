@@ -0,0 +1,143 @@
+import time
+
+import numpy as np
+
+MSS = 1024  # payload bytes per packet, as PacketBuffer's default chunk size
+MIN_RTO = 0.01  # RttEstimator's floor
+
+
+def default_rto(rtt):
+    """Steady-state RTO when none is given: SRTT + 4 RTTVAR, taken as 2 RTT, floored like RttEstimator."""
+    return np.maximum(MIN_RTO, 2 * np.asarray(rtt, dtype=float))
+
+
+def mathis(loss, rtt, mss=MSS, c=np.sqrt(1.5)):
+    """
+    Mathis et al. (1997) steady-state Reno throughput in bits/s:
+    MSS / RTT * C / sqrt(p). Infinite at zero loss, where only the window
+    or the link limits a flow.
+    """
+    loss, rtt = np.broadcast_arrays(np.asarray(loss, dtype=float), np.asarray(rtt, dtype=float))
+    with np.errstate(divide="ignore"):
+        return np.where(loss > 0, mss * 8 / rtt * c / np.sqrt(loss), np.inf)
+
+
+def padhye(loss, rtt, rto=None, wmax=np.inf, mss=MSS, b=1):
+    """
+    Padhye et al. (1998) Reno throughput in bits/s, with timeouts and a
+    receiver window of wmax packets. b is the packets acknowledged per ACK
+    (1 here: the receivers ACK every packet).
+    """
+    loss = np.asarray(loss, dtype=float)
+    rtt = np.asarray(rtt, dtype=float)
+    rto = default_rto(rtt) if rto is None else np.asarray(rto, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        per_packet = (rtt * np.sqrt(2 * b * loss / 3)
+                      + rto * np.minimum(1, 3 * np.sqrt(3 * b * loss / 8)) * loss * (1 + 32 * loss ** 2))
+        rate = np.where(loss > 0, 1 / per_packet, np.inf)
+    return np.minimum(wmax / rtt, rate) * mss * 8
+
+
+def gbn(loss, rtt, window=10, rto=None, send_gap=0.0, mss=MSS):
+    """
+    Go-Back-N throughput in bits/s. Loss-free, the sender runs at
+    min(1 / send_gap, W / RTT) packets/s. These senders have no NAKs or
+    fast retransmit, so every loss event stalls them for an RTO before they
+    go back, and there are p / (1 - p) loss events per delivered packet
+    (losses among the packets sent behind it are resent anyway):
+
+        time per packet = 1 / min(1 / send_gap, W / RTT) + p / (1 - p) * RTO
+    """
+    loss, rtt, window = np.broadcast_arrays(np.asarray(loss, dtype=float), np.asarray(rtt, dtype=float),
+                                            np.asarray(window, dtype=float))
+    rto = default_rto(rtt) if rto is None else np.asarray(rto, dtype=float)
+    slot = np.maximum(send_gap, rtt / window)
+    with np.errstate(divide="ignore"):
+        return np.where(loss < 1, mss * 8 / (slot + loss / (1 - loss) * rto), 0.0)
+
+
+def model_grid(losses, rtts, windows, rto=None, send_gap=0.0, mss=MSS):
+    """
+    All three models over the loss x RTT x window grid, one broadcast
+    evaluation each. Returns a DataFrame with one row per configuration.
+    """
+    import pandas as pd
+
+    loss, rtt, window = np.meshgrid(np.asarray(losses, dtype=float), np.asarray(rtts, dtype=float),
+                                    np.asarray(windows, dtype=float), indexing="ij")
+    return pd.DataFrame({
+        "loss": loss.ravel(),
+        "rtt_ms": rtt.ravel() * 1000,
+        "window": window.ravel(),
+        "mathis_bps": mathis(loss, rtt, mss).ravel(),
+        "padhye_bps": padhye(loss, rtt, rto, window, mss).ravel(),
+        "gbn_bps": gbn(loss, rtt, window, rto, send_gap, mss).ravel(),
+    })
+
+
+def predict(protocol, loss, rtt, window=10, rto=None, send_gap=0.0, mss=MSS):
+    """
+    The model that applies to an analyzer protocol name: GBN for Go-Back-N,
+    Padhye for every TCP-sim. Padhye models Reno's AIMD, so for the CUBIC
+    and BBR-like senders it is only a Reno baseline, not a prediction;
+    annotate() marks those rows out of scope (see out_of_scope).
+    """
+    if "Go-Back-N" in protocol:
+        return gbn(loss, rtt, window, rto, send_gap, mss)
+    if "TCP" in protocol:
+        return padhye(loss, rtt, rto, mss=mss)
+    return np.full(np.broadcast(np.asarray(loss), np.asarray(rtt)).shape, np.nan)
+
+
+def out_of_scope(protocol):
+    """True for protocols whose congestion control the Reno-based models do not describe."""
+    return "CUBIC" in protocol or "BBR" in protocol
+
+
+def annotate(df, base_rtt_ms=0.0, window=10, send_gap=0.001, tolerance=0.5):
+    """
+    Adds model_bps, model_ratio (measured / predicted), model_in_scope and
+    emulator_bound to sweep results (see sweep.py). Fixed-RTO runs are
+    modelled with the RTO they recorded in rto_s, adaptive ones with
+    default_rto. A run is emulator-bound when the prediction is above the
+    best goodput the same protocol ever reached on this machine: the
+    loopback emulator caps the run there, so the gap to the model says
+    nothing about the protocol. In-scope runs that miss the model by more
+    than tolerance without that excuse are flagged in model_miss; CUBIC and
+    BBR-like runs only get Reno's prediction for reference and are never
+    flagged.
+    """
+    df = df.copy()
+    rtt = (df["rtt_ms"].to_numpy() + base_rtt_ms) / 1000
+    # Loss sweeps use a fixed send gap for Go-Back-N, RTT sweeps run it unpaced
+    gaps = np.where(df["experiment"].to_numpy() == "loss", send_gap, 0.0)
+    loss = df["loss"].to_numpy(dtype=float)
+    rto = default_rto(rtt)
+    if "rto_s" in df:
+        fixed = (df["rto"] == "fixed").to_numpy() & df["rto_s"].notna().to_numpy()
+        rto[fixed] = df["rto_s"].to_numpy(dtype=float)[fixed]
+    model = np.full(len(df), np.nan)
+    for protocol in df["protocol"].unique():
+        rows = (df["protocol"] == protocol).to_numpy()
+        model[rows] = predict(protocol, loss[rows], rtt[rows], window, rto[rows], send_gap=gaps[rows])
+    ceiling = df.groupby(["experiment", "protocol"])["goodput_bps"].transform("max").to_numpy()
+    df["model_bps"] = model
+    df["model_ratio"] = df["goodput_bps"] / model
+    df["model_in_scope"] = ~df["protocol"].map(out_of_scope).astype(bool)
+    df["emulator_bound"] = model >= ceiling
+    df["model_miss"] = df["model_in_scope"] & ~df["emulator_bound"] & (df["model_ratio"] < tolerance)
+    return df
+
+
+def benchmark(n=100):
+    """Seconds to evaluate every model over an n x n x n grid."""
+    start = time.perf_counter()
+    grid = model_grid(np.linspace(0.001, 0.5, n), np.geomspace(1e-4, 1.0, n), np.arange(1, n + 1))
+    elapsed = time.perf_counter() - start
+    print(f"{len(grid)} configurations x 3 models in {elapsed * 1000:.0f} ms")
+    return grid
+
+
+if __name__ == "__main__":
+    grid = benchmark()
+    print(grid.describe().T[["min", "50%", "max"]])
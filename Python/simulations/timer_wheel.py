@@ -0,0 +1,115 @@
+import time
+
+
+class TimerWheel:
+    """
+    Hierarchical timer wheel for per-packet retransmission timers.
+
+    Level 0 has `slots` buckets of one tick each; every level above covers
+    `slots` times the span of the one below. A timer sits in the lowest level
+    whose span reaches its expiry, and is cascaded down a level each time the
+    wheel beneath it wraps. schedule(), cancel() and reschedule are O(1), and
+    advance() only touches the buckets for the ticks that actually passed,
+    however many timers are pending.
+
+    Cancellation is lazy: `deadlines` holds the live expiry tick for each key,
+    and bucket entries whose tick no longer matches are skipped when reached.
+    """
+
+    def __init__(self, tick=0.001, slots=256, levels=4, now=None):
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self.wheels = [[[] for _ in range(slots)] for _ in range(levels)]
+        self.start = time.monotonic() if now is None else now
+        self.current = 0  # ticks since start that have been processed
+        self.deadlines = {}
+
+    def __len__(self):
+        return len(self.deadlines)
+
+    def __contains__(self, key):
+        return key in self.deadlines
+
+    def schedule(self, key, delay):
+        """Arms (or re-arms) the timer for key to fire after delay seconds."""
+        expiry = self.current + max(1, int(-(-delay // self.tick)))
+        self.deadlines[key] = expiry
+        self._insert(expiry, key)
+
+    def cancel(self, key):
+        self.deadlines.pop(key, None)
+
+    def _insert(self, expiry, key):
+        delta = expiry - self.current
+        level = 0
+        span = self.slots
+        while delta >= span and level < self.levels - 1:
+            level += 1
+            span *= self.slots
+        slot = (expiry // (span // self.slots)) % self.slots
+        self.wheels[level][slot].append((expiry, key))
+
+    def advance(self, now=None):
+        """Moves the wheel up to now and returns the keys whose timers expired."""
+        if now is None:
+            now = time.monotonic()
+        target = int((now - self.start) / self.tick)
+        expired = []
+        if not self.deadlines:
+            # Nothing live: skip ahead and drop cancelled leftovers
+            if target > self.current:
+                self.current = target
+                for wheel in self.wheels:
+                    for bucket in wheel:
+                        bucket.clear()
+            return expired
+
+        slots = self.slots
+        deadlines = self.deadlines
+        while self.current < target:
+            self.current += 1
+            # Cascade from the highest level whose wheel below just wrapped
+            wrapped = 0
+            t = self.current
+            while wrapped < self.levels - 1 and t % slots == 0:
+                t //= slots
+                wrapped += 1
+            for level in range(wrapped, 0, -1):
+                bucket = self.wheels[level][(self.current // slots ** level) % slots]
+                entries = bucket[:]
+                bucket.clear()
+                for expiry, key in entries:
+                    if deadlines.get(key) != expiry:
+                        continue
+                    if expiry <= self.current:
+                        del deadlines[key]
+                        expired.append(key)
+                    else:
+                        self._insert(expiry, key)
+
+            bucket = self.wheels[0][self.current % slots]
+            for expiry, key in bucket:
+                if deadlines.get(key) == expiry:
+                    del deadlines[key]
+                    expired.append(key)
+            bucket.clear()
+        return expired
+
+    def next_timeout(self, now=None):
+        """
+        Seconds until advance() next has work to do: the next live level-0
+        bucket, or the next cascade if level 0 is empty. None when idle.
+        """
+        if not self.deadlines:
+            return None
+        if now is None:
+            now = time.monotonic()
+        deadlines = self.deadlines
+        for ahead in range(1, self.slots + 1):
+            tick = self.current + ahead
+            if any(deadlines.get(key) == expiry for expiry, key in self.wheels[0][tick % self.slots]):
+                break
+            if tick % self.slots == 0:
+                break
+        return max(0.0, self.start + tick * self.tick - now)
@@ -1,96 +1,522 @@
-import json
+import datetime
+import heapq
 import os
+import pickle
 import shutil
+import sys
+import tempfile
 import time
 import random
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 from faker import Faker
-from rocksdict import Rdict, Options, WriteBatch, ReadOptions
+from rocksdict import WriteBatch, ReadOptions, SstFileWriter, IngestExternalFileOptions
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import employee_codec
+import employee_repository
+import employee_tuning
 
 DB_PATH = "./employee_db"
+SST_PATH = "./employee_db_sst"  # staging area for the SST ingestion path
 TOTAL_RECORDS = 50000
 BATCH_SIZE = 5000
+CF_NAMES = ["employees", "idx_dept", "idx_manager", "idx_name"]
+RUN_SIZE = 500000  # records sorted in memory at once by the SST path; longer loads spill sorted runs
+SST_FILE_SIZE = 64 * 1024 * 1024  # target size of each ingested SST file
+CODEC = employee_codec.CODECS["binary"]  # how employees CF values are encoded (see src/employee_codec.py)
+COVERING_INDEXES = True  # index values carry employee_repository.PROJECTION
+PROFILE = employee_tuning.PROFILE  # per-CF options (see src/employee_tuning.py)
+
+DEPARTMENTS = ["Engineering", "Sales", "Marketing", "HR", "Finance", "Legal", "Operations", "Product"]
+DESIGNATIONS = ["Junior", "Senior", "Lead", "Staff", "Manager", "Director", "VP"]
 
 fake = Faker()
+_vocabulary = None  # per-process word pools for the vectorized generator
 
-def clean_db():
-    if os.path.exists(DB_PATH):
+def clean_db(path=DB_PATH):
+    if os.path.exists(path):
         try:
-            shutil.rmtree(DB_PATH)
-            print(f"Cleaned up existing database at {DB_PATH}")
+            shutil.rmtree(path)
+            print(f"Cleaned up existing database at {path}")
         except Exception as e:
             print(f"Error cleaning up: {e}")
 
-def setup_db():
+def setup_db(path=DB_PATH):
     print("Initializing Database and Column Families...")
-    cf_names = ["employees", "idx_dept", "idx_manager", "idx_name"]
-    db = Rdict(DB_PATH)
-    existing_cfs = db.columns()
-    for cf in cf_names:
-        if cf not in existing_cfs:
-            db.create_column_family(cf, Options())
-    return db
-
-def generate_bulk_data(db):
+    return employee_tuning.open_db(path, PROFILE)
+
+def make_employee(i):
+    """One synthetic employee record: (emp_id, data)."""
+    emp_id = f"E{i:05d}"
+    name = fake.name()
+    dept = random.choice(DEPARTMENTS)
+    manager = fake.name()
+    
+    data = {
+        "ID": emp_id,
+        "Employee Name": name,
+        "City": fake.city(),
+        "Address": fake.address().replace("\n", ", "),
+        "Manager Name": manager,
+        "Designation": f"{random.choice(DESIGNATIONS)} {dept}",
+        "Department": dept,
+        "Joining Date": str(fake.date_between(start_date='-5y', end_date='today')),
+        "Active": random.choice([0, 1]),
+        "Last Date": str(fake.date_between(start_date='today', end_date='+2y')) if random.random() < 0.1 else None
+    }
+    return emp_id, data
+
+def employee_entries(emp_id, data):
+    """The (column family, key, value) writes for one employee: the record and its three index keys."""
+    return ([("employees", f"emp:{emp_id}", CODEC.encode(data))]
+            + employee_repository.index_entries(emp_id, data, CODEC, COVERING_INDEXES))
+
+def make_vocabulary(seed=0, size=1000):
+    """Word pools drawn from Faker once, so the vectorized generator only has to pick indices."""
+    pool_fake = Faker()
+    pool_fake.seed_instance(seed)
+    today = datetime.date.today()
+    return {
+        "first": [pool_fake.first_name() for _ in range(size)],
+        "last": [pool_fake.last_name() for _ in range(size)],
+        "city": [pool_fake.city() for _ in range(size)],
+        "street": [pool_fake.street_name() for _ in range(size)],
+        "tail": [f"{pool_fake.city()}, {pool_fake.state_abbr()} {pool_fake.postcode()}" for _ in range(size)],
+        "joined": [str(today - datetime.timedelta(days=d)) for d in range(5 * 365 + 1)],
+        "leaving": [str(today + datetime.timedelta(days=d)) for d in range(2 * 365 + 1)],
+    }
+
+def make_employee_records(start, count, seed=0):
+    """
+    Vectorized counterpart of make_employee for employees start .. start+count-1.
+    It makes no per-row Faker calls. numpy draws every random choice for the
+    batch at once from a generator seeded by (seed, start), so a batch is the
+    same whichever process builds it. Names, cities and addresses come from
+    Faker-made word pools. Returns a list of (emp_id, data).
+    """
+    global _vocabulary
+    if _vocabulary is None:
+        _vocabulary = make_vocabulary(seed)
+    v = _vocabulary
+    rng = np.random.default_rng([seed, start])
+    size = len(v["first"])
+    first, last, mgr_first, mgr_last, city, street, tail = rng.integers(size, size=(7, count)).tolist()
+    number = rng.integers(1, 100000, size=count).tolist()
+    dept = rng.integers(len(DEPARTMENTS), size=count).tolist()
+    designation = rng.integers(len(DESIGNATIONS), size=count).tolist()
+    joined = rng.integers(len(v["joined"]), size=count).tolist()
+    leaving = np.where(rng.random(count) < 0.1, rng.integers(len(v["leaving"]), size=count), -1).tolist()
+    active = rng.integers(2, size=count).tolist()
+    
+    records = []
+    for j in range(count):
+        emp_id = f"E{start + j:05d}"
+        department = DEPARTMENTS[dept[j]]
+        data = {
+            "ID": emp_id,
+            "Employee Name": f"{v['first'][first[j]]} {v['last'][last[j]]}",
+            "City": v["city"][city[j]],
+            "Address": f"{number[j]} {v['street'][street[j]]}, {v['tail'][tail[j]]}",
+            "Manager Name": f"{v['first'][mgr_first[j]]} {v['last'][mgr_last[j]]}",
+            "Designation": f"{DESIGNATIONS[designation[j]]} {department}",
+            "Department": department,
+            "Joining Date": v["joined"][joined[j]],
+            "Active": active[j],
+            "Last Date": v["leaving"][leaving[j]] if leaving[j] >= 0 else None
+        }
+        records.append((emp_id, data))
+    return records
+
+def make_employee_batch(start, count, seed=0):
+    """Entries for employees start .. start+count-1 from make_employee_records."""
+    entries = []
+    for emp_id, data in make_employee_records(start, count, seed):
+        entries.extend(employee_entries(emp_id, data))
+    return entries
+
+def make_faker_batch(start, count, seed=None):
+    """Entries for employees start .. start+count-1 through make_employee (per-row Faker calls)."""
+    if seed is not None:
+        Faker.seed(seed + start)
+        random.seed(seed + start)
+    entries = []
+    for i in range(start, start + count):
+        entries.extend(employee_entries(*make_employee(i)))
+    return entries
+
+GENERATORS = {"faker": make_faker_batch, "vectorized": make_employee_batch}
+
+def employee_batches(generator="faker", workers=1, total=None, batch_size=BATCH_SIZE, seed=None):
+    """
+    Yields the entries of total employees (TOTAL_RECORDS by default), one
+    list per batch_size records, in ID order. With workers > 1, a process
+    pool generates the batches and the caller consumes them as they
+    complete. At most 2 * workers batches are in flight, so generation
+    never runs unboundedly ahead of the writer.
+    """
+    total = TOTAL_RECORDS if total is None else total
+    make_batch = GENERATORS[generator]
+    if generator == "vectorized" and seed is None:
+        seed = 0
+    starts = range(1, total + 1, batch_size)
+    if workers <= 1:
+        for start in starts:
+            yield make_batch(start, min(batch_size, total + 1 - start), seed)
+        return
+    with ProcessPoolExecutor(workers) as pool:
+        pending = deque()
+        for start in starts:
+            pending.append(pool.submit(make_batch, start, min(batch_size, total + 1 - start), seed))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def generate_bulk_data(db, batches=None):
+    """WriteBatch load: one atomic write per batch from employee_batches (serial Faker by default)."""
     print(f"Starting bulk load of {TOTAL_RECORDS} records...")
     start_time = time.time()
     
     # Get handles once
-    emp_cf_h = db.get_column_family_handle("employees")
-    dept_idx_h = db.get_column_family_handle("idx_dept")
-    mgr_idx_h = db.get_column_family_handle("idx_manager")
-    name_idx_h = db.get_column_family_handle("idx_name")
+    handles = {cf: db.get_column_family_handle(cf) for cf in CF_NAMES}
     
-    departments = ["Engineering", "Sales", "Marketing", "HR", "Finance", "Legal", "Operations", "Product"]
-    designations = ["Junior", "Senior", "Lead", "Staff", "Manager", "Director", "VP"]
-    
-    wb = WriteBatch()
     count = 0
-    
-    for i in range(1, TOTAL_RECORDS + 1):
-        emp_id = f"E{i:05d}"
-        name = fake.name()
-        dept = random.choice(departments)
-        manager = fake.name()
-        
-        data = {
-            "ID": emp_id,
-            "Employee Name": name,
-            "City": fake.city(),
-            "Address": fake.address().replace("\n", ", "),
-            "Manager Name": manager,
-            "Designation": f"{random.choice(designations)} {dept}",
-            "Department": dept,
-            "Joining Date": str(fake.date_between(start_date='-5y', end_date='today')),
-            "Active": random.choice([0, 1]),
-            "Last Date": str(fake.date_between(start_date='today', end_date='+2y')) if random.random() < 0.1 else None
-        }
-        
+    for entries in batches if batches is not None else employee_batches():
         # Prepare Batch
-        main_key = f"emp:{emp_id}"
-        dept_key = f"dept:{dept}:{emp_id}"
-        mgr_key = f"mgr:{manager}:{emp_id}"
-        name_key = f"name:{name}:{emp_id}"
-        
-        wb.put(main_key, json.dumps(data), emp_cf_h)
-        wb.put(dept_key, "", dept_idx_h)
-        wb.put(mgr_key, "", mgr_idx_h)
-        wb.put(name_key, "", name_idx_h)
-        
-        count += 1
+        wb = WriteBatch()
+        for cf, key, value in entries:
+            wb.put(key, value, handles[cf])
         
         # Commit batch
-        if count % BATCH_SIZE == 0:
-            db.write(wb)
-            wb = WriteBatch() 
-            print(f"  Loaded {count}/{TOTAL_RECORDS} records...")
-            
-    # Final write for any remaining items
-    if not wb.is_empty():
         db.write(wb)
+        count += len(entries) // len(CF_NAMES)
+        print(f"  Loaded {count}/{TOTAL_RECORDS} records...")
         
     end_time = time.time()
     print(f"\nBulk load completed in {end_time - start_time:.2f} seconds.")
 
+def _spill_run(entries, run_dir, run_index, chunk=10000):
+    """Sorts one run's entries per column family and pickles them to disk in chunks, one file per CF."""
+    paths = {}
+    for cf, items in entries.items():
+        items.sort()
+        paths[cf] = os.path.join(run_dir, f"{cf}.{run_index}.run")
+        with open(paths[cf], "wb") as f:
+            for start in range(0, len(items), chunk):
+                pickle.dump(items[start:start + chunk], f, protocol=pickle.HIGHEST_PROTOCOL)
+        items.clear()
+    return paths
+
+def _read_run(path):
+    with open(path, "rb") as f:
+        while True:
+            try:
+                yield from pickle.load(f)
+            except EOFError:
+                return
+
+def _write_sst_files(items, prefix, options, file_size=SST_FILE_SIZE):
+    """
+    Writes already-sorted (key, value) pairs into SST files of about file_size
+    bytes each. options must be the target CF's, since the files keep the
+    filters and compression they were written with.
+    """
+    paths = []
+    writer = None
+    written = 0
+    for key, value in items:
+        if writer is None:
+            paths.append(f"{prefix}.{len(paths)}.sst")
+            writer = SstFileWriter(options)
+            writer.open(paths[-1])
+            written = 0
+        writer[key] = value
+        written += len(key) + len(value)
+        if written >= file_size:
+            writer.finish()
+            writer = None
+    if writer is not None:
+        writer.finish()
+    return paths
+
+def ingest_bulk_data(db, run_size=RUN_SIZE, batches=None):
+    """
+    Bulk load that bypasses the WAL, memtables and compaction. Each column
+    family's entries are sorted and written straight into SST files, and
+    every CF ingests its files in one step. The files of a CF do not
+    overlap, so RocksDB places them in the bottommost level, with no
+    compaction left to do.
+
+    Loads larger than run_size records are sorted externally: each run is
+    sorted and spilled to the staging directory, and the runs are merged
+    while the SST files are written. Records come from batches, as in
+    generate_bulk_data.
+    """
+    print(f"Starting SST ingestion of {TOTAL_RECORDS} records...")
+    start_time = time.time()
+    clean_db(SST_PATH)
+    os.makedirs(SST_PATH)
+    run_dir = tempfile.mkdtemp(dir=SST_PATH)
+    
+    entries = {cf: [] for cf in CF_NAMES}
+    runs = []
+    count = held = 0
+    for batch in batches if batches is not None else employee_batches():
+        for cf, key, value in batch:
+            entries[cf].append((key, value))
+        count += len(batch) // len(CF_NAMES)
+        held += len(batch) // len(CF_NAMES)
+        if held >= run_size:
+            runs.append(_spill_run(entries, run_dir, len(runs)))
+            held = 0
+            print(f"  Sorted {count}/{TOTAL_RECORDS} records...")
+    
+    opts = IngestExternalFileOptions()
+    opts.set_move_files(True)  # hard-link the files into the DB instead of copying them
+    for cf in CF_NAMES:
+        entries[cf].sort()
+        if runs:
+            items = heapq.merge(entries[cf], *(_read_run(run[cf]) for run in runs))
+        else:
+            items = entries[cf]
+        paths = _write_sst_files(items, os.path.join(SST_PATH, cf), employee_tuning.cf_options(PROFILE[cf]))
+        db.get_column_family(cf).ingest_external_file(paths, opts)
+        entries[cf] = []
+        print(f"  Ingested {len(paths)} SST file(s) into {cf}")
+    shutil.rmtree(SST_PATH)
+    
+    end_time = time.time()
+    print(f"\nSST ingestion completed in {end_time - start_time:.2f} seconds.")
+
+def bytes_written():
+    """Bytes this process has written through write syscalls so far (RocksDB's threads included)."""
+    with open("/proc/self/io") as f:
+        for line in f:
+            if line.startswith("wchar:"):
+                return int(line.split()[1])
+    return 0
+
+def load_report(db):
+    """Compaction debt left behind by a load, summed over the column families."""
+    pending = l0_files = sst_bytes = 0
+    for cf in CF_NAMES:
+        handle = db.get_column_family(cf)
+        pending += handle.property_int_value("rocksdb.estimate-pending-compaction-bytes") or 0
+        l0_files += handle.property_int_value("rocksdb.num-files-at-level0") or 0
+        sst_bytes += handle.property_int_value("rocksdb.total-sst-files-size") or 0
+    return {"pending_compaction_bytes": pending, "l0_files": l0_files, "sst_bytes": sst_bytes}
+
+def compare_load_paths():
+    """
+    Loads the same records (same seeds) through WriteBatch and through SST
+    ingestion and reports load time, bytes written and compaction debt.
+    The WriteBatch load is flushed before measuring, so both end with
+    everything in SST files.
+    """
+    results = []
+    for mode, load in (("WriteBatch", generate_bulk_data), ("SST ingest", ingest_bulk_data)):
+        Faker.seed(0)
+        random.seed(0)
+        clean_db()
+        db = setup_db()
+        written_before = bytes_written()
+        start_time = time.time()
+        load(db)
+        for cf in CF_NAMES:
+            db.get_column_family(cf).flush()
+        duration = time.time() - start_time
+        results.append(dict(mode=mode, seconds=duration, written=bytes_written() - written_before, **load_report(db)))
+        db.close()
+    
+    print("\n" + "=" * 88)
+    print(f"{'Load path':<12} | {'Time (s)':>8} | {'Bytes written':>14} | {'SST bytes':>12} | {'Write amp':>9} | "
+          f"{'L0 files':>8} | {'Pending compaction':>18}")
+    print("-" * 88)
+    for r in results:
+        print(f"{r['mode']:<12} | {r['seconds']:>8.2f} | {r['written']:>14,} | {r['sst_bytes']:>12,} | "
+              f"{r['written'] / max(r['sst_bytes'], 1):>9.2f} | {r['l0_files']:>8} | {r['pending_compaction_bytes']:>18,}")
+    print("=" * 88)
+
+def compare_codecs(total=50000):
+    """
+    The same vectorized records through each employees CF codec: bytes per
+    record and encode / decode / one-field rates in memory, then the
+    employees CF size on disk after an SST load (block compression
+    included).
+    """
+    global CODEC
+    records = [data for start in range(1, total + 1, BATCH_SIZE)
+               for _, data in make_employee_records(start, min(BATCH_SIZE, total + 1 - start))]
+    results = employee_codec.benchmark(records)
+    for r in results:
+        CODEC = employee_codec.CODECS[r["codec"]]
+        clean_db()
+        db = setup_db()
+        ingest_bulk_data(db, batches=employee_batches("vectorized", total=total))
+        r["disk_bytes"] = db.get_column_family("employees").property_int_value("rocksdb.total-sst-files-size")
+        db.close()
+    clean_db()
+    CODEC = employee_codec.CODECS["binary"]
+    
+    print("\n" + "=" * 88)
+    print(f"{'Codec':<8} | {'Bytes/record':>12} | {'On disk/record':>14} | {'Encode/s':>10} | {'Decode/s':>10} | "
+          f"{'One field/s':>11} | {'Disk vs JSON':>12}")
+    print("-" * 88)
+    for r in results:
+        print(f"{r['codec']:<8} | {r['bytes_per_record']:>12.1f} | {r['disk_bytes'] / total:>14.1f} | "
+              f"{r['encode']:>10,.0f} | {r['decode']:>10,.0f} | {r['one field']:>11,.0f} | "
+              f"{r['disk_bytes'] / results[0]['disk_bytes']:>12.2f}")
+    print("=" * 88)
+
+def compare_covering_indexes(total=50000, dept="Engineering", rounds=5):
+    """
+    Department list view (employee_repository.PROJECTION) over total
+    vectorized records, with plain indexes (one employees lookup per hit)
+    and with covering indexes (the prefix scan alone), plus the index CFs'
+    size on disk for each.
+    """
+    global COVERING_INDEXES
+    results = []
+    for covering in (False, True):
+        COVERING_INDEXES = covering
+        clean_db()
+        db = setup_db()
+        ingest_bulk_data(db, batches=employee_batches("vectorized", total=total))
+        best = float("inf")
+        for _ in range(rounds):
+            start_time = time.perf_counter()
+            rows = employee_repository.list_by_index(db, "idx_dept", dept)
+            best = min(best, time.perf_counter() - start_time)
+        index_bytes = sum(db.get_column_family(cf).property_int_value("rocksdb.total-sst-files-size")
+                          for cf in employee_repository.INDEXES)
+        results.append(dict(mode="covering" if covering else "plain", hits=len(rows), seconds=best,
+                            index_bytes=index_bytes))
+        db.close()
+    clean_db()
+    COVERING_INDEXES = True
+    
+    print("\n" + "=" * 76)
+    print(f"{'Indexes':<8} | {'Hits':>6} | {'List view (ms)':>14} | {'us/hit':>7} | {'Speedup':>7} | {'Index CF bytes':>14}")
+    print("-" * 76)
+    for r in results:
+        print(f"{r['mode']:<8} | {r['hits']:>6} | {r['seconds'] * 1000:>14.1f} | {r['seconds'] / r['hits'] * 1e6:>7.2f} | "
+              f"{results[0]['seconds'] / r['seconds']:>7.2f} | {r['index_bytes']:>14,}")
+    print("=" * 76)
+
+def compare_record_fetches(total=800000, dept="Engineering", hits=(1000, 10000, 100000), rounds=3):
+    """
+    Full records for the first hits entries of a department index scan:
+    a point lookup per entry inside the scan loop, against
+    employee_repository.list_by_index fetching a page of entries per
+    multi-get. total must give the department enough employees (about
+    total / 8).
+    """
+    clean_db()
+    db = setup_db()
+    ingest_bulk_data(db, batches=employee_batches("vectorized", total=total))
+    emp_cf = db.get_column_family("employees")
+
+    def per_key(limit):
+        return [employee_codec.decode(emp_cf[f"emp:{emp_id}"])
+                for emp_id, _ in employee_repository.scan_index(db, "idx_dept", dept, limit)]
+
+    def batched(page_size):
+        return lambda limit: employee_repository.list_by_index(db, "idx_dept", dept, fields=None, limit=limit,
+                                                               page_size=page_size)
+
+    results = []
+    for limit in hits:
+        row = dict(hits=limit)
+        for label, fetch in (("per-key", per_key), ("page 100", batched(100)), ("page 1000", batched(1000))):
+            best = float("inf")
+            for _ in range(rounds):
+                start_time = time.perf_counter()
+                records = fetch(limit)
+                best = min(best, time.perf_counter() - start_time)
+            if label == "per-key":
+                expected = records
+            assert records == expected  # same records, same order
+            row[label] = best
+        results.append(row)
+    db.close()
+    clean_db()
+    
+    print("\n" + "=" * 82)
+    print(f"{'Hits':>7} | {'Per-key (ms)':>12} | {'Page 100 (ms)':>13} | {'Page 1000 (ms)':>14} | "
+          f"{'us/hit (1000)':>13} | {'Speedup':>7}")
+    print("-" * 82)
+    for r in results:
+        print(f"{r['hits']:>7,} | {r['per-key'] * 1000:>12.1f} | {r['page 100'] * 1000:>13.1f} | "
+              f"{r['page 1000'] * 1000:>14.1f} | {r['page 1000'] / r['hits'] * 1e6:>13.2f} | "
+              f"{r['per-key'] / r['page 1000']:>7.2f}")
+    print("=" * 82)
+
+def compare_tuning_profiles(total=200000, lookups=20000):
+    """
+    Point-lookup and prefix-seek latency with plain Options() on every CF
+    against the tuning profile (employee_tuning.PROFILE), on the same
+    records loaded through WriteBatch, so each CF ends up with several
+    files and levels as a live database would. The database is reopened
+    before measuring, so both start with a cold block cache. Misses are
+    keys inside the stored key range, where only a filter avoids reading
+    a block.
+    """
+    global PROFILE
+    rng = random.Random(0)
+    ids = [rng.randint(1, total) for _ in range(lookups)]
+    loaded = [data["Manager Name"] for start in range(1, total + 1, BATCH_SIZE)
+              for _, data in make_employee_records(start, min(BATCH_SIZE, total + 1 - start))]
+    managers = [rng.choice(loaded) for _ in range(lookups)]
+    ops = [
+        ("Get, hit", "employees", lambda cf, i: cf.get(f"emp:E{ids[i]:05d}")),
+        ("Get, miss", "employees", lambda cf, i: cf.get(f"emp:E{ids[i]:05d}x")),
+        ("Prefix seek, hit", "idx_manager", lambda cf, i: _first_under(cf, f"mgr:{managers[i]}:")),
+        ("Prefix seek, miss", "idx_manager", lambda cf, i: _first_under(cf, f"mgr:Zz{i} Nobody:")),
+    ]
+    
+    results = []
+    for name, profile in (("Options()", employee_tuning.DEFAULT_PROFILE), ("Profile", employee_tuning.PROFILE)):
+        PROFILE = profile
+        clean_db()
+        db = setup_db()
+        generate_bulk_data(db, employee_batches("vectorized", total=total))
+        for cf in CF_NAMES:
+            db.get_column_family(cf).flush()
+        db.close()
+        db = setup_db()
+        results.append(dict(profile=name, sst_bytes=load_report(db)["sst_bytes"], **_time_ops(db, ops, lookups)))
+        db.close()
+    clean_db()
+    PROFILE = employee_tuning.PROFILE
+    
+    labels = [label for label, _, _ in ops]
+    print("\n" + "=" * 96)
+    print(f"{'CF options':<10} | " + " | ".join(f"{label + ' (us)':>22}" for label in labels) + f" | {'SST bytes':>11}")
+    print("-" * 96)
+    for r in results:
+        print(f"{r['profile']:<10} | " + " | ".join(f"{r[label] * 1e6:>22.2f}" for label in labels)
+              + f" | {r['sst_bytes']:>11,}")
+    print("=" * 96)
+
+def _time_ops(db, ops, count):
+    """Mean seconds per call of each (label, column family, op(cf, i)) over i in range(count)."""
+    timings = {}
+    for label, cf_name, op in ops:
+        cf = db.get_column_family(cf_name)
+        start_time = time.perf_counter()
+        for i in range(count):
+            op(cf, i)
+        timings[label] = (time.perf_counter() - start_time) / count
+    return timings
+
+def _first_under(cf, prefix):
+    """First key under prefix, or None: the seek a search starts with."""
+    it = cf.iter()
+    it.seek(prefix)
+    return it.key() if it.valid() and it.key().startswith(prefix) else None
+
 def verify_load(db):
     print("\nVerifying Data Load...")
     emp_cf = db.get_column_family("employees")
@@ -105,7 +531,7 @@ def verify_load(db):
     print(f"Point Lookup for {random_id}:")
     try:
         val = emp_cf[f"emp:{random_id}"]
-        print(f"  {val[:100]}...") # Show first 100 chars
+        print(f"  {len(val)} bytes: {employee_codec.decode(val)}")
     except KeyError:
         print(f"  Error: {random_id} not found!")
 
@@ -120,9 +546,67 @@ def verify_load(db):
         it.next()
     print(f"  Found {dept_count} employees in {test_dept}.")
 
-if __name__ == "__main__":
-    clean_db() # Ensure fresh start
+def benchmark_generators(total=20000, workers=None):
+    """
+    Records per second from each way of generating them, against what
+    RocksDB alone absorbs through WriteBatch (batches generated beforehand).
+    A load is bound by RocksDB once generation outpaces the write rate.
+    """
+    global _vocabulary
+    workers = workers or os.cpu_count()
+    _vocabulary = make_vocabulary()  # built once per process; forked workers inherit it
+    rates = []
+    for name, generator, n_workers in (("Faker, serial", "faker", 1), (f"Faker, {workers} processes", "faker", workers),
+                                       ("Vectorized, serial", "vectorized", 1),
+                                       (f"Vectorized, {workers} processes", "vectorized", workers)):
+        start_time = time.time()
+        batches = list(employee_batches(generator, n_workers, total))
+        rates.append((name, total / (time.time() - start_time)))
+    
+    clean_db()
     db = setup_db()
-    generate_bulk_data(db)
-    verify_load(db)
+    handles = {cf: db.get_column_family_handle(cf) for cf in CF_NAMES}
+    start_time = time.time()
+    for entries in batches:
+        wb = WriteBatch()
+        for cf, key, value in entries:
+            wb.put(key, value, handles[cf])
+        db.write(wb)
+    rates.append(("RocksDB WriteBatch writes", total / (time.time() - start_time)))
     db.close()
+    clean_db()
+    
+    print("\n" + "=" * 48)
+    print(f"{'Stage':<32} | {'Records/s':>12}")
+    print("-" * 48)
+    for name, rate in rates:
+        print(f"{name:<32} | {rate:>12,.0f}")
+    print("=" * 48)
+
+if __name__ == "__main__":
+    # python 02_bulk_load.py [batch|parallel|sst|compare|generators|codecs|covering|multiget|tuning]
+    mode = sys.argv[1] if len(sys.argv) > 1 else "batch"
+    if mode == "compare":
+        compare_load_paths()
+    elif mode == "generators":
+        benchmark_generators()
+    elif mode == "codecs":
+        compare_codecs()
+    elif mode == "covering":
+        compare_covering_indexes()
+    elif mode == "multiget":
+        compare_record_fetches()
+    elif mode == "tuning":
+        compare_tuning_profiles()
+    else:
+        clean_db() # Ensure fresh start
+        db = setup_db()
+        if mode == "sst":
+            ingest_bulk_data(db)
+        elif mode == "parallel":
+            # Vectorized generation in a process pool; this process only writes
+            generate_bulk_data(db, employee_batches("vectorized", workers=os.cpu_count()))
+        else:
+            generate_bulk_data(db)
+        verify_load(db)
+        db.close()
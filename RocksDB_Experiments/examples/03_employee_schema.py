@@ -1,9 +1,16 @@
-import json
 import shutil
 import os
-from rocksdict import Rdict, Options, WriteBatch, ReadOptions
+import sys
+from rocksdict import WriteBatch, ReadOptions
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import employee_codec
+import employee_repository
+import employee_tuning
 
 DB_PATH = "./employee_db"
+CODEC = employee_codec.CODECS["binary"]  # readers detect the format, so JSON records stay readable
+COVERING_INDEXES = True  # index values carry employee_repository.PROJECTION
 
 def clean_db():
     if os.path.exists(DB_PATH):
@@ -14,50 +21,30 @@ def clean_db():
             print(f"Error cleaning up: {e}")
 
 def setup_db():
-    # 1. Define Column Families
-    cf_names = ["employees", "idx_dept", "idx_manager", "idx_name"]
-    
-    # Rdict automatically opens the default CF
-    db = Rdict(DB_PATH)
-    
-    # Check what CFs already exist in the opened DB
-    existing_cfs = db.columns()
-    
-    for cf in cf_names:
-        if cf not in existing_cfs:
-            db.create_column_family(cf, Options())
-    return db
+    # Column Families ("employees", "idx_dept", "idx_manager", "idx_name") are
+    # created on first open, each with its options from the tuning profile
+    return employee_tuning.open_db(DB_PATH)
 
 def add_employee(db, emp_id, data):
     """
     Schema Design:
-    - employees CF: Key='emp:<id>', Value=JSON Blob
-    - idx_dept CF: Key='dept:<dept_name>:<id>', Value=''
-    - idx_manager CF: Key='mgr:<mgr_name>:<id>', Value=''
-    - idx_name CF: Key='name:<full_name>:<id>', Value=''
+    - employees CF: Key='emp:<id>', Value=encoded record (CODEC, see src/employee_codec.py)
+    - idx_dept CF: Key='dept:<dept_name>:<id>', Value=projected fields (covering) or ''
+    - idx_manager CF: Key='mgr:<mgr_name>:<id>', Value=projected fields (covering) or ''
+    - idx_name CF: Key='name:<full_name>:<id>', Value=projected fields (covering) or ''
     """
     
-    # Handles for Column Families (raw handles for WriteBatch)
-    emp_cf_h = db.get_column_family_handle("employees")
-    dept_idx_h = db.get_column_family_handle("idx_dept")
-    mgr_idx_h = db.get_column_family_handle("idx_manager")
-    name_idx_h = db.get_column_family_handle("idx_name")
-    
     # 1. Main Key
     main_key = f"emp:{emp_id}"
-    main_val = json.dumps(data)
-    
-    # 2. Index Keys
-    dept_key = f"dept:{data['Department']}:{emp_id}"
-    mgr_key = f"mgr:{data['Manager Name']}:{emp_id}"
-    name_key = f"name:{data['Employee Name']}:{emp_id}"
+    main_val = CODEC.encode(data)
     
-    # Atomic Write using WriteBatch
+    # Atomic Write using WriteBatch: the record and its index entries change together,
+    # which keeps covering index values in step with the record
     wb = WriteBatch()
-    wb.put(main_key, main_val, emp_cf_h)
-    wb.put(dept_key, "", dept_idx_h)
-    wb.put(mgr_key, "", mgr_idx_h)
-    wb.put(name_key, "", name_idx_h)
+    wb.put(main_key, main_val, db.get_column_family_handle("employees"))
+    # 2. Index Keys
+    for cf, key, value in employee_repository.index_entries(emp_id, data, CODEC, COVERING_INDEXES):
+        wb.put(key, value, db.get_column_family_handle(cf))
     
     db.write(wb)
     print(f"Added employee {emp_id}: {data['Employee Name']}")
@@ -67,37 +54,17 @@ def get_by_id(db, emp_id):
     emp_cf = db.get_column_family("employees")
     try:
         val = emp_cf[f"emp:{emp_id}"]
-        return json.loads(val)
+        return employee_codec.decode(val)
     except KeyError:
         return None
 
-def search_by_department(db, dept_name):
+def search_by_department(db, dept_name, fields=employee_repository.PROJECTION):
     print(f"\n--- Searching for employees in Department: {dept_name} ---")
     
-    # Get Rdict instance for iteration
-    dept_idx = db.get_column_family("idx_dept")
-    emp_cf = db.get_column_family("employees")
-    
-    # Seek to the first entry for this department
-    it = dept_idx.iter()
-    it.seek(f"dept:{dept_name}:")
-    
-    found = []
-    while it.valid():
-        key = it.key()
-        # Ensure we are still in the same department (prefix check)
-        if not key.startswith(f"dept:{dept_name}:"):
-            break
-            
-        # Extract EmpID from the index key
-        emp_id = key.split(":")[-1]
-        
-        # Fetch full record from main CF
-        emp_data = json.loads(emp_cf[f"emp:{emp_id}"])
-        found.append(emp_data)
-        it.next()
-    
-    return found
+    # One prefix scan over idx_dept: covering entries already hold the list
+    # view's fields; full records (fields=None) are fetched a page of IDs
+    # at a time with one multi-get each
+    return employee_repository.list_by_index(db, "idx_dept", dept_name, fields)
 
 def run_demo():
     clean_db()
@@ -155,6 +122,11 @@ def run_demo():
     results = search_by_department(db, "Engineering")
     for r in results:
         print(f"  - {r['Employee Name']} ({r['Designation']})")
+    
+    # Full records when the list view's fields are not enough
+    results = search_by_department(db, "Sales", fields=None)
+    for r in results:
+        print(f"  - {r['Employee Name']}, {r['Address']}, {r['City']} (joined {r['Joining Date']})")
 
     db.close()
 
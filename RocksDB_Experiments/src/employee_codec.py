@@ -0,0 +1,269 @@
+import datetime
+import json
+import struct
+import time
+from collections.abc import Mapping
+from functools import lru_cache
+
+# Field IDs are positions in this tuple: append only, never reorder
+FIELDS = ("ID", "Employee Name", "City", "Address", "Manager Name", "Designation", "Department",
+          "Joining Date", "Active", "Last Date")
+
+# Dictionaries shared by every schema version: append only, a code once written must keep its meaning
+DEPARTMENTS = ("Engineering", "Sales", "Marketing", "HR", "Finance", "Legal", "Operations", "Product")
+LEVELS = ("Junior", "Senior", "Lead", "Staff", "Manager", "Director", "VP")
+DESIGNATIONS = tuple(f"{level} {dept}" for level in LEVELS for dept in DEPARTMENTS)
+LITERAL = 0xFF  # not in the dictionary: the string is stored inline
+DEPARTMENT_CODES = {name: code for code, name in enumerate(DEPARTMENTS)}
+DESIGNATION_CODES = {name: code for code, name in enumerate(DESIGNATIONS)}
+
+# Version 2 value layout (version 1 is the same without the presence mask):
+#   | version | presence | dept code | designation code | active | joining day | last day | end offsets | UTF-8 strings |
+# Bit i of the presence mask is set when the record has FIELDS[i]; a
+# projection (see employee_repository) leaves the other bits clear.
+# Days are date ordinals (0 = None). The end offsets (one uint16 per string
+# field) let a reader slice out one string without touching the others.
+# Anything the fixed part cannot hold goes into the "extra" JSON string.
+FIXED = {1: struct.Struct("!BBBBii"), 2: struct.Struct("!BHBBBii")}
+STRINGS = ("ID", "Employee Name", "City", "Address", "Manager Name", "Department", "Designation", "extra")
+OFFSETS = struct.Struct(f"!{len(STRINGS)}H")
+ALL_FIELDS = (1 << len(FIELDS)) - 1
+FIELD_BITS = {name: 1 << i for i, name in enumerate(FIELDS)}
+NO_ACTIVE = 0xFF
+
+
+class JsonCodec:
+    """The original format: json.dumps of the record, field names included."""
+
+    name = "json"
+
+    def encode(self, record):
+        return json.dumps(record)
+
+    def decode(self, value):
+        return json.loads(value)
+
+    def view(self, value):
+        return json.loads(value)
+
+
+@lru_cache(maxsize=4096)
+def _day(value):
+    if value is None:
+        return 0
+    return datetime.date.fromisoformat(value).toordinal()
+
+
+@lru_cache(maxsize=4096)
+def _date(day):
+    return datetime.date.fromordinal(day).isoformat() if day else None
+
+
+def _unpack(value):
+    """((presence, dept code, designation code, active, joining, last), end offsets, header size) of a binary record."""
+    fixed = FIXED.get(value[0])
+    if fixed is None:
+        raise ValueError(f"unknown employee record version {value[0]}")
+    header = fixed.unpack_from(value)
+    if value[0] == 1:
+        header = (1, ALL_FIELDS) + header[1:]
+    return header[1:], OFFSETS.unpack_from(value, fixed.size), fixed.size + OFFSETS.size
+
+
+class BinaryCodec:
+    """
+    Schema-versioned binary records. Department and designation are
+    dictionary codes, dates and the Active flag are fixed-width integers,
+    and the other strings are stored back to back, with no field names.
+    """
+
+    name = "binary"
+    version = 2
+
+    def encode(self, record):
+        extra = {}
+        presence = 0
+        for name, value in record.items():
+            if name in FIELD_BITS:
+                presence |= FIELD_BITS[name]
+            else:
+                extra[name] = value
+        strings = dict.fromkeys(STRINGS, "")
+        for name in STRINGS[:7]:
+            value = record.get(name)
+            if isinstance(value, str):
+                strings[name] = value
+            elif name in record:
+                extra[name] = value
+
+        dept_code = DEPARTMENT_CODES.get(strings["Department"], LITERAL)
+        if dept_code != LITERAL:
+            strings["Department"] = ""
+        designation_code = DESIGNATION_CODES.get(strings["Designation"], LITERAL)
+        if designation_code != LITERAL:
+            strings["Designation"] = ""
+
+        active = record.get("Active")
+        if not isinstance(active, int) or isinstance(active, bool) or not 0 <= active < NO_ACTIVE:
+            if "Active" in record:
+                extra["Active"] = active
+            active = NO_ACTIVE
+        days = []
+        for name in ("Joining Date", "Last Date"):
+            value = record.get(name)
+            try:
+                day = _day(value)
+            except (TypeError, ValueError):
+                day = None
+            if day is None or _date(day) != value:
+                # Not a YYYY-MM-DD date, or one fromisoformat reads but would not
+                # write back the same ("20240101", "2024-W01-1")
+                extra[name] = value
+                day = 0
+            days.append(day)
+        strings["extra"] = json.dumps(extra) if extra else ""
+
+        blobs = [strings[name].encode() for name in STRINGS]
+        ends = []
+        end = 0
+        for blob in blobs:
+            end += len(blob)
+            ends.append(end)
+        if end > 0xFFFF:
+            raise ValueError(f"record {record.get('ID')} has {end} bytes of strings, "
+                             f"more than version {self.version} can hold")
+        return (FIXED[self.version].pack(self.version, presence, dept_code, designation_code, active, *days)
+                + OFFSETS.pack(*ends) + b"".join(blobs))
+
+    def decode(self, value):
+        """Every field in one pass (the lazy view pays per field access instead)."""
+        (presence, dept_code, designation_code, active, joining, last), ends, header = _unpack(value)
+        text = value[header:].decode()
+        if len(text) != ends[-1]:  # non-ASCII: slice the bytes, not the characters
+            text = None
+        strings = []
+        start = 0
+        for end in ends:
+            strings.append(text[start:end] if text is not None
+                           else value[header + start:header + end].decode())
+            start = end
+        record = {
+            "ID": strings[0],
+            "Employee Name": strings[1],
+            "City": strings[2],
+            "Address": strings[3],
+            "Manager Name": strings[4],
+            "Designation": DESIGNATIONS[designation_code] if designation_code != LITERAL else strings[6],
+            "Department": DEPARTMENTS[dept_code] if dept_code != LITERAL else strings[5],
+            "Joining Date": _date(joining),
+            "Active": active,
+            "Last Date": _date(last),
+        }
+        if presence != ALL_FIELDS:
+            record = {name: v for name, v in record.items() if presence & FIELD_BITS[name]}
+        if strings[7]:
+            record.update(json.loads(strings[7]))
+        return record
+
+    def view(self, value):
+        return LazyRecord(value)
+
+
+class LazyRecord(Mapping):
+    """
+    Read-only view of a binary record that decodes a field only when it is
+    asked for: record["Department"] reads one byte and a dictionary entry,
+    and the address is never decoded for a list view that only shows names.
+    """
+
+    __slots__ = ("value", "fixed", "ends", "header", "_extra")
+
+    def __init__(self, value):
+        self.value = value
+        self.fixed, self.ends, self.header = _unpack(value)
+        self._extra = None
+
+    def _string(self, index):
+        start = self.header + (self.ends[index - 1] if index else 0)
+        return self.value[start:self.header + self.ends[index]].decode()
+
+    @property
+    def extra(self):
+        if self._extra is None:
+            raw = self._string(len(STRINGS) - 1)
+            self._extra = json.loads(raw) if raw else {}
+        return self._extra
+
+    def __getitem__(self, name):
+        if self.ends[-1] != self.ends[-2] and name in self.extra:
+            return self.extra[name]
+        presence, dept_code, designation_code, active, joining, last = self.fixed
+        if not presence & FIELD_BITS.get(name, 0):
+            raise KeyError(name)
+        if name == "Department" and dept_code != LITERAL:
+            return DEPARTMENTS[dept_code]
+        if name == "Designation" and designation_code != LITERAL:
+            return DESIGNATIONS[designation_code]
+        if name == "Active":
+            return active
+        if name == "Joining Date":
+            return _date(joining)
+        if name == "Last Date":
+            return _date(last)
+        return self._string(STRINGS.index(name))
+
+    def __iter__(self):
+        presence = self.fixed[0]
+        yield from (name for name in FIELDS if presence & FIELD_BITS[name])
+        if self.ends[-1] != self.ends[-2]:
+            yield from (k for k in self.extra if k not in FIELDS)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def to_dict(self):
+        return {name: self[name] for name in self}
+
+
+CODECS = {"json": JsonCodec(), "binary": BinaryCodec()}
+
+
+def codec_for(value):
+    """The codec that wrote value: JSON is stored as text, binary records as bytes starting with their version."""
+    if isinstance(value, str) or value[:1] == b"{":
+        return CODECS["json"]
+    return CODECS["binary"]
+
+
+def decode(value):
+    """A plain dict from an employees CF value in any format."""
+    return codec_for(value).decode(value)
+
+
+def view(value):
+    """Mapping over an employees CF value that decodes fields on access where the format allows it."""
+    return codec_for(value).view(value)
+
+
+def benchmark(records, rounds=3):
+    """
+    Bytes per record and records/s to encode, decode fully and read one
+    field lazily, for each codec over records (a list of dicts).
+    """
+    results = []
+    for codec in CODECS.values():
+        encoded = [codec.encode(r) for r in records]
+        size = sum(len(v.encode() if isinstance(v, str) else v) for v in encoded)
+        timings = {}
+        for label, fn in (("encode", lambda: [codec.encode(r) for r in records]),
+                          ("decode", lambda: [codec.decode(v) for v in encoded]),
+                          ("one field", lambda: [codec.view(v)["Employee Name"] for v in encoded])):
+            best = float("inf")
+            for _ in range(rounds):
+                start = time.perf_counter()
+                fn()
+                best = min(best, time.perf_counter() - start)
+            timings[label] = len(records) / best
+        assert all(decode(v) == r for v, r in zip(encoded, records))
+        results.append(dict(codec=codec.name, bytes_per_record=size / len(records), **timings))
+    return results
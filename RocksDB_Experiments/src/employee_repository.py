@@ -0,0 +1,88 @@
+import employee_codec
+
+# Index column families: key prefix and the record field each one indexes
+INDEXES = {
+    "idx_dept": ("dept", "Department"),
+    "idx_manager": ("mgr", "Manager Name"),
+    "idx_name": ("name", "Employee Name"),
+}
+# Fields a covering index entry carries in its value: enough for the list views
+PROJECTION = ("ID", "Employee Name", "Designation", "Department", "Manager Name", "City", "Active")
+PAGE_SIZE = 1000  # index entries resolved per multi-get
+
+
+def project(data, fields=PROJECTION):
+    return {name: data[name] for name in fields if name in data}
+
+
+def index_entries(emp_id, data, codec=employee_codec.CODECS["binary"], covering=True):
+    """
+    The (column family, key, value) index writes for one employee. With
+    covering, each value is the record's PROJECTION encoded with codec, so a
+    list view needs no lookup in employees; otherwise values are empty.
+    Covering values are copies: write them in the same WriteBatch as the
+    record, and rewrite them whenever a projected field changes.
+    """
+    value = codec.encode(project(data)) if covering else ""
+    return [(cf, f"{prefix}:{data[field]}:{emp_id}", value) for cf, (prefix, field) in INDEXES.items()]
+
+
+def scan_index(db, index_cf, value, limit=None):
+    """Yields (emp_id, index value) for the entries of index_cf under value, in key order."""
+    prefix = f"{INDEXES[index_cf][0]}:{value}:"
+    it = db.get_column_family(index_cf).iter()
+    it.seek(prefix)
+    count = 0
+    while it.valid() and (limit is None or count < limit):
+        key = it.key()
+        if not key.startswith(prefix):
+            break
+        yield key[len(prefix):], it.value()
+        count += 1
+        it.next()
+
+
+def get_records(db, emp_ids):
+    """
+    The employees of emp_ids as dicts, in the same order, through one
+    multi-get against employees (None where an ID has no record).
+    """
+    values = db.get_column_family("employees").get([f"emp:{emp_id}" for emp_id in emp_ids])
+    return [employee_codec.decode(value) if value is not None else None for value in values]
+
+
+def list_by_index(db, index_cf, value, fields=PROJECTION, limit=None, page_size=PAGE_SIZE):
+    """
+    One dict of fields per employee under value in index_cf (every field
+    when fields is None), in index order; a field the record lacks is left
+    out of its row. When every one of fields is in PROJECTION, a covering
+    entry answers from the index scan alone, since it carries each of them
+    the record has. The others are collected a page of page_size entries at
+    a time and fetched with one multi-get per page, so plain indexes keep
+    working without a point lookup per hit.
+    """
+    covered = fields is not None and set(fields) <= set(PROJECTION)
+    rows = []
+    page = []  # (emp_id, row or None when the record must be fetched)
+    for emp_id, index_value in scan_index(db, index_cf, value, limit):
+        row = None
+        if index_value and covered:
+            row = project(employee_codec.decode(index_value), fields)
+        page.append((emp_id, row))
+        if len(page) >= page_size:
+            rows.extend(_resolve_page(db, page, fields))
+            page = []
+    rows.extend(_resolve_page(db, page, fields))
+    return rows
+
+
+def _resolve_page(db, page, fields):
+    missing = [emp_id for emp_id, row in page if row is None]
+    records = iter(get_records(db, missing) if missing else ())
+    for emp_id, row in page:
+        if row is None:
+            record = next(records)
+            if record is None:
+                continue  # dangling index entry
+            row = record if fields is None else project(record, fields)
+        yield row
@@ -0,0 +1,92 @@
+import os
+
+from rocksdict import (Rdict, Options, BlockBasedOptions, Cache, SliceTransform, DBCompressionType,
+                       DataBlockIndexType)
+
+BLOCK_CACHE_SIZE = 64 * 1024 * 1024  # one LRU cache shared by every tuned column family
+
+# Per column family settings:
+#   prefix_len      fixed prefix extractor. Index keys are '<prefix>:<value>:<id>';
+#                   a search seeks to '<prefix>:<value>:', and a seek key shorter
+#                   than prefix_len skips the prefix bloom (still correct), so the
+#                   length is kept within the usual '<prefix>:<value>:'. A capped
+#                   (max_len) extractor would give such seek keys a prefix no
+#                   stored key has, and the bloom would wrongly rule them out.
+#   bloom_bits      bloom filter bits per key: whole keys, plus prefixes when
+#                   prefix_len is set
+#   memtable_bloom  memtable bloom size as a fraction of the write buffer
+#   block_cache     use the shared LRU cache instead of a private 8MB one
+#   hash_index      hash index inside data blocks, for point lookups
+#   compression, bottommost_compression
+PROFILE = {
+    "employees": dict(bloom_bits=10, memtable_bloom=0.1, block_cache=True, hash_index=True,
+                      compression="lz4", bottommost_compression="zstd"),
+    "idx_dept": dict(prefix_len=8, bloom_bits=10, memtable_bloom=0.1, block_cache=True,
+                     compression="lz4"),          # 'dept:' + 3: 'dept:HR:' is the shortest search
+    "idx_manager": dict(prefix_len=12, bloom_bits=10, memtable_bloom=0.1, block_cache=True,
+                        compression="lz4"),       # 'mgr:' + 8 characters of the name
+    "idx_name": dict(prefix_len=13, bloom_bits=10, memtable_bloom=0.1, block_cache=True,
+                     compression="lz4"),          # 'name:' + 8 characters of the name
+}
+DEFAULT_PROFILE = {cf: {} for cf in PROFILE}  # plain Options(), as before the profile
+
+COMPRESSION = {
+    "none": DBCompressionType.none,
+    "snappy": DBCompressionType.snappy,
+    "lz4": DBCompressionType.lz4,
+    "zstd": DBCompressionType.zstd,
+}
+
+_block_cache = None
+
+
+def shared_block_cache():
+    global _block_cache
+    if _block_cache is None:
+        _block_cache = Cache(BLOCK_CACHE_SIZE)
+    return _block_cache
+
+
+def cf_options(settings):
+    """Options for one column family from its profile settings ({} gives a plain Options())."""
+    opts = Options()
+    if not settings:
+        return opts
+    if "prefix_len" in settings:
+        opts.set_prefix_extractor(SliceTransform.create_fixed_prefix(settings["prefix_len"]))
+    if "memtable_bloom" in settings:
+        opts.set_memtable_prefix_bloom_ratio(settings["memtable_bloom"])
+        opts.set_memtable_whole_key_filtering(True)
+    if "compression" in settings:
+        opts.set_compression_type(COMPRESSION[settings["compression"]]())
+    if "bottommost_compression" in settings:
+        opts.set_bottommost_compression_type(COMPRESSION[settings["bottommost_compression"]]())
+
+    table = BlockBasedOptions()
+    if "bloom_bits" in settings:
+        table.set_bloom_filter(settings["bloom_bits"], False)  # full filter per SST file
+    if settings.get("block_cache"):
+        table.set_block_cache(shared_block_cache())
+    if settings.get("hash_index"):
+        table.set_data_block_index_type(DataBlockIndexType.binary_and_hash())
+    opts.set_block_based_table_factory(table)
+    return opts
+
+
+def open_db(path, profile=PROFILE, access_type=None):
+    """
+    Opens (or creates) the employee database with every column family in
+    profile tuned by its settings. These options are not read back from
+    the database, so every process that opens it must open it through
+    here to get the filters and the cache. Column families on disk that
+    profile does not name open with plain Options().
+    """
+    existing = Rdict.list_cf(path) if os.path.exists(os.path.join(path, "CURRENT")) else []
+    names = existing if access_type is not None else list(dict.fromkeys(existing + list(profile)))
+    column_families = {cf: cf_options(profile.get(cf, {})) for cf in names if cf != "default"}
+    opts = Options()
+    opts.create_if_missing(True)
+    opts.create_missing_column_families(True)
+    if access_type is None:
+        return Rdict(path, opts, column_families=column_families)
+    return Rdict(path, opts, column_families=column_families, access_type=access_type)
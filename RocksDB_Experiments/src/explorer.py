@@ -3,7 +3,10 @@ import json
 import pandas as pd
 import os
 import rocksdict
-from rocksdict import Rdict, Options, AccessType
+from rocksdict import Rdict, AccessType
+import employee_codec
+import employee_repository
+import employee_tuning
 
 st.set_page_config(page_title="RocksDB Employee Explorer", layout="wide")
 
@@ -19,7 +22,9 @@ def get_db():
     try:
         # Open in read-only mode to avoid locking issues with other processes
         # and to ensure we don't accidentally modify the 50k dataset.
-        return Rdict(DB_PATH, Options(), access_type=AccessType.read_only())
+        # The tuning profile's prefix extractors, filters and block cache only
+        # apply when the column families are opened with them.
+        return employee_tuning.open_db(DB_PATH, access_type=AccessType.read_only())
     except Exception as e:
         st.error(f"Error opening database: {e}")
         return None
@@ -61,6 +66,9 @@ def main():
     st.sidebar.header("Secondary Search")
     search_type = st.sidebar.radio("Search By", ["Employee ID", "Department", "Manager"])
     search_query = st.sidebar.text_input(f"Enter {search_type}")
+    # Off: the list view's fields from covering index entries; on: whole records via multi-get
+    full_records = st.sidebar.checkbox("Show full records", value=False)
+    fields = None if full_records else employee_repository.PROJECTION
 
     col1, col2 = st.columns([1, 1])
 
@@ -77,7 +85,12 @@ def main():
                 
                 count = 0
                 while it.valid() and count < row_limit:
-                    data.append({"Key": it.key(), "Value (Raw)": it.value()})
+                    value = it.value()
+                    if selected_cf_name == "employees" or (selected_cf_name in employee_repository.INDEXES
+                                                           and value):
+                        # Records and covering index projections, binary or JSON
+                        value = json.dumps(employee_codec.decode(value))
+                    data.append({"Key": it.key(), "Value": value})
                     it.next()
                     count += 1
                 
@@ -101,26 +114,11 @@ def main():
                 if search_type == "Employee ID":
                     emp_cf = db.get_column_family("employees")
                     val = emp_cf[f"emp:{search_query}"]
-                    st.json(json.loads(val))
+                    st.json(employee_codec.decode(val))
                 
                 elif search_type == "Department":
-                    idx_dept = db.get_column_family("idx_dept")
-                    emp_cf = db.get_column_family("employees")
-                    
-                    it = idx_dept.iter()
-                    it.seek(f"dept:{search_query}:")
-                    
-                    results = []
-                    while it.valid() and it.key().startswith(f"dept:{search_query}:"):
-                        emp_id = it.key().split(":")[-1]
-                        try:
-                            emp_data = json.loads(emp_cf[f"emp:{emp_id}"])
-                            results.append(emp_data)
-                        except:
-                            pass
-                        it.next()
-                        if len(results) > 50: # Limit UI display
-                            break
+                    # Covering index entries answer the list from the scan alone
+                    results = employee_repository.list_by_index(db, "idx_dept", search_query, fields, limit=50)
                     
                     if results:
                         st.success(f"Found {len(results)} matches (showing top 50)")
@@ -129,22 +127,7 @@ def main():
                         st.error("No employees found in this department.")
 
                 elif search_type == "Manager":
-                    idx_mgr = db.get_column_family("idx_manager")
-                    emp_cf = db.get_column_family("employees")
-                    
-                    it = idx_mgr.iter()
-                    it.seek(f"mgr:{search_query}:")
-                    
-                    results = []
-                    while it.valid() and it.key().startswith(f"mgr:{search_query}:"):
-                        emp_id = it.key().split(":")[-1]
-                        try:
-                            emp_data = json.loads(emp_cf[f"emp:{emp_id}"])
-                            results.append(emp_data)
-                        except:
-                            pass
-                        it.next()
-                        if len(results) > 50: break
+                    results = employee_repository.list_by_index(db, "idx_manager", search_query, fields, limit=50)
                     
                     if results:
                         st.success(f"Found {len(results)} matches")